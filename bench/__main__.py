@@ -0,0 +1,139 @@
+"""
+Runs the markdownp benchmarks.
+
+python -m bench <option(s)>
+
+options:
+    --sizes, -s <sizes>         :   Comma separated sizes of the generated
+                                    documents, such as 64KB,1MB,100MB. The
+                                    Default is 64KB,1MB.
+    --profiles, -p <profiles>   :   Comma separated kinds of documents, out of
+                                    paragraphs, headers, code and mixed. The
+                                    Default is all of them.
+    --stages <stages>           :   Comma separated stages to time, out of
+                                    tokenize, block, inline and render. The
+                                    Default is all of them.
+    --repeat, -r <n>            :   Number of runs the fastest time is taken
+                                    from. The Default is 3.
+    --no-memory                 :   Skip measuring the peak memory.
+    --output, -o <file>         :   File to store the results in as JSON.
+    --baseline, -b <file>       :   Results to compare against. Regressions
+                                    make the exit status 1.
+    --tolerance <fraction>      :   Relative change that counts as a
+                                    regression. The Default is 0.1.
+"""
+
+from argparse import ArgumentParser, Namespace
+from sys import argv, stderr
+from typing import Any
+
+from bench.corpus import PROFILES, format_size, parse_size
+from bench.suite import (
+    STAGES,
+    TOLERANCE,
+    Regression,
+    compare,
+    format_table,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+def parse_args(args: list[str]) -> Namespace:
+    parser: ArgumentParser = ArgumentParser(
+        prog="python -m bench", description="Benchmarks the markdownp pipeline."
+    )
+
+    parser.add_argument(
+        "--sizes",
+        "-s",
+        help="Sizes of the generated documents",
+        type=lambda sizes: [parse_size(size) for size in sizes.split(",")],
+        default="64KB,1MB",
+    )
+
+    parser.add_argument(
+        "--profiles",
+        "-p",
+        help="Kinds of documents to generate",
+        type=lambda profiles: profiles.split(","),
+        default=",".join(PROFILES),
+    )
+
+    parser.add_argument(
+        "--stages",
+        help="Stages of the pipeline to time",
+        type=lambda stages: stages.split(","),
+        default=",".join(STAGES),
+    )
+
+    parser.add_argument(
+        "--repeat",
+        "-r",
+        help="Number of runs the fastest time is taken from",
+        type=int,
+        default=3,
+    )
+
+    parser.add_argument(
+        "--no-memory",
+        help="Skip measuring the peak memory",
+        action="store_true",
+    )
+
+    parser.add_argument("--output", "-o", help="File to store the results in", type=str)
+
+    parser.add_argument("--baseline", "-b", help="Results to compare against", type=str)
+
+    parser.add_argument(
+        "--tolerance",
+        help="Relative change that counts as a regression",
+        type=float,
+        default=TOLERANCE,
+    )
+
+    namespace: Namespace = parser.parse_args(args)
+    for profile in namespace.profiles:
+        if profile not in PROFILES:
+            parser.error(f"unknown profile {profile}")
+    for stage in namespace.stages:
+        if stage not in STAGES:
+            parser.error(f"unknown stage {stage}")
+    return namespace
+
+
+def main() -> int:
+    args: Namespace = parse_args(argv[1:])
+
+    results: dict[str, Any] = run_benchmarks(
+        args.sizes,
+        args.profiles,
+        stages=args.stages,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+    )
+    print(format_table(results))
+
+    if args.output is not None:
+        save_results(results, args.output)
+
+    if args.baseline is None:
+        return 0
+
+    regressions: list[Regression] = compare(
+        results, load_results(args.baseline), tolerance=args.tolerance
+    )
+    for regression in regressions:
+        print(
+            f"regression: {regression.profile} {format_size(regression.size)} "
+            f"{regression.stage} {regression.metric} "
+            f"{regression.baseline:.2f} -> {regression.current:.2f} "
+            f"({regression.change:.0%} worse)",
+            file=stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+"""
+Synthetic markdown documents for the benchmarks
+"""
+
+from random import Random
+import re
+from typing import Iterator, TextIO
+
+# relative weights of the paragraph, header and code blocks of each profile
+PROFILES: dict[str, tuple[int, int, int]] = {
+    "paragraphs": (8, 1, 1),
+    "headers": (1, 8, 1),
+    "code": (1, 1, 8),
+    "mixed": (4, 2, 3),
+}
+
+# words the text is made of, including some that are not ASCII so encoding
+# and decoding are part of the measurements
+# fmt: off
+WORDS: tuple[str, ...] = (
+    "the", "parser", "reads", "a", "line", "of", "markdown", "and", "emits",
+    "tokens", "for", "every", "block", "header", "paragraph", "code", "text",
+    "with", "some", "more", "words", "café", "naïve", "über", "résumé",
+    "*emphasis*", "`span`", "[link](http://example.com)", "x = y", "42",
+)
+# fmt: on
+
+_UNITS: dict[str, int] = {"": 1, "B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+
+def parse_size(size: str) -> int:
+    """
+    Converts sizes such as "512", "64KB" or "1.5MB" into a number of bytes
+    """
+    matched: re.Match[str] | None = re.fullmatch(
+        r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", size.upper()
+    )
+    if matched is None or matched.group(2) not in _UNITS:
+        raise ValueError(f"invalid size {size!r}")
+    return int(float(matched.group(1)) * _UNITS[matched.group(2)])
+
+
+def format_size(size: int) -> str:
+    """
+    The inverse of parse_size for whole numbers of units
+    """
+    for unit in ("GB", "MB", "KB"):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def iter_blocks(profile: str = "mixed", *, seed: int = 0) -> Iterator[str]:
+    """
+    Endlessly yields the source of random top level blocks, each followed by
+    a blank line.
+
+    The same profile and seed always produce the same blocks.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile {profile!r}")
+
+    random: Random = Random(seed)
+    builders = (_paragraph, _header, _code_block)
+    weights: tuple[int, int, int] = PROFILES[profile]
+
+    while True:
+        yield random.choices(builders, weights)[0](random) + "\n"
+
+
+def generate(size: int, profile: str = "mixed", *, seed: int = 0) -> str:
+    """
+    Returns a document of whole blocks that is at least size bytes long when
+    encoded as UTF-8
+    """
+    blocks: list[str] = []
+    length: int = 0
+    for block in iter_blocks(profile, seed=seed):
+        if length >= size:
+            break
+        blocks.append(block)
+        length += len(block.encode("utf-8"))
+    return "".join(blocks)
+
+
+def write_corpus(
+    file: TextIO, size: int, profile: str = "mixed", *, seed: int = 0
+) -> int:
+    """
+    Writes the document generate would return to file without building it
+    in memory and returns the number of bytes written
+    """
+    length: int = 0
+    for block in iter_blocks(profile, seed=seed):
+        if length >= size:
+            break
+        file.write(block)
+        length += len(block.encode("utf-8"))
+    return length
+
+
+def _words(random: Random, low: int, high: int) -> str:
+    return " ".join(random.choices(WORDS, k=random.randint(low, high)))
+
+
+def _paragraph(random: Random) -> str:
+    lines: list[str] = [_words(random, 4, 14)]
+    for _ in range(random.randint(0, 4)):
+        # some continuation lines are indented, which keeps them in the
+        # paragraph
+        indent: str = random.choice(("", "", "  ", "    "))
+        lines.append(indent + _words(random, 3, 14))
+    return "\n".join(lines) + "\n"
+
+
+def _header(random: Random) -> str:
+    return "#" * random.randint(1, 6) + " " + _words(random, 1, 6) + "\n"
+
+
+def _code_block(random: Random) -> str:
+    lines: list[str] = []
+    for _ in range(random.randint(1, 8)):
+        indent: str = random.choice(("    ", "    ", "        ", "\t"))
+        lines.append(indent + _words(random, 1, 8))
+    return "\n".join(lines) + "\n"
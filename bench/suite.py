@@ -0,0 +1,255 @@
+"""
+Throughput and memory benchmarks of the stages of the markdownp pipeline
+"""
+
+import json
+import platform
+from gc import collect
+from io import StringIO
+from time import perf_counter
+from tracemalloc import get_traced_memory, is_tracing, start, stop
+from typing import Any, Callable, Iterable, NamedTuple
+
+from bench.corpus import format_size, generate
+from dom.renderer import render
+from parsing import __version__
+from parsing.parser import BlockParser, InlineParser
+from parsing.tokenizer import BlockTokenizer
+
+# version of the layout of the result files
+RESULTS_FORMAT: int = 1
+
+# the stages of the pipeline in the order they run
+STAGES: tuple[str, ...] = ("tokenize", "block", "inline", "render")
+
+# relative change of a metric that is reported as a regression
+TOLERANCE: float = 0.10
+
+
+class Measurement(NamedTuple):
+    """
+    The best time and the peak memory of one stage on one document
+    """
+
+    profile: str
+    size: int
+    stage: str
+    seconds: float
+    mb_per_s: float
+    peak_bytes: int
+
+
+class Regression(NamedTuple):
+    """
+    A metric that got worse than the baseline by more than the tolerance.
+    change is relative to the baseline, positive meaning worse.
+    """
+
+    profile: str
+    size: int
+    stage: str
+    metric: str
+    baseline: float
+    current: float
+    change: float
+
+
+def _stages(
+    text: str,
+) -> list[tuple[str, Callable[[], Any] | None, Callable[[Any], Any]]]:
+    """
+    Returns the setup and the run of each stage on text.
+
+    setup produces the input of a stage ahead of time, so each run only
+    measures its own work. Stages without setup get None as input.
+    """
+    tree = InlineParser().parse(BlockParser().parse(StringIO(text)))
+
+    return [
+        ("tokenize", None, lambda _: BlockTokenizer(StringIO(text)).tokenize_all()),
+        ("block", None, lambda _: BlockParser().parse(StringIO(text))),
+        # inline parsing replaces the text of the tree it is given, so every
+        # run gets a fresh one
+        (
+            "inline",
+            lambda: BlockParser().parse(StringIO(text)),
+            lambda block_tree: InlineParser().parse(block_tree),
+        ),
+        ("render", None, lambda _: render(tree)),
+    ]
+
+
+def time_stage(
+    run: Callable[[Any], Any],
+    repeat: int = 3,
+    setup: Callable[[], Any] | None = None,
+) -> float:
+    """
+    Returns the fastest of repeat runs in seconds, each run is passed the
+    result of setup
+    """
+    best: float = float("inf")
+    for _ in range(repeat):
+        argument: Any = None if setup is None else setup()
+        collect()
+        started: float = perf_counter()
+        run(argument)
+        best = min(best, perf_counter() - started)
+    return best
+
+
+def peak_memory(
+    run: Callable[[Any], Any], setup: Callable[[], Any] | None = None
+) -> int:
+    """
+    Returns the most memory allocated at once while run was running,
+    including what it returned
+    """
+    if is_tracing():
+        raise RuntimeError("tracemalloc is already tracing")
+
+    argument: Any = None if setup is None else setup()
+    collect()
+    start()
+    try:
+        run(argument)
+        return get_traced_memory()[1]
+    finally:
+        stop()
+
+
+def measure(
+    text: str,
+    profile: str = "custom",
+    *,
+    stages: Iterable[str] = STAGES,
+    repeat: int = 3,
+    memory: bool = True,
+) -> list[Measurement]:
+    """
+    Benchmarks the given stages on text
+    """
+    size: int = len(text.encode("utf-8"))
+    wanted: set[str] = set(stages)
+    measurements: list[Measurement] = []
+
+    for stage, setup, run in _stages(text):
+        if stage not in wanted:
+            continue
+
+        seconds: float = time_stage(run, repeat, setup)
+        measurements.append(
+            Measurement(
+                profile,
+                size,
+                stage,
+                seconds,
+                size / 1024**2 / seconds if seconds else float("inf"),
+                peak_memory(run, setup) if memory else 0,
+            )
+        )
+    return measurements
+
+
+def run_benchmarks(
+    sizes: Iterable[int],
+    profiles: Iterable[str],
+    *,
+    stages: Iterable[str] = STAGES,
+    repeat: int = 3,
+    memory: bool = True,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Benchmarks every stage on a generated document of each size and profile
+    and returns the results in the layout stored by save_results.
+
+    size in the results is the requested size, so results of different runs
+    can be matched even though documents only end at whole blocks.
+    """
+    stages = tuple(stages)
+    measurements: list[Measurement] = []
+    for profile in profiles:
+        for size in sizes:
+            text: str = generate(size, profile, seed=seed)
+            for measurement in measure(
+                text, profile, stages=stages, repeat=repeat, memory=memory
+            ):
+                measurements.append(measurement._replace(size=size))
+
+    return {
+        "format": RESULTS_FORMAT,
+        "version": __version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": [measurement._asdict() for measurement in measurements],
+    }
+
+
+def save_results(results: dict[str, Any], path: str):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+        file.write("\n")
+
+
+def load_results(path: str) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as file:
+        results: dict[str, Any] = json.load(file)
+
+    if results.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"{path} is not a benchmark result file")
+    return results
+
+
+def compare(
+    results: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    tolerance: float = TOLERANCE,
+) -> list[Regression]:
+    """
+    Returns the metrics that are worse than in baseline by more than
+    tolerance.
+
+    Throughput regresses when it drops and memory when it grows. Results that
+    are missing from either side are not compared.
+    """
+    previous: dict[tuple[str, int, str], dict[str, Any]] = {
+        (entry["profile"], entry["size"], entry["stage"]): entry
+        for entry in baseline["results"]
+    }
+
+    regressions: list[Regression] = []
+    for entry in results["results"]:
+        key: tuple[str, int, str] = (entry["profile"], entry["size"], entry["stage"])
+        old: dict[str, Any] | None = previous.get(key)
+        if old is None:
+            continue
+
+        # throughput is better when higher and memory when lower
+        for metric, sign in (("mb_per_s", -1), ("peak_bytes", 1)):
+            if not old[metric] or not entry[metric]:
+                continue
+            change: float = sign * (entry[metric] - old[metric]) / old[metric]
+            if change > tolerance:
+                regressions.append(
+                    Regression(*key, metric, old[metric], entry[metric], change)
+                )
+
+    return regressions
+
+
+def format_table(results: dict[str, Any]) -> str:
+    """
+    Formats results as a plain text table
+    """
+    lines: list[str] = [
+        f"{'profile':<12}{'size':>8}  {'stage':<10}{'MB/s':>10}{'peak KB':>12}"
+    ]
+    for entry in results["results"]:
+        lines.append(
+            f"{entry['profile']:<12}{format_size(entry['size']):>8}  "
+            f"{entry['stage']:<10}{entry['mb_per_s']:>10.2f}"
+            f"{entry['peak_bytes'] / 1024:>12.0f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,43 @@
+"""
+Tests for the synthetic benchmark documents
+"""
+
+import unittest
+from io import StringIO
+from bench.corpus import PROFILES, format_size, generate, parse_size, write_corpus
+from dom.renderer import render
+from parsing.parser import BlockParser
+
+
+class CorpusTests(unittest.TestCase):
+    def test_sizes(self):
+        self.assertEqual(parse_size("512"), 512)
+        self.assertEqual(parse_size("64kb"), 64 * 1024)
+        self.assertEqual(parse_size("1.5MB"), 3 * 512 * 1024)
+        self.assertEqual(format_size(parse_size("100MB")), "100MB")
+        with self.assertRaises(ValueError):
+            parse_size("12 parsecs")
+
+    def test_generate(self):
+        for profile in PROFILES:
+            text: str = generate(16 * 1024, profile, seed=1)
+            self.assertGreaterEqual(len(text.encode("utf-8")), 16 * 1024)
+            self.assertEqual(text, generate(16 * 1024, profile, seed=1))
+            # every generated document can be parsed
+            render(BlockParser().parse(StringIO(text)))
+
+    def test_profiles(self):
+        headers: str = generate(8 * 1024, "headers")
+        code: str = generate(8 * 1024, "code")
+        self.assertGreater(headers.count("\n#"), code.count("\n#"))
+        self.assertGreater(code.count("\n    "), headers.count("\n    "))
+
+    def test_write_corpus(self):
+        file: StringIO = StringIO()
+        size: int = write_corpus(file, 4096, "mixed", seed=2)
+        self.assertEqual(file.getvalue(), generate(4096, "mixed", seed=2))
+        self.assertEqual(size, len(file.getvalue().encode("utf-8")))
+
+
+if __name__ == "__main__":
+    unittest.main()
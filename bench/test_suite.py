@@ -0,0 +1,69 @@
+"""
+Tests for the benchmark runner and the comparison of results
+"""
+
+import unittest
+from os.path import join
+from tempfile import TemporaryDirectory
+from bench.suite import (
+    STAGES,
+    compare,
+    format_table,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+class SuiteTests(unittest.TestCase):
+    def test_run_benchmarks(self):
+        results = run_benchmarks([1024, 2048], ["mixed", "code"], repeat=1)
+
+        entries = results["results"]
+        self.assertEqual(len(entries), 2 * 2 * len(STAGES))
+        self.assertEqual(
+            [(e["profile"], e["size"], e["stage"]) for e in entries[:4]],
+            [("mixed", 1024, stage) for stage in STAGES],
+        )
+        for entry in entries:
+            self.assertGreater(entry["mb_per_s"], 0)
+        self.assertIn("render", format_table(results))
+
+    def test_save_and_load(self):
+        results = run_benchmarks([1024], ["mixed"], stages=["render"], repeat=1)
+        with TemporaryDirectory() as directory:
+            path: str = join(directory, "results.json")
+            save_results(results, path)
+            self.assertEqual(load_results(path), results)
+
+            with open(path, "w") as file:
+                file.write("{}")
+            with self.assertRaises(ValueError):
+                load_results(path)
+
+    def test_compare(self):
+        def results(mb_per_s: float, peak_bytes: int) -> dict:
+            entry = {
+                "profile": "mixed",
+                "size": 1024,
+                "stage": "block",
+                "seconds": 1 / mb_per_s,
+                "mb_per_s": mb_per_s,
+                "peak_bytes": peak_bytes,
+            }
+            return {"format": 1, "results": [entry]}
+
+        baseline = results(10.0, 1000)
+        self.assertEqual(compare(results(9.5, 1050), baseline), [])
+        self.assertEqual(compare(results(20.0, 500), baseline), [])
+
+        regressions = compare(results(8.0, 1200), baseline)
+        self.assertEqual(
+            [(r.metric, round(r.change, 2)) for r in regressions],
+            [("mb_per_s", 0.2), ("peak_bytes", 0.2)],
+        )
+        self.assertEqual(compare(results(8.0, 1200), baseline, tolerance=0.25), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,17 +2,56 @@
 Implements argument parsing for the markdownp command line interface. Uses 
 argparse.
 
-markdownp <option(s)> <file> 
+markdownp <option(s)> <file(s)>
 
 arguments:
-    <file>    :   The path of the file to be parsed.
-                If the file is not provided then the file contents are 
-                retrieved from stdin.
+    <file>    :   The path of the file to be parsed. Several files,
+                directories and glob patterns can be given to convert them
+                all into --output-dir.
+                No file is given with --ndjson, which reads records from
+                stdin instead.
 
 options:
-    --verbose, -v               :   Enable verbose mode
+    --verbose, -v               :   Enable verbose mode, printing the time
+                                    spent in every stage of the conversion of
+                                    a single file to stderr.
+    --profile                   :   Print the time, memory, token and node
+                                    counts of every stage of the conversion of
+                                    a single file to stderr as JSON.
     --encoding, -e <encoding>   :   Set the Unicode encoding to be used. The
                                     Default is UTF-8.
+    --output, -o <file>         :   File to output the html to when a single
+                                    file is converted.
+    --output-dir, -d <dir>      :   Directory the converted files are written
+                                    to, mirroring the layout of the inputs.
+    --jobs, -j <n>              :   Number of worker processes used to convert
+                                    several files or to parse a single large
+                                    file. The Default is 1.
+    --cache-size <n>            :   Number of rendered blocks cached and reused
+                                    across files. The Default is 0 (off), or
+                                    4096 for --daemon.
+    --incremental, -i           :   Only convert files that changed since the
+                                    last build into --output-dir.
+    --watch, -w                 :   Keep polling the inputs and convert files
+                                    as they change. Implies --incremental.
+    --daemon                    :   Run a daemon that keeps --jobs warm worker
+                                    processes and converts files for other
+                                    markdownp commands. No file is given.
+    --socket <path>             :   Unix socket of the daemon. The Default is
+                                    markdownp.sock in $XDG_RUNTIME_DIR, or
+                                    in a markdownp-<user> directory only
+                                    the user can access in the temp
+                                    directory. Sockets of other users are
+                                    never used.
+    --no-daemon                 :   Convert a single file in this process even
+                                    if a daemon is running. Otherwise it is
+                                    sent to the daemon when there is one.
+    --ndjson                    :   Read JSON records with an "id" and the
+                                    "markdown" to convert from stdin, one per
+                                    line, and write records with the "id" and
+                                    the "html" or an "error" to stdout in the
+                                    same order. No file is given, --jobs and
+                                    --cache-size apply.
 """
 
 from argparse import ArgumentParser, Namespace
@@ -23,7 +62,10 @@ def parse_args(args: list[str]) -> Namespace:
 
     # arguments
     parser.add_argument(
-        "file", help="The path to the file to be parsed", metavar="<file>"
+        "file",
+        help="The paths, directories or glob patterns of the files to be parsed",
+        metavar="<file>",
+        nargs="*",
     )
 
     # options
@@ -31,6 +73,20 @@ def parse_args(args: list[str]) -> Namespace:
         "--verbose", "-v", help="Enable verbose mode.", action="store_true"
     )
 
+    parser.add_argument(
+        "--profile",
+        help="Print the time and memory of every stage as JSON to stderr",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--encoding",
+        "-e",
+        help="The Unicode encoding of the input files",
+        type=str,
+        default="utf-8",
+    )
+
     parser.add_argument(
         "--output",
         "-o",
@@ -39,4 +95,71 @@ def parse_args(args: list[str]) -> Namespace:
         default="output.html",
     )
 
-    return parser.parse_args(args)
+    parser.add_argument(
+        "--output-dir",
+        "-d",
+        help="Directory to mirror the converted files into",
+        type=str,
+        default=None,
+    )
+
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of worker processes used to convert files",
+        type=int,
+        default=1,
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        help="Number of rendered blocks to reuse across files",
+        type=int,
+        default=0,
+    )
+
+    parser.add_argument(
+        "--incremental",
+        "-i",
+        help="Only convert files changed since the last build",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--watch",
+        "-w",
+        help="Rebuild files as they change",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--daemon",
+        help="Run a daemon converting files for other commands",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--socket",
+        help="Unix socket of the daemon",
+        type=str,
+        default=None,
+    )
+
+    parser.add_argument(
+        "--no-daemon",
+        help="Do not send the file to a running daemon",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--ndjson",
+        help="Convert JSON records read from stdin to stdout",
+        action="store_true",
+    )
+
+    namespace: Namespace = parser.parse_args(args)
+    if namespace.ndjson and namespace.file:
+        parser.error("--ndjson reads the records from stdin, no file is given")
+    if not namespace.file and not (namespace.daemon or namespace.ndjson):
+        parser.error("the following arguments are required: <file>")
+    return namespace
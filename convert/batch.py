@@ -0,0 +1,265 @@
+"""
+Batch conversion of many markdown files into a mirrored output directory
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from io import StringIO
+from glob import glob, has_magic
+from os import getpid, makedirs, remove, replace, walk
+from os.path import (
+    abspath,
+    dirname,
+    exists,
+    isdir,
+    isfile,
+    islink,
+    join,
+    normcase,
+    relpath,
+    splitext,
+)
+from typing import Iterable, Iterator, NamedTuple, TextIO
+
+from dom.renderer import render_blocks_to
+from parsing.cache import BlockCache
+from parsing.compiler import HtmlCompiler
+from parsing.parser import open_source
+
+# extensions of the files picked up when a directory is given as input
+MARKDOWN_EXTENSIONS: tuple[str, ...] = (".md", ".markdown")
+
+# largest number of files handed to a worker process at a time
+CHUNK_SIZE: int = 16
+
+# rendered blocks shared by all the files converted in this process
+_cache: BlockCache | None = None
+
+
+class Result(NamedTuple):
+    """
+    The outcome of converting a single file. error is None on success.
+    """
+
+    source: str
+    output: str
+    error: str | None = None
+
+
+def collect_inputs(paths: Iterable[str]) -> list[tuple[str, str]]:
+    """
+    Expands files, directories and glob patterns into (source, relative path)
+    pairs.
+
+    The relative path is where the file will be placed inside the output
+    directory. Files in a directory keep their path relative to it, files
+    matched by a glob keep their path relative to the part of the pattern
+    before the first wildcard and plain files are placed at the top level.
+    """
+    inputs: list[tuple[str, str]] = []
+
+    for path in paths:
+        if isdir(path):
+            for root, dirs, files in walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if splitext(name)[1].lower() in MARKDOWN_EXTENSIONS:
+                        source: str = join(root, name)
+                        inputs.append((source, relpath(source, path)))
+        elif has_magic(path):
+            base: str = _glob_base(path)
+            for source in sorted(glob(path, recursive=True)):
+                if not isdir(source):
+                    inputs.append((source, relpath(source, base)))
+        else:
+            inputs.append((path, relpath(path, dirname(path) or ".")))
+
+    return inputs
+
+
+def _glob_base(pattern: str) -> str:
+    """
+    Returns the directory of a glob pattern that precedes its first wildcard
+    """
+    base: str = pattern
+    while has_magic(base):
+        base = dirname(base)
+    return base or "."
+
+
+def output_path(output_dir: str, relative: str) -> str:
+    """
+    Returns the html path for a relative markdown path inside output_dir
+    """
+    return join(output_dir, splitext(relative)[0] + ".html")
+
+
+def output_conflicts(sources: list[str], outputs: list[str]) -> list[str | None]:
+    """
+    Returns for every source the earlier source converted into the same
+    output, or None if it is the first to use its output
+    """
+    first: dict[str, str] = {}
+    conflicts: list[str | None] = []
+    for source, output in zip(sources, outputs):
+        key: str = normcase(abspath(output))
+        conflicts.append(first.get(key))
+        first.setdefault(key, source)
+    return conflicts
+
+
+def conflict_result(source: str, output: str, earlier: str) -> Result:
+    """
+    The failed Result of a source whose output belongs to earlier
+    """
+    return Result(
+        source, output, f"FileExistsError: {output} is the output of {earlier}"
+    )
+
+
+@contextmanager
+def open_output(path: str) -> Iterator[TextIO]:
+    """
+    Opens a new file next to path to write its content into. The file
+    replaces path once the block is done, if the block raises path is left
+    as it was. Links and devices are opened for writing directly.
+    """
+    if islink(path) or (exists(path) and not isfile(path)):
+        # links and devices, such as /dev/stdout, are written through in
+        # place like before rather than replaced
+        with open(path, "w") as file:
+            yield file
+        return
+
+    temporary: str = f"{path}.{getpid()}.tmp"
+    file = open(temporary, "x")
+    try:
+        with file:
+            yield file
+    except BaseException:
+        remove(temporary)
+        raise
+    replace(temporary, path)
+
+
+def convert_file(source: str, output: str, encoding: str = "utf-8") -> Result:
+    """
+    Converts a single file, returning any error instead of raising it so one
+    broken file does not stop the batch
+    """
+    try:
+        makedirs(dirname(output) or ".", exist_ok=True)
+        with open_output(output) as file:
+            if _cache is None:
+                with open_source(source, encoding) as markdown:
+                    HtmlCompiler(encoding=encoding).compile_to(markdown, file)
+            else:
+                with open(source, encoding=encoding) as markdown:
+                    render_blocks_to(_cache.iter_blocks(markdown), file)
+    except Exception as error:
+        return Result(source, output, f"{type(error).__name__}: {error}")
+
+    return Result(source, output)
+
+
+def convert_text(markdown: str) -> str:
+    """
+    Returns the html of markdown text, reusing the cached blocks of this
+    process when there are any
+    """
+    if _cache is None:
+        return HtmlCompiler().compile(StringIO(markdown))
+
+    html: StringIO = StringIO()
+    render_blocks_to(_cache.iter_blocks(StringIO(markdown)), html)
+    return html.getvalue()
+
+
+def _init_cache(cache_size: int):
+    global _cache
+    _cache = BlockCache(cache_size) if cache_size > 0 else None
+
+
+def convert_all(
+    paths: Iterable[str],
+    output_dir: str,
+    *,
+    jobs: int = 1,
+    cache_size: int = 0,
+    encoding: str = "utf-8",
+) -> Iterator[Result]:
+    """
+    Converts every input into output_dir, yielding a Result per file in
+    input order.
+
+    When jobs is greater than one the files are spread over a pool of that
+    many processes. A cache_size greater than zero keeps that many rendered
+    blocks per process so content repeated across files is only converted
+    once.
+    """
+    sources: list[str] = []
+    outputs: list[str] = []
+    for source, relative in collect_inputs(paths):
+        sources.append(source)
+        outputs.append(output_path(output_dir, relative))
+
+    return convert_many(
+        sources, outputs, jobs=jobs, cache_size=cache_size, encoding=encoding
+    )
+
+
+def convert_many(
+    sources: list[str],
+    outputs: list[str],
+    *,
+    jobs: int = 1,
+    cache_size: int = 0,
+    encoding: str = "utf-8",
+) -> Iterator[Result]:
+    """
+    Converts each source into the output at the same index, see convert_all.
+
+    A source whose output is the output of an earlier source is not
+    converted and fails instead, so no file silently overwrites another one.
+    """
+    conflicts: list[str | None] = output_conflicts(sources, outputs)
+    results: Iterator[Result] = _convert_each(
+        [source for source, earlier in zip(sources, conflicts) if earlier is None],
+        [output for output, earlier in zip(outputs, conflicts) if earlier is None],
+        jobs=jobs,
+        cache_size=cache_size,
+        encoding=encoding,
+    )
+    for source, output, earlier in zip(sources, outputs, conflicts):
+        if earlier is None:
+            yield next(results)
+        else:
+            yield conflict_result(source, output, earlier)
+    # finishes the pool of the conversions
+    for _ in results:
+        pass
+
+
+def _convert_each(
+    sources: list[str],
+    outputs: list[str],
+    *,
+    jobs: int,
+    cache_size: int,
+    encoding: str,
+) -> Iterator[Result]:
+    convert = partial(convert_file, encoding=encoding)
+
+    if jobs <= 1 or len(sources) <= 1:
+        _init_cache(cache_size)
+        yield from map(convert, sources, outputs)
+        return
+
+    # small batches are split finely so that every worker gets some files
+    chunk_size: int = max(1, min(CHUNK_SIZE, len(sources) // (jobs * 4)))
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_cache, initargs=(cache_size,)
+    ) as executor:
+        yield from executor.map(convert, sources, outputs, chunksize=chunk_size)
@@ -0,0 +1,232 @@
+"""
+Incremental builds that only convert files changed since the last run
+"""
+
+import json
+from itertools import chain
+from hashlib import blake2b
+from os import makedirs, remove, replace, stat
+from os.path import abspath, exists, join, normcase
+from time import sleep
+from typing import Any, Iterable, Iterator, NamedTuple
+
+from convert.batch import (
+    Result,
+    collect_inputs,
+    conflict_result,
+    convert_many,
+    output_conflicts,
+    output_path,
+)
+from parsing import __version__
+
+MANIFEST_NAME: str = ".markdownp-manifest.json"
+MANIFEST_FORMAT: int = 2
+
+# seconds between two polls of the inputs in watch mode
+WATCH_INTERVAL: float = 1.0
+
+
+class BuildReport(NamedTuple):
+    """
+    The outcome of one build: the files that were converted, how many were
+    up to date and how many outputs of deleted sources were removed
+    """
+
+    results: list[Result]
+    skipped: int
+    removed: int
+
+
+def file_hash(path: str) -> str:
+    digest = blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir: str) -> dict[str, Any]:
+    """
+    Returns the entries of the manifest in output_dir, or nothing if it is
+    missing, unreadable or was written by another parser version
+    """
+    try:
+        with open(join(output_dir, MANIFEST_NAME), encoding="utf-8") as file:
+            manifest: dict[str, Any] = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    if (
+        manifest.get("format") != MANIFEST_FORMAT
+        or manifest.get("parser") != __version__
+    ):
+        return {}
+
+    return manifest.get("files", {})
+
+
+def save_manifest(output_dir: str, files: dict[str, Any]):
+    makedirs(output_dir, exist_ok=True)
+    path: str = join(output_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(
+            {"format": MANIFEST_FORMAT, "parser": __version__, "files": files},
+            file,
+            indent=1,
+            sort_keys=True,
+        )
+    # the manifest is replaced in one step so an interrupted build can not
+    # leave a half written one behind
+    replace(path + ".tmp", path)
+
+
+def build(
+    paths: Iterable[str],
+    output_dir: str,
+    *,
+    jobs: int = 1,
+    cache_size: int = 0,
+    encoding: str = "utf-8",
+) -> BuildReport:
+    """
+    Converts the inputs into output_dir like convert_all, skipping every file
+    whose content, encoding and parser version match the manifest of the
+    previous build.
+
+    Files are first compared by size and modification time and only hashed
+    when those changed. Sources that can not be read, such as listed files
+    that were deleted, are reported as failed results and outputs of sources
+    that no longer exist are removed.
+    """
+    previous: dict[str, Any] = load_manifest(output_dir)
+    files: dict[str, Any] = {}
+
+    sources: list[str] = []
+    outputs: list[str] = []
+    pending: list[dict[str, Any]] = []
+    # the result of every input in order, None for the ones to convert
+    ordered: list[Result | None] = []
+    skipped: int = 0
+
+    inputs: list[tuple[str, str]] = [
+        (source, output_path(output_dir, relative))
+        for source, relative in collect_inputs(paths)
+    ]
+    conflicts: list[str | None] = output_conflicts(
+        [source for source, _ in inputs], [output for _, output in inputs]
+    )
+    for (source, output), earlier in zip(inputs, conflicts):
+        if earlier is not None:
+            # checked here as well since the earlier source may be up to date
+            ordered.append(conflict_result(source, output, earlier))
+            continue
+        try:
+            entry, up_to_date = _check(source, output, encoding, previous.get(source))
+        except OSError as error:
+            # a listed source that was deleted, reported like convert_all
+            ordered.append(Result(source, output, f"{type(error).__name__}: {error}"))
+            continue
+
+        if up_to_date:
+            files[source] = entry
+            skipped += 1
+            continue
+
+        sources.append(source)
+        outputs.append(output)
+        pending.append(entry)
+        ordered.append(None)
+
+    converted: Iterator[tuple[Result, dict[str, Any]]] = zip(
+        convert_many(
+            sources, outputs, jobs=jobs, cache_size=cache_size, encoding=encoding
+        ),
+        pending,
+    )
+    results: list[Result] = []
+    for result in ordered:
+        if result is None:
+            result, entry = next(converted)
+            # failed files are left out of the manifest so they are retried
+            if result.error is None:
+                files[entry["source"]] = entry
+        results.append(result)
+
+    # outputs of this build, a source that was renamed may have just written
+    # the output it had
+    written: set[str] = {
+        normcase(abspath(output))
+        for output in chain(outputs, (entry["output"] for entry in files.values()))
+    }
+    removed: int = 0
+    for source, old in previous.items():
+        if (
+            source not in files
+            and not exists(source)
+            and normcase(abspath(old["output"])) not in written
+            and exists(old["output"])
+        ):
+            remove(old["output"])
+            removed += 1
+
+    if files != previous:
+        save_manifest(output_dir, files)
+
+    return BuildReport(results, skipped, removed)
+
+
+def _check(
+    source: str, output: str, encoding: str, old: dict[str, Any] | None
+) -> tuple[dict[str, Any], bool]:
+    """
+    Returns the manifest entry of source and whether output is up to date
+    with it according to old, the entry of the previous build
+    """
+    status = stat(source)
+    entry: dict[str, Any] = {
+        "source": source,
+        "output": output,
+        "encoding": encoding,
+        "size": status.st_size,
+        "mtime": status.st_mtime_ns,
+    }
+    if (
+        old is None
+        or old["output"] != output
+        or old["encoding"] != encoding
+        or not exists(output)
+    ):
+        entry["hash"] = file_hash(source)
+        return entry, False
+
+    if old["size"] == entry["size"] and old["mtime"] == entry["mtime"]:
+        return old, True
+
+    # touched but maybe not changed, the new modification time is kept
+    entry["hash"] = file_hash(source)
+    return entry, old["hash"] == entry["hash"]
+
+
+def watch(
+    paths: Iterable[str],
+    output_dir: str,
+    *,
+    jobs: int = 1,
+    cache_size: int = 0,
+    encoding: str = "utf-8",
+    interval: float = WATCH_INTERVAL,
+) -> Iterator[BuildReport]:
+    """
+    Builds the inputs, then polls them every interval seconds and rebuilds
+    whatever changed. Yields a report for every build that did something.
+    """
+    paths = list(paths)
+
+    while True:
+        report: BuildReport = build(
+            paths, output_dir, jobs=jobs, cache_size=cache_size, encoding=encoding
+        )
+        if report.results or report.removed:
+            yield report
+        sleep(interval)
@@ -0,0 +1,167 @@
+"""
+Client of the markdownp daemon.
+
+This module only needs the standard library so that commands which are
+served by a running daemon start quickly.
+"""
+
+import json
+import os
+import socket
+import struct
+from getpass import getuser
+from os.path import abspath, join
+from tempfile import gettempdir
+from typing import Any
+
+from parsing import __version__
+
+
+def _default_socket() -> str:
+    runtime: str | None = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return join(runtime, "markdownp.sock")
+    # the daemon creates the directory so that only the user can use it
+    return join(gettempdir(), f"markdownp-{getuser()}", "daemon.sock")
+
+
+# where the daemon listens unless told otherwise, one per user
+DEFAULT_SOCKET: str = _default_socket()
+
+
+class DaemonUnavailable(OSError):
+    """
+    Raised when no compatible daemon is listening on the socket
+    """
+
+
+def check_owner(path: str):
+    """
+    Raises PermissionError unless the file at path belongs to the current
+    user, so that no other user can stand in for the daemon
+    """
+    if not hasattr(os, "getuid"):
+        return
+    owner: int = os.lstat(path).st_uid
+    if owner != os.getuid():
+        raise PermissionError(f"{path} belongs to another user ({owner})")
+
+
+class Client(object):
+    """
+    A connection to the daemon listening on the Unix socket at path.
+
+    Requests and responses are single lines of JSON, several requests can be
+    sent over one connection. Paths are sent as absolute paths since the
+    daemon runs in a different working directory.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET, *, timeout: float | None = None):
+        self.path: str = path
+        try:
+            self._socket: socket.socket = socket.socket(socket.AF_UNIX)
+        except (AttributeError, OSError) as error:
+            raise DaemonUnavailable(f"unix sockets are not supported: {error}")
+
+        self._socket.settimeout(timeout)
+        try:
+            check_owner(path)
+            self._socket.connect(path)
+            _check_peer(self._socket)
+        except PermissionError as error:
+            self._socket.close()
+            raise DaemonUnavailable(f"the daemon on {path} is not trusted: {error}")
+        except OSError as error:
+            self._socket.close()
+            raise DaemonUnavailable(f"no daemon is listening on {path}: {error}")
+        self._file = self._socket.makefile("rwb")
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def request(self, **request: Any) -> dict[str, Any]:
+        """
+        Sends request and returns the response of the daemon.
+
+        Raises DaemonUnavailable when the daemon runs another version of the
+        parser, whose html could differ from a conversion in this process.
+        """
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line: bytes = self._file.readline()
+        if not line:
+            raise DaemonUnavailable(f"the daemon on {self.path} closed the connection")
+
+        response: dict[str, Any] = json.loads(line)
+        if response.get("version") != __version__:
+            raise DaemonUnavailable(
+                f"the daemon on {self.path} runs version {response.get('version')}"
+            )
+        return response
+
+    def ping(self) -> bool:
+        return self.request(op="ping")["ok"]
+
+    def convert(self, source: str, output: str, encoding: str = "utf-8") -> str | None:
+        """
+        Has the daemon convert the file at source into output and returns the
+        error, None on success
+        """
+        response: dict[str, Any] = self.request(
+            op="convert",
+            source=abspath(source),
+            output=abspath(output),
+            encoding=encoding,
+        )
+        return response.get("error")
+
+    def render(self, markdown: str) -> str:
+        """
+        Returns the html of the markdown text
+        """
+        response: dict[str, Any] = self.request(op="render", text=markdown)
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response["html"]
+
+    def shutdown(self):
+        self.request(op="shutdown")
+
+
+def convert_with_daemon(
+    source: str,
+    output: str,
+    encoding: str = "utf-8",
+    socket_path: str = DEFAULT_SOCKET,
+) -> str | None:
+    """
+    Converts source into output using the daemon and returns the error, None
+    on success.
+
+    Raises DaemonUnavailable when there is no compatible daemon, in which
+    case the caller converts the file itself.
+    """
+    with Client(socket_path) as client:
+        return client.convert(source, output, encoding)
+
+
+def _check_peer(connection: socket.socket):
+    """
+    Raises PermissionError unless the process at the other end of connection
+    runs as the current user, where the platform tells
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return
+    credentials: bytes = connection.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, uid, _ = struct.unpack("3i", credentials)
+    if uid != os.getuid():
+        raise PermissionError(f"the daemon runs as another user ({uid})")
@@ -0,0 +1,167 @@
+"""
+Long running conversion daemon listening on a Unix socket.
+
+Commands that run often, such as editor integrations, pay for starting the
+interpreter and importing the parser on every call. The daemon keeps a pool
+of warm worker processes, each with its parser imported and its block cache
+filled, and serves the requests of convert.client over a Unix socket.
+"""
+
+import json
+import os
+import socket
+import stat
+from concurrent.futures import Executor, ProcessPoolExecutor
+from os import chmod, lstat, makedirs, remove
+from os.path import dirname, exists
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+from threading import Thread
+from typing import Any
+
+from convert.batch import Result, _init_cache, convert_file, convert_text
+from convert.client import DEFAULT_SOCKET, check_owner
+from parsing import __version__
+
+# number of rendered blocks cached by every worker unless told otherwise
+CACHE_SIZE: int = 4096
+
+
+class _Handler(StreamRequestHandler):
+    server: "Daemon"
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response: dict[str, Any] = self.server.dispatch(json.loads(line))
+            except Exception as error:
+                response = {"ok": False, "error": f"{type(error).__name__}: {error}"}
+            response["version"] = __version__
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class Daemon(ThreadingUnixStreamServer):
+    """
+    Serves conversions on the Unix socket at path with a pool of jobs worker
+    processes, each caching cache_size rendered blocks.
+
+    Every connection is handled by a thread that hands the work to the pool,
+    so the workers are kept busy by concurrent clients.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SOCKET,
+        *,
+        jobs: int = 1,
+        cache_size: int = CACHE_SIZE,
+    ):
+        _prepare_directory(path)
+        _remove_stale_socket(path)
+        super().__init__(path, _Handler)
+        self.path: str = path
+        self.executor: Executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_cache, initargs=(cache_size,)
+        )
+        # start every worker now rather than on the first requests
+        for future in [self.executor.submit(_ready) for _ in range(jobs)]:
+            future.result()
+
+    def server_bind(self):
+        super().server_bind()
+        # the daemon reads and writes files as the user, nobody else may
+        # send it requests
+        chmod(self.server_address, 0o600)
+
+    def dispatch(self, request: dict[str, Any]) -> dict[str, Any]:
+        """
+        Runs a request and returns the response, see convert.client.Client
+        """
+        op: str = request["op"]
+        if op == "ping":
+            return {"ok": True}
+        if op == "convert":
+            result: Result = self.executor.submit(
+                convert_file,
+                request["source"],
+                request["output"],
+                request.get("encoding", "utf-8"),
+            ).result()
+            return {"ok": result.error is None, "error": result.error}
+        if op == "render":
+            html: str = self.executor.submit(convert_text, request["text"]).result()
+            return {"ok": True, "html": html}
+        if op == "shutdown":
+            # shutdown waits for serve_forever, which waits for this request
+            Thread(target=self.shutdown).start()
+            return {"ok": True}
+        raise ValueError(f"unknown op {op}")
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown()
+        if exists(self.path):
+            remove(self.path)
+
+
+def _ready() -> bool:
+    return True
+
+
+def _prepare_directory(path: str):
+    """
+    Creates the directory of the socket at path so that only the user can
+    use it, or checks that other users can neither replace nor remove the
+    socket of an existing one
+    """
+    directory: str = dirname(path) or "."
+    makedirs(directory, mode=0o700, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return
+
+    stats = lstat(directory)
+    if stats.st_uid not in (os.getuid(), 0):
+        raise PermissionError(f"{directory} belongs to another user")
+    # shared directories like /tmp are fine as long as only owners can remove
+    # their files
+    if stats.st_mode & 0o022 and not stats.st_mode & stat.S_ISVTX:
+        raise PermissionError(f"{directory} can be written by other users")
+
+
+def _remove_stale_socket(path: str):
+    """
+    Removes the socket left behind at path by a daemon that is gone, raising
+    FileExistsError if a daemon is still listening on it or if path is not a
+    socket
+    """
+    try:
+        mode: int = lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket")
+    check_owner(path)
+
+    probe: socket.socket = socket.socket(socket.AF_UNIX)
+    try:
+        probe.connect(path)
+    except OSError:
+        remove(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError(f"a daemon is already listening on {path}")
+
+
+def serve(path: str = DEFAULT_SOCKET, *, jobs: int = 1, cache_size: int = CACHE_SIZE):
+    """
+    Runs a daemon until it is sent a shutdown request or interrupted
+    """
+    with Daemon(path, jobs=jobs, cache_size=cache_size) as daemon:
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
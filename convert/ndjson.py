@@ -0,0 +1,113 @@
+"""
+Conversion of newline delimited JSON records, one markdown text per line.
+
+Every input line is an object with an "id" and the "markdown" to convert,
+every output line an object with the same "id" and either the "html" or the
+"error" that stopped the conversion:
+
+    {"id": 1, "markdown": "*hi*"}    ->    {"id": 1, "html": "<html>..."}
+"""
+
+import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Any, Iterable, Iterator
+
+from convert.batch import _init_cache, convert_text
+
+# number of records handed to a worker process at a time, records are short
+# so sending them one by one would cost more than converting them
+CHUNK_SIZE: int = 256
+
+# chunks that are converted ahead of the output per worker, this bounds the
+# memory used when the output is consumed more slowly than it is converted
+CHUNKS_AHEAD: int = 4
+
+
+def convert_record(line: str | bytes) -> str:
+    """
+    Converts a single JSON record and returns the JSON result without a line
+    break. Invalid records give an error result rather than raising, so one
+    broken record does not stop the stream.
+    """
+    record_id: Any = None
+    try:
+        record: Any = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("the record is not an object")
+        record_id = record.get("id")
+        markdown: Any = record.get("markdown")
+        if not isinstance(markdown, str):
+            raise ValueError('the record has no "markdown" text')
+        html: str = convert_text(markdown)
+    except Exception as error:
+        result: dict[str, Any] = {
+            "id": record_id,
+            "error": f"{type(error).__name__}: {error}",
+        }
+        return json.dumps(result, ensure_ascii=False)
+
+    return json.dumps({"id": record_id, "html": html}, ensure_ascii=False)
+
+
+def convert_records(
+    lines: Iterable[str | bytes],
+    *,
+    jobs: int = 1,
+    cache_size: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Lazily converts every record of lines and yields the results in input
+    order. Blank lines are skipped.
+
+    When jobs is greater than one the records are converted in chunks of
+    chunk_size by a pool of that many processes. Only a few chunks per
+    process are read ahead of the output, so streams of any length can be
+    converted. A cache_size greater than zero keeps that many rendered blocks
+    per process, see convert_all.
+    """
+    records: Iterator[str | bytes] = (line for line in lines if line.strip())
+
+    if jobs <= 1:
+        _init_cache(cache_size)
+        yield from map(convert_record, records)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_cache, initargs=(cache_size,)
+    ) as executor:
+        pending: deque[Future[list[str]]] = deque()
+        while chunk := list(islice(records, chunk_size)):
+            pending.append(executor.submit(_convert_chunk, chunk))
+            if len(pending) >= jobs * CHUNKS_AHEAD:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def convert_stream(
+    source: IO[bytes],
+    output: IO[bytes],
+    *,
+    jobs: int = 1,
+    cache_size: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """
+    Converts the records read from source and writes the results to output as
+    UTF-8, returning the number of records converted
+    """
+    count: int = 0
+    for result in convert_records(
+        source, jobs=jobs, cache_size=cache_size, chunk_size=chunk_size
+    ):
+        output.write(result.encode("utf-8") + b"\n")
+        count += 1
+    output.flush()
+    return count
+
+
+def _convert_chunk(lines: list[str | bytes]) -> list[str]:
+    return list(map(convert_record, lines))
@@ -0,0 +1,137 @@
+"""
+Tests for batch conversion
+"""
+
+import subprocess
+import sys
+import unittest
+from os import listdir, makedirs, symlink
+from os.path import abspath, dirname, islink, join
+from tempfile import TemporaryDirectory
+from convert.batch import collect_inputs, convert_all
+
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.root: str = self._directory.name
+        self.docs: str = join(self.root, "docs")
+        self.out: str = join(self.root, "out")
+
+        self.write("docs/index.md", "# index\n")
+        self.write("docs/guide/intro.md", "intro\n")
+        self.write("docs/guide/notes.txt", "not markdown\n")
+        with open(join(self.docs, "broken.md"), "wb") as file:
+            file.write(b"\xff\xfe not utf-8\n")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def write(self, path: str, text: str):
+        path = join(self.root, path)
+        makedirs(path.rsplit("/", 1)[0], exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def read(self, path: str) -> str:
+        with open(join(self.root, path), encoding="utf-8") as file:
+            return file.read()
+
+    def test_collect_inputs(self):
+        inputs = collect_inputs([self.docs])
+        self.assertEqual(
+            [relative for _, relative in inputs],
+            ["broken.md", "index.md", "guide/intro.md"],
+        )
+
+        inputs = collect_inputs([join(self.docs, "**", "*.md")])
+        self.assertEqual(
+            [relative for _, relative in inputs],
+            ["broken.md", "guide/intro.md", "index.md"],
+        )
+
+        inputs = collect_inputs([join(self.docs, "guide", "intro.md")])
+        self.assertEqual(inputs, [(join(self.docs, "guide", "intro.md"), "intro.md")])
+
+    def run_batch(self, jobs: int, cache_size: int = 0):
+        results = list(
+            convert_all([self.docs], self.out, jobs=jobs, cache_size=cache_size)
+        )
+
+        self.assertEqual(len(results), 3)
+        failed = [result for result in results if result.error is not None]
+        self.assertEqual(
+            [result.source for result in failed], [join(self.docs, "broken.md")]
+        )
+
+        self.assertEqual(
+            self.read("out/index.html"), "<html><body><h1>index</h1></body></html>"
+        )
+        self.assertEqual(
+            self.read("out/guide/intro.html"), "<html><body><p>intro</p></body></html>"
+        )
+
+    def test_failed_conversion_keeps_output(self):
+        self.write("out/broken.html", "old")
+        for cache_size in (0, 16):
+            results = list(convert_all([self.docs], self.out, cache_size=cache_size))
+            self.assertIsNotNone(results[0].error)
+            self.assertEqual(self.read("out/broken.html"), "old")
+            self.assertEqual(
+                sorted(listdir(self.out)), ["broken.html", "guide", "index.html"]
+            )
+
+    def test_output_links_are_kept(self):
+        makedirs(join(self.out, "guide"))
+        self.write("target.html", "old")
+        symlink(join(self.root, "target.html"), join(self.out, "guide", "intro.html"))
+
+        list(convert_all([self.docs], self.out))
+        self.assertTrue(islink(join(self.out, "guide", "intro.html")))
+        self.assertEqual(
+            self.read("target.html"), "<html><body><p>intro</p></body></html>"
+        )
+
+    def test_same_output(self):
+        self.write("other/index.md", "# other\n")
+        paths: list[str] = [join(self.docs, "index.md"), join(self.root, "other")]
+        for jobs in (1, 2):
+            results = list(convert_all(paths, self.out, jobs=jobs))
+            self.assertIsNone(results[0].error)
+            self.assertIn("FileExistsError", results[1].error)
+            with open(join(self.out, "index.html"), encoding="utf-8") as file:
+                self.assertEqual(
+                    file.read(), "<html><body><h1>index</h1></body></html>"
+                )
+
+    def test_command_inputs(self):
+        command: list[str] = [
+            sys.executable,
+            join(dirname(dirname(abspath(__file__))), "markdownp.py"),
+        ]
+        missing: str = join(self.docs, "missing.md")
+
+        completed = subprocess.run(command + [missing], capture_output=True)
+        self.assertEqual(completed.returncode, 1)
+        self.assertEqual(
+            completed.stderr.decode(), f"markdownp: {missing}: No such file\n"
+        )
+
+        # a directory is several files and needs somewhere to put them
+        completed = subprocess.run(command + [self.docs], capture_output=True)
+        self.assertEqual(completed.returncode, 2)
+        self.assertIn(b"--output-dir is required", completed.stderr)
+
+    def test_serial(self):
+        self.run_batch(jobs=1)
+
+    def test_process_pool(self):
+        self.run_batch(jobs=2)
+
+    def test_cache(self):
+        self.run_batch(jobs=1, cache_size=16)
+        self.run_batch(jobs=2, cache_size=16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for incremental builds
+"""
+
+import unittest
+from os import makedirs, remove, rename, utime
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from unittest import mock
+from convert import build
+
+
+class BuildTests(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.root: str = self._directory.name
+        self.docs: str = join(self.root, "docs")
+        self.out: str = join(self.root, "out")
+
+        self.write("docs/a.md", "# a\n")
+        self.write("docs/b.md", "b\n")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def write(self, path: str, text: str):
+        path = join(self.root, path)
+        makedirs(path.rsplit("/", 1)[0], exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def built(self) -> list[str]:
+        report = build.build([self.docs], self.out)
+        return [result.source.rsplit("/", 1)[1] for result in report.results]
+
+    def test_only_changed_files_are_built(self):
+        self.assertEqual(self.built(), ["a.md", "b.md"])
+        self.assertEqual(self.built(), [])
+
+        self.write("docs/b.md", "changed\n")
+        self.assertEqual(self.built(), ["b.md"])
+
+        with open(join(self.out, "b.html"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), "<html><body><p>changed</p></body></html>")
+
+    def test_touched_files_are_not_built(self):
+        self.built()
+        utime(join(self.docs, "a.md"), ns=(0, 0))
+
+        report = build.build([self.docs], self.out)
+        self.assertEqual((report.results, report.skipped), ([], 2))
+
+    def test_parser_version_change_rebuilds_everything(self):
+        self.built()
+        with mock.patch.object(build, "__version__", "next"):
+            self.assertEqual(self.built(), ["a.md", "b.md"])
+
+    def test_missing_output_is_rebuilt(self):
+        self.built()
+        remove(join(self.out, "a.html"))
+        self.assertEqual(self.built(), ["a.md"])
+
+    def test_deleted_source_removes_output(self):
+        self.built()
+        remove(join(self.docs, "a.md"))
+
+        report = build.build([self.docs], self.out)
+        self.assertEqual(report.removed, 1)
+        self.assertFalse(exists(join(self.out, "a.html")))
+
+    def test_renamed_source_keeps_output(self):
+        self.built()
+        rename(join(self.docs, "a.md"), join(self.docs, "a.markdown"))
+
+        report = build.build([self.docs], self.out)
+        self.assertEqual(report.removed, 0)
+        with open(join(self.out, "a.html"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), "<html><body><h1>a</h1></body></html>")
+        self.assertEqual(self.built(), [])
+
+    def test_deleted_listed_source(self):
+        source: str = join(self.docs, "a.md")
+        build.build([source], self.out)
+        remove(source)
+
+        report = build.build([source], self.out)
+        self.assertEqual(len(report.results), 1)
+        self.assertIn("FileNotFoundError", report.results[0].error)
+        self.assertEqual(report.removed, 1)
+
+    def test_encoding_change_rebuilds_everything(self):
+        self.built()
+        report = build.build([self.docs], self.out, encoding="latin-1")
+        self.assertEqual(len(report.results), 2)
+        self.assertEqual(self.built(), ["a.md", "b.md"])
+
+    def test_same_output(self):
+        self.write("other/a.md", "other\n")
+        paths: list[str] = [join(self.docs, "a.md"), join(self.root, "other", "a.md")]
+        for _ in range(2):
+            report = build.build(paths, self.out)
+            self.assertIn("FileExistsError", report.results[-1].error)
+        with open(join(self.out, "a.html"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), "<html><body><h1>a</h1></body></html>")
+
+    def test_watch(self):
+        reports = build.watch([self.docs], self.out, interval=0)
+        self.assertEqual(len(next(reports).results), 2)
+
+        self.write("docs/c.md", "c\n")
+        self.assertEqual(len(next(reports).results), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
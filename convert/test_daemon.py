@@ -0,0 +1,129 @@
+"""
+Tests for the conversion daemon and its client
+"""
+
+import os
+import socket
+import unittest
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import mock
+from convert import client
+from convert.client import Client, DaemonUnavailable, convert_with_daemon
+from convert.daemon import Daemon
+
+
+class DaemonTests(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.root: str = self._directory.name
+        self.socket: str = join(self.root, "daemon.sock")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def start(self) -> Daemon:
+        daemon: Daemon = Daemon(self.socket, jobs=1, cache_size=16)
+        thread: Thread = Thread(target=daemon.serve_forever)
+        thread.start()
+
+        def stop():
+            daemon.shutdown()
+            thread.join()
+            daemon.server_close()
+
+        self.addCleanup(stop)
+        return daemon
+
+    def test_convert(self):
+        self.start()
+        source: str = join(self.root, "a.md")
+        output: str = join(self.root, "out", "a.html")
+        with open(source, "w", encoding="utf-8") as file:
+            file.write("# title\n\n*text*\n")
+
+        self.assertIsNone(convert_with_daemon(source, output, socket_path=self.socket))
+        with open(output, encoding="utf-8") as file:
+            self.assertEqual(
+                file.read(),
+                "<html><body><h1>title</h1><p><em>text</em></p></body></html>",
+            )
+
+        error: str | None = convert_with_daemon(
+            join(self.root, "missing.md"), output, socket_path=self.socket
+        )
+        self.assertIn("FileNotFoundError", error)
+
+    def test_render(self):
+        self.start()
+        with Client(self.socket) as daemon:
+            self.assertTrue(daemon.ping())
+            # the same connection serves several requests
+            for _ in range(2):
+                self.assertEqual(
+                    daemon.render("some `code`\n"),
+                    "<html><body><p>some <code>code</code></p></body></html>",
+                )
+            self.assertFalse(daemon.request(op="unknown")["ok"])
+
+    def test_no_daemon(self):
+        with self.assertRaises(DaemonUnavailable):
+            Client(self.socket)
+
+    def test_other_version(self):
+        self.start()
+        with Client(self.socket) as daemon:
+            with mock.patch.object(client, "__version__", "next"):
+                with self.assertRaises(DaemonUnavailable):
+                    daemon.ping()
+
+    def test_shutdown(self):
+        daemon: Daemon = Daemon(self.socket, jobs=1)
+        thread: Thread = Thread(target=daemon.serve_forever)
+        thread.start()
+
+        with Client(self.socket) as connection:
+            connection.shutdown()
+        thread.join()
+        daemon.server_close()
+        self.assertFalse(exists(self.socket))
+
+    def test_running_daemon(self):
+        self.start()
+        with self.assertRaises(FileExistsError):
+            Daemon(self.socket)
+
+    def test_stale_socket(self):
+        # a socket file nobody listens on is replaced
+        stale: socket.socket = socket.socket(socket.AF_UNIX)
+        stale.bind(self.socket)
+        stale.close()
+
+        self.start()
+        with Client(self.socket) as daemon:
+            self.assertTrue(daemon.ping())
+
+    def test_other_files_are_kept(self):
+        with open(self.socket, "w") as file:
+            file.write("notes")
+
+        with self.assertRaises(FileExistsError):
+            Daemon(self.socket)
+        with open(self.socket) as file:
+            self.assertEqual(file.read(), "notes")
+
+    def test_socket_of_another_user(self):
+        self.start()
+        with mock.patch.object(client.os, "getuid", return_value=os.getuid() + 1):
+            with self.assertRaises(DaemonUnavailable):
+                Client(self.socket)
+
+    def test_socket_directory(self):
+        directory: str = join(self.root, "private")
+        Daemon(join(directory, "daemon.sock"), jobs=1).server_close()
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+
+        os.chmod(directory, 0o777)
+        with self.assertRaises(PermissionError):
+            Daemon(join(directory, "daemon.sock"), jobs=1)
@@ -0,0 +1,87 @@
+"""
+Tests for the conversion of newline delimited JSON records
+"""
+
+import json
+import subprocess
+import sys
+import unittest
+from io import BytesIO
+from os.path import abspath, dirname, join
+from convert.batch import convert_text
+from convert.ndjson import convert_record, convert_records, convert_stream
+
+
+def _record(record_id, markdown: str) -> str:
+    return json.dumps({"id": record_id, "markdown": markdown})
+
+
+class NdjsonTests(unittest.TestCase):
+    def test_convert_record(self):
+        result: dict = json.loads(convert_record(_record("a", "*é*\n")))
+        self.assertEqual(
+            result,
+            {"id": "a", "html": "<html><body><p><em>é</em></p></body></html>"},
+        )
+
+    def test_errors(self):
+        for line, record_id, error in (
+            ("not json", None, "JSONDecodeError"),
+            ("[1]", None, "ValueError"),
+            ('{"id": 3}', 3, "ValueError"),
+            ('{"id": 4, "markdown": 5}', 4, "ValueError"),
+            (_record(5, "1. list\n"), 5, "SyntaxError"),
+        ):
+            with self.subTest(line=line):
+                result: dict = json.loads(convert_record(line))
+                self.assertEqual(result["id"], record_id)
+                self.assertTrue(result["error"].startswith(error + ":"))
+                self.assertNotIn("html", result)
+
+    def test_order_with_workers(self):
+        texts: list[str] = [f"# {index}\n\n*text* {index}\n" for index in range(50)]
+        lines: list[str] = [_record(index, text) for index, text in enumerate(texts)]
+        lines.insert(10, "broken\n")
+        lines.insert(20, "\n")
+
+        results: list[dict] = list(
+            map(json.loads, convert_records(lines, jobs=2, chunk_size=3))
+        )
+        self.assertEqual(len(results), 51)
+        self.assertIn("error", results.pop(10))
+        self.assertEqual([result["id"] for result in results], list(range(50)))
+        self.assertEqual(
+            [result["html"] for result in results], list(map(convert_text, texts))
+        )
+
+    def test_convert_stream(self):
+        source: BytesIO = BytesIO(
+            (_record(1, "one\n") + "\n" + _record(2, "two\n") + "\n").encode()
+        )
+        output: BytesIO = BytesIO()
+
+        self.assertEqual(convert_stream(source, output), 2)
+        self.assertEqual(
+            output.getvalue().decode().splitlines(),
+            [
+                '{"id": 1, "html": "<html><body><p>one</p></body></html>"}',
+                '{"id": 2, "html": "<html><body><p>two</p></body></html>"}',
+            ],
+        )
+
+    def test_command(self):
+        root: str = dirname(dirname(abspath(__file__)))
+        completed = subprocess.run(
+            [sys.executable, join(root, "markdownp.py"), "--ndjson"],
+            input=(_record("x", "# hi\n") + "\n").encode(),
+            capture_output=True,
+            check=True,
+        )
+        self.assertEqual(
+            json.loads(completed.stdout),
+            {"id": "x", "html": "<html><body><h1>hi</h1></body></html>"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
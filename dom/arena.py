@@ -0,0 +1,208 @@
+"""
+Compact storage for many DOM trees
+"""
+
+from array import array
+from typing import Iterable, Iterator, Union
+
+from dom.renderer import BUFFER_SIZE, DOM, Writable, _write_chunks, start_tag
+
+# tag id used for text nodes
+TEXT: int = -1
+
+
+class Arena(object):
+    """
+    Stores the nodes of any number of DOM trees in a few flat arrays.
+
+    Every node is a single index. Element nodes store an interned tag id and
+    the range of their children in the shared edge array, text nodes store the
+    index of their string. A tree is referred to by the index of its root
+    node, which is returned when it is added.
+    """
+
+    def __init__(self: "Arena"):
+        # tag table, tag ids are indexes into it
+        self._tags: list[str] = []
+        self._tag_ids: dict[str, int] = {}
+
+        # per node columns
+        self._kinds: array[int] = array("i")  # tag id or TEXT
+        self._starts: array[int] = array("I")  # first edge or text index
+        self._counts: array[int] = array("I")  # number of children
+
+        # children of a node are stored contiguously in edges
+        self._edges: array[int] = array("I")
+        self._texts: list[str] = []
+        # attributes of the few elements that have any, by handle
+        self._attributes: dict[int, dict[str, str]] = {}
+
+    def __len__(self) -> int:
+        """
+        Returns the number of nodes stored in the arena
+        """
+        return len(self._kinds)
+
+    def add(self, tree: DOM) -> int:
+        """
+        Copies a DOM into the arena and returns the handle of its root
+        """
+        # post order walk with an explicit stack, each frame keeps the
+        # handles of the children that have already been stored
+        frames: list[tuple[DOM, Iterator[Union[DOM, str]], list[int]]] = [
+            (tree, iter(tree.children), [])
+        ]
+
+        while True:
+            node, children, handles = frames[-1]
+            for child in children:
+                if isinstance(child, DOM):
+                    frames.append((child, iter(child.children), []))
+                    break
+                handles.append(self._add_text(str(child)))
+            else:
+                frames.pop()
+                handle: int = self._add_element(node.element, handles, node.attributes)
+                if not frames:
+                    return handle
+                frames[-1][2].append(handle)
+
+    def add_blocks(
+        self, blocks: Iterable[DOM], *, ancestors: tuple[str, ...] = ("html", "body")
+    ) -> int:
+        """
+        Builds a document from lazily produced top level blocks, for example
+        from Parser.iter_blocks, without creating the full DOM first.
+        """
+        handles: list[int] = [self.add(block) for block in blocks]
+        for element in reversed(ancestors):
+            handles = [self._add_element(element, handles)]
+        return handles[0]
+
+    def attributes(self, handle: int) -> dict[str, str] | None:
+        """
+        Returns the attributes of an element node, None if it has none
+        """
+        return self._attributes.get(handle)
+
+    def tag(self, handle: int) -> str | None:
+        """
+        Returns the tag of an element node or None for a text node
+        """
+        kind: int = self._kinds[handle]
+        return None if kind == TEXT else self._tags[kind]
+
+    def text(self, handle: int) -> str:
+        """
+        Returns the string stored in a text node
+        """
+        if self._kinds[handle] != TEXT:
+            raise ValueError(f"Node {handle} is not a text node")
+        return self._texts[self._starts[handle]]
+
+    def children(self, handle: int) -> array:
+        """
+        Returns the handles of the children of a node
+        """
+        start: int = self._starts[handle]
+        if self._kinds[handle] == TEXT:
+            return self._edges[0:0]
+        return self._edges[start : start + self._counts[handle]]
+
+    def to_dom(self, handle: int) -> Union[DOM, str]:
+        """
+        Rebuilds a regular DOM from the tree rooted at handle
+        """
+        if self._kinds[handle] == TEXT:
+            return self._texts[self._starts[handle]]
+
+        root: DOM = DOM(
+            self._tags[self._kinds[handle]], attributes=self._attributes.get(handle)
+        )
+        stack: list[tuple[int, DOM]] = [(handle, root)]
+
+        while stack:
+            handle, node = stack.pop()
+            for child in self.children(handle):
+                kind: int = self._kinds[child]
+                if kind == TEXT:
+                    node.children.append(self._texts[self._starts[child]])
+                    continue
+                child_node: DOM = DOM(
+                    self._tags[kind], attributes=self._attributes.get(child)
+                )
+                node.children.append(child_node)
+                stack.append((child, child_node))
+
+        return root
+
+    def iter_render(self, handle: int) -> Iterator[str]:
+        """
+        Lazily yields the html of the tree rooted at handle, reading directly
+        from the arena.
+        """
+        tags: list[str] = self._tags
+        texts: list[str] = self._texts
+        kinds: array[int] = self._kinds
+        starts: array[int] = self._starts
+        counts: array[int] = self._counts
+        edges: array[int] = self._edges
+        attributes: dict[int, dict[str, str]] = self._attributes
+
+        # positive entries are nodes to visit, closing tags are stored as
+        # the bitwise complement of the node handle
+        stack: list[int] = [handle]
+
+        while stack:
+            handle = stack.pop()
+
+            if handle < 0:
+                yield f"</{tags[kinds[~handle]]}>"
+                continue
+
+            kind: int = kinds[handle]
+            if kind == TEXT:
+                yield texts[starts[handle]]
+                continue
+
+            if handle in attributes:
+                yield start_tag(tags[kind], attributes[handle])
+            else:
+                yield f"<{tags[kind]}>"
+            stack.append(~handle)
+            start: int = starts[handle]
+            stack.extend(reversed(edges[start : start + counts[handle]]))
+
+    def render(self, handle: int) -> str:
+        return "".join(self.iter_render(handle))
+
+    def render_to(
+        self, handle: int, writable: Writable, *, buffer_size: int = BUFFER_SIZE
+    ):
+        _write_chunks(self.iter_render(handle), writable, buffer_size)
+
+    def _add_text(self, text: str) -> int:
+        self._kinds.append(TEXT)
+        self._starts.append(len(self._texts))
+        self._counts.append(0)
+        self._texts.append(text)
+        return len(self._kinds) - 1
+
+    def _add_element(
+        self,
+        element: str,
+        children: list[int],
+        attributes: dict[str, str] | None = None,
+    ) -> int:
+        tag_id: int | None = self._tag_ids.get(element)
+        if tag_id is None:
+            tag_id = self._tag_ids[element] = len(self._tags)
+            self._tags.append(element)
+
+        self._kinds.append(tag_id)
+        self._starts.append(len(self._edges))
+        self._counts.append(len(children))
+        self._edges.extend(children)
+        if attributes:
+            self._attributes[len(self._kinds) - 1] = dict(attributes)
+        return len(self._kinds) - 1
@@ -0,0 +1,288 @@
+"""
+Compact binary encoding of DOM trees.
+
+An encoded tree, or sequence of trees such as the top level blocks of a
+document, is a header followed by flat little endian arrays. They are cheaper
+to write, send between processes and read back than pickled DOM objects and
+can be rendered without rebuilding the DOM:
+
+    magic        b"MDOM"
+    header       u8 version, 3 reserved bytes, then u32 counts of tags,
+                 nodes, attribute strings and elements with attributes
+    kinds        i16 per node in pre order, the tag id or TEXT
+    sizes        u32 per node, the number of children of an element or the
+                 length of a text in characters
+    attributes   u32 node index and u32 number of pairs per element that has
+                 attributes
+    lengths      u32 per tag and attribute string, its length in characters
+    strings      UTF-8 of all strings joined: the tag table, the text nodes in
+                 pre order and then the attribute names and values
+"""
+
+import struct
+from array import array
+from itertools import accumulate, chain
+from sys import byteorder, intern
+from typing import Iterable, Iterator, Union
+
+from dom.renderer import BUFFER_SIZE, DOM, Writable, _write_chunks, start_tag
+
+MAGIC: bytes = b"MDOM"
+
+# version of the layout, bump on every incompatible change
+FORMAT_VERSION: int = 1
+
+# kind of text nodes
+TEXT: int = -1
+
+# tag ids have to fit into the i16 kinds
+_MAX_TAGS: int = 2**15 - 1
+
+_HEADER: struct.Struct = struct.Struct("<4sB3xIIII")
+
+
+class EncodedTree(object):
+    """
+    A decoded view of encoded trees, which can be rendered directly or
+    turned back into DOM objects.
+    """
+
+    def __init__(self, data: bytes | bytearray | memoryview):
+        if len(data) < _HEADER.size:
+            raise ValueError("data is too short to be an encoded DOM")
+        magic, version, tag_count, node_count, string_count, attribute_count = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != MAGIC:
+            raise ValueError("data is not an encoded DOM")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported encoded DOM version {version}")
+
+        view: memoryview = memoryview(data)
+        offset: int = _HEADER.size
+        self.kinds: array[int] = _read_array("h", view, offset, node_count)
+        offset += 2 * node_count
+        self.sizes: array[int] = _read_array("I", view, offset, node_count)
+        offset += 4 * node_count
+        attribute_records: array[int] = _read_array(
+            "I", view, offset, 2 * attribute_count
+        )
+        offset += 8 * attribute_count
+        lengths: array[int] = _read_array(
+            "I", view, offset, tag_count + string_count
+        )
+        offset += 4 * (tag_count + string_count)
+
+        # the strings are cut out of the blob in the order they were joined
+        blob: str = str(view[offset:], "utf-8")
+        text_lengths: list[int] = [
+            size for kind, size in zip(self.kinds, self.sizes) if kind == TEXT
+        ]
+        ends: list[int] = list(
+            accumulate(chain(lengths[:tag_count], text_lengths, lengths[tag_count:]))
+        )
+        if (ends[-1] if ends else 0) != len(blob):
+            raise ValueError("the strings of the encoded DOM are corrupt")
+        strings: list[str] = [
+            blob[start:end] for start, end in zip([0, *ends], ends)
+        ]
+
+        self.tags: list[str] = [intern(tag) for tag in strings[:tag_count]]
+        position: int = tag_count + len(text_lengths)
+        self.texts: list[str] = strings[tag_count:position]
+
+        # attributes by node index
+        self.attributes: dict[int, dict[str, str]] = {}
+        for index in range(attribute_count):
+            node, count = attribute_records[2 * index : 2 * index + 2]
+            names_values: list[str] = strings[position : position + 2 * count]
+            self.attributes[node] = dict(zip(names_values[::2], names_values[1::2]))
+            position += 2 * count
+
+    def to_dom(self) -> Union[DOM, str]:
+        """
+        Rebuilds the encoded tree as a DOM
+        """
+        trees: list[Union[DOM, str]] = self.to_blocks()
+        if len(trees) != 1:
+            raise ValueError("the encoded DOM is not a single tree")
+        return trees[0]
+
+    def to_blocks(self) -> list[Union[DOM, str]]:
+        """
+        Rebuilds all of the encoded trees in order
+        """
+        kinds: array[int] = self.kinds
+        sizes: array[int] = self.sizes
+        tags: list[str] = self.tags
+        attributes: dict[int, dict[str, str]] = self.attributes
+        texts: list[str] = list(self.texts)
+
+        # the nodes are built from the last one to the first, so the children
+        # of an element are the finished subtrees on top of the stack, the
+        # first child topmost
+        stack: list[Union[DOM, str]] = []
+        for index in range(len(kinds) - 1, -1, -1):
+            kind: int = kinds[index]
+            if kind == TEXT:
+                stack.append(texts.pop())
+                continue
+
+            count: int = sizes[index]
+            if count > len(stack):
+                raise ValueError("the encoded DOM is corrupt")
+            children: list[Union[DOM, str]] = []
+            if count:
+                children = stack[-count:]
+                children.reverse()
+                del stack[-count:]
+            stack.append(
+                DOM(tags[kind], children=children, attributes=attributes.get(index))
+            )
+
+        # the first tree ends up on top
+        stack.reverse()
+        return stack
+
+    def iter_render(self) -> Iterator[str]:
+        """
+        Lazily yields the html of the encoded trees without building the DOM
+        """
+        tags: list[str] = self.tags
+        sizes: array[int] = self.sizes
+        attributes: dict[int, dict[str, str]] = self.attributes
+        texts: Iterator[str] = iter(self.texts)
+
+        # the open elements as [tag, number of children still to render]
+        parents: list[list] = []
+        for index, kind in enumerate(self.kinds):
+            if kind == TEXT:
+                yield next(texts)
+            elif index in attributes:
+                yield start_tag(tags[kind], attributes[index])
+            else:
+                yield f"<{tags[kind]}>"
+
+            if kind != TEXT and sizes[index]:
+                parents.append([tags[kind], sizes[index]])
+                continue
+            if kind != TEXT:
+                yield f"</{tags[kind]}>"
+
+            # close the elements whose last child this was
+            while parents:
+                parent: list = parents[-1]
+                parent[1] -= 1
+                if parent[1]:
+                    break
+                parents.pop()
+                yield f"</{parent[0]}>"
+
+    def render(self) -> str:
+        return "".join(self.iter_render())
+
+    def render_to(self, writable: Writable, *, buffer_size: int = BUFFER_SIZE):
+        _write_chunks(self.iter_render(), writable, buffer_size)
+
+
+def encode(tree: DOM) -> bytes:
+    """
+    Returns the binary encoding of tree
+    """
+    return encode_blocks([tree])
+
+
+def encode_blocks(blocks: Iterable[Union[DOM, str]]) -> bytes:
+    """
+    Returns the binary encoding of a sequence of trees, for example the top
+    level blocks of a document
+    """
+    tags: dict[str, int] = {}
+    kinds: list[int] = []
+    sizes: list[int] = []
+    texts: list[str] = []
+    attribute_records: list[int] = []
+    attribute_strings: list[str] = []
+
+    stack: list[Union[DOM, str]] = [*blocks]
+    stack.reverse()
+    while stack:
+        node: Union[DOM, str] = stack.pop()
+        if not isinstance(node, DOM):
+            kinds.append(TEXT)
+            sizes.append(len(node))
+            texts.append(node)
+            continue
+
+        tag: int | None = tags.get(node.element)
+        if tag is None:
+            tag = tags[node.element] = len(tags)
+        if node.attributes:
+            attribute_records.extend((len(kinds), len(node.attributes)))
+            for name, value in node.attributes.items():
+                attribute_strings.extend((name, value))
+        kinds.append(tag)
+        sizes.append(len(node.children))
+        stack.extend(reversed(node.children))
+
+    if len(tags) > _MAX_TAGS:
+        raise ValueError(f"more than {_MAX_TAGS} different tags can not be encoded")
+    return b"".join(
+        (
+            _HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                len(tags),
+                len(kinds),
+                len(attribute_strings),
+                len(attribute_records) // 2,
+            ),
+            _to_bytes(array("h", kinds)),
+            _to_bytes(array("I", sizes)),
+            _to_bytes(array("I", attribute_records)),
+            _to_bytes(array("I", map(len, chain(tags, attribute_strings)))),
+            "".join(chain(tags, texts, attribute_strings)).encode("utf-8"),
+        )
+    )
+
+
+def decode(data: bytes | bytearray | memoryview) -> Union[DOM, str]:
+    """
+    Returns the DOM encoded in data, raising ValueError if data is not an
+    encoded DOM of a supported version
+    """
+    return EncodedTree(data).to_dom()
+
+
+def decode_blocks(data: bytes | bytearray | memoryview) -> list[Union[DOM, str]]:
+    """
+    Returns the trees encoded in data by encode_blocks
+    """
+    return EncodedTree(data).to_blocks()
+
+
+def render_encoded(data: bytes | bytearray | memoryview) -> str:
+    """
+    Returns the html of the trees encoded in data without decoding them to
+    DOM objects
+    """
+    return EncodedTree(data).render()
+
+
+def _to_bytes(values: array) -> bytes:
+    if byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_array(
+    typecode: str, view: memoryview, offset: int, count: int
+) -> array:
+    values: array = array(typecode)
+    end: int = offset + values.itemsize * count
+    if end > len(view):
+        raise ValueError("the encoded DOM is truncated")
+    values.frombytes(view[offset:end])
+    if byteorder == "big":
+        values.byteswap()
+    return values
@@ -2,7 +2,21 @@
 Renderer for html files from DOM objects
 """
 
-from typing import Union
+from itertools import chain
+from sys import intern
+from types import coroutine
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Iterable,
+    Iterator,
+    Protocol,
+    TypeVar,
+    Union,
+)
+
+T = TypeVar("T")
 
 
 class DOM(object):
@@ -10,32 +24,257 @@ class DOM(object):
     Used to represent a node in an HTML document object model
     """
 
-    def __init__(self: "DOM", element: str, *, children: list[Union["DOM", str]] = []):
-        self.element: str = element
-        self.children: list[Union[DOM, str]] = [*children]
+    # nodes are created for every block of every document so they do not
+    # carry a __dict__
+    __slots__ = ("element", "children", "attributes")
+
+    def __init__(
+        self: "DOM",
+        element: str,
+        *,
+        children: Iterable[Union["DOM", str]] | None = None,
+        attributes: dict[str, str] | None = None,
+    ):
+        # tag names are shared between all nodes of the same type
+        self.element: str = intern(element)
+        self.children: list[Union[DOM, str]] = [] if children is None else [*children]
+        # most elements have no attributes, so None is stored instead of an
+        # empty dict
+        self.attributes: dict[str, str] | None = attributes or None
 
     def __str__(self):
-        return _build_node(self)
+        return render(self)
+
+
+class Writable(Protocol):
+    def write(self, text: str, /) -> int:
+        ...
+
+
+class AsyncWritable(Protocol):
+    def write(self, text: str, /) -> Awaitable[object]:
+        ...
+
+
+class StreamWriter(Protocol):
+    """
+    The part of asyncio.StreamWriter that is used to write html
+    """
+
+    def write(self, data: bytes, /) -> object:
+        ...
+
+    async def drain(self) -> None:
+        ...
+
+
+# number of characters collected before they are written to the sink
+BUFFER_SIZE: int = 64 * 1024
+
+
+def start_tag(element: str, attributes: dict[str, str] | None = None) -> str:
+    """
+    Returns the opening tag of an element, quoting the attribute values
+    """
+    if not attributes:
+        return f"<{element}>"
+
+    pairs: str = "".join(
+        f' {name}="{escape_attribute(value)}"' for name, value in attributes.items()
+    )
+    return f"<{element}{pairs}>"
+
+
+def escape_attribute(value: str) -> str:
+    return (
+        value.replace("&", "&amp;")
+        .replace('"', "&quot;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+    )
 
 
 def render(tree: DOM) -> str:
-    return _build_node(tree)
+    return "".join(iter_render(tree))
+
+
+def render_to(tree: DOM, writable: Writable, *, buffer_size: int = BUFFER_SIZE):
+    """
+    Writes the html for a DOM to writable without building the whole
+    document as a single string.
+
+    Chunks are collected until at least buffer_size characters are pending so
+    that the sink is not called once per tag.
+    """
+    _write_chunks(iter_render(tree), writable, buffer_size)
+
+
+def render_blocks_to(
+    blocks: Iterable[Union[DOM, str]],
+    writable: Writable,
+    *,
+    ancestors: tuple[str, ...] = ("html", "body"),
+    buffer_size: int = BUFFER_SIZE,
+):
+    """
+    Writes a document whose top level blocks are produced lazily, for example
+    by Parser.iter_blocks, wrapping them in the ancestors elements.
+
+    Each block is rendered and released before the next one is requested, so
+    memory use is bounded by the largest block rather than by the document.
+    Blocks that are str are treated as already rendered html.
+    """
+    chunks: Iterator[str] = chain(
+        (f"<{element}>" for element in ancestors),
+        chain.from_iterable(map(iter_render, blocks)),
+        (f"</{element}>" for element in reversed(ancestors)),
+    )
+    _write_chunks(chunks, writable, buffer_size)
+
 
+def _write_chunks(chunks: Iterable[str], writable: Writable, buffer_size: int):
+    """
+    Writes chunks to writable in batches of at least buffer_size characters
+    """
+    pending: list[str] = []
+    pending_size: int = 0
+
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= buffer_size:
+            writable.write("".join(pending))
+            pending.clear()
+            pending_size = 0
+
+    if pending:
+        writable.write("".join(pending))
+
+
+async def render_async(
+    tree: DOM,
+    writer: AsyncWritable | StreamWriter,
+    *,
+    encoding: str = "utf-8",
+    buffer_size: int = BUFFER_SIZE,
+):
+    """
+    Same as render_to but for asyncio.
+
+    writer is either an asyncio.StreamWriter, which is written encoded text
+    and drained, or an object with a write coroutine taking text. The event
+    loop gets control back after every buffer_size characters, so large
+    documents do not stall other tasks.
+    """
+    await _write_chunks_async(iter_render(tree), writer, encoding, buffer_size)
+
+
+async def render_blocks_async(
+    blocks: AsyncIterable[Union[DOM, str]] | Iterable[Union[DOM, str]],
+    writer: AsyncWritable | StreamWriter,
+    *,
+    ancestors: tuple[str, ...] = ("html", "body"),
+    encoding: str = "utf-8",
+    buffer_size: int = BUFFER_SIZE,
+):
+    """
+    Same as render_blocks_to but for asyncio, blocks can also be produced by
+    an async iterator such as AsyncParser.iter_blocks
+    """
+    pending: list[str] = [f"<{element}>" for element in ancestors]
+    pending_size: int = sum(map(len, pending))
+
+    async def flush():
+        nonlocal pending_size
+        await _write_async(writer, "".join(pending), encoding)
+        pending.clear()
+        pending_size = 0
+
+    if not isinstance(blocks, AsyncIterable):
+        blocks = _aiter(blocks)
+    async for block in blocks:
+        for chunk in iter_render(block):
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= buffer_size:
+                await flush()
+
+    pending.extend(f"</{element}>" for element in reversed(ancestors))
+    await flush()
 
-def _build_node(node: DOM) -> str:
+
+async def _aiter(items: Iterable[T]) -> AsyncIterator[T]:
+    for item in items:
+        yield item
+
+
+async def _write_chunks_async(
+    chunks: Iterable[str],
+    writer: AsyncWritable | StreamWriter,
+    encoding: str,
+    buffer_size: int,
+):
+    """
+    Writes chunks to writer in batches of at least buffer_size characters
+    """
+    pending: list[str] = []
+    pending_size: int = 0
+
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= buffer_size:
+            await _write_async(writer, "".join(pending), encoding)
+            pending.clear()
+            pending_size = 0
+
+    if pending:
+        await _write_async(writer, "".join(pending), encoding)
+
+
+async def _write_async(
+    writer: AsyncWritable | StreamWriter, text: str, encoding: str
+):
+    if hasattr(writer, "drain"):
+        writer.write(text.encode(encoding))
+        await writer.drain()
+    else:
+        await writer.write(text)
+    # neither has to suspend, so the loop is given a turn explicitly
+    await _yield_to_loop()
+
+
+@coroutine
+def _yield_to_loop():
+    """
+    Same as asyncio.sleep(0) without importing asyncio, which would slow down
+    the start of every command that renders
     """
-    Recursively builds html elements from a DOM until there are no
-    children left
+    yield
+
+
+def iter_render(tree: DOM) -> Iterator[str]:
+    """
+    Lazily yields the html of a DOM as chunks of text.
+
+    The tree is walked with an explicit stack instead of recursion so deeply
+    nested documents can not hit the recursion limit.
     """
-    element = node.element
-    children = node.children
+    # the stack holds nodes that still have to be visited and the closing
+    # tags of the elements that are currently open
+    stack: list[Union[DOM, str]] = [tree]
 
-    html: str = f"<{element}>"
-    for next_node in children:
-        # if next_node is a str then it will be appeneded
-        # if it is a DOM then _build node is called again
-        html = f"{html}{next_node}"
+    while stack:
+        node = stack.pop()
 
-    html += f"</{element}>"
+        if not isinstance(node, DOM):
+            # text and closing tags are emitted as they are
+            yield str(node)
+            continue
 
-    return html
+        if node.attributes is None:
+            yield f"<{node.element}>"
+        else:
+            yield start_tag(node.element, node.attributes)
+        stack.append(f"</{node.element}>")
+        stack.extend(reversed(node.children))
@@ -1,6 +1,7 @@
 import unittest
+from io import StringIO
 
-from renderer import DOM, render
+from renderer import DOM, render, render_to, render_blocks_to, iter_render
 
 
 class Tests(unittest.TestCase):
@@ -25,6 +26,59 @@ class Tests(unittest.TestCase):
 
         self.assertEquals(actual, expected)
 
+    def test_attributes(self):
+        link: DOM = DOM(
+            "a", children=["link"], attributes={"href": 'a&b"<c>', "title": "t"}
+        )
+
+        actual = render(DOM("p", children=[link]))
+        expected = '<p><a href="a&amp;b&quot;&lt;c&gt;" title="t">link</a></p>'
+
+        self.assertEqual(actual, expected)
+        self.assertIsNone(DOM("p", attributes={}).attributes)
+
+    def test_iter_render(self):
+        paragraph: DOM = DOM("p", children=["Hello ", "there"])
+        html: DOM = DOM("html", children=[paragraph])
+
+        actual = list(iter_render(html))
+        expected = ["<html>", "<p>", "Hello ", "there", "</p>", "</html>"]
+
+        self.assertEqual(actual, expected)
+
+    def test_render_to(self):
+        paragraph: DOM = DOM("p", children=["Hello there"])
+        html: DOM = DOM("html", children=[paragraph, paragraph])
+        expected = "<html><p>Hello there</p><p>Hello there</p></html>"
+
+        # a tiny buffer forces several writes
+        for buffer_size in (1, 10, 1024):
+            sink: StringIO = StringIO()
+            render_to(html, sink, buffer_size=buffer_size)
+            self.assertEqual(sink.getvalue(), expected)
+
+    def test_render_blocks_to(self):
+        def blocks():
+            for text in ("one", "two"):
+                yield DOM("p", children=[text])
+
+        sink: StringIO = StringIO()
+        render_blocks_to(blocks(), sink)
+
+        expected = "<html><body><p>one</p><p>two</p></body></html>"
+        self.assertEqual(sink.getvalue(), expected)
+
+    def test_deeply_nested(self):
+        depth: int = 50000
+        tree: DOM = DOM("p", children=["deep"])
+        for _ in range(depth):
+            tree = DOM("div", children=[tree])
+
+        actual = render(tree)
+        expected = "<div>" * depth + "<p>deep</p>" + "</div>" * depth
+
+        self.assertEqual(actual, expected)
+
 
 if __name__ == "__main__":
     unittest.main()
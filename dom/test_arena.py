@@ -0,0 +1,74 @@
+"""
+Tests for the compact DOM arena
+"""
+
+import unittest
+from io import StringIO
+from dom.arena import Arena
+from dom.renderer import DOM, render
+from parsing.parser import BlockParser
+
+
+class ArenaTests(unittest.TestCase):
+    def test_round_trip(self):
+        paragraph: DOM = DOM("p", children=["Hello ", DOM("em", children=["there"])])
+        tree: DOM = DOM("html", children=[paragraph, DOM("hr"), paragraph])
+
+        arena: Arena = Arena()
+        handle: int = arena.add(tree)
+
+        self.assertEqual(arena.render(handle), render(tree))
+        self.assertEqual(render(arena.to_dom(handle)), render(tree))
+        self.assertEqual(arena.tag(handle), "html")
+        self.assertEqual(len(arena.children(handle)), 3)
+
+    def test_many_trees(self):
+        arena: Arena = Arena()
+        handles: list[int] = [
+            arena.add(DOM("p", children=[f"paragraph {i}"])) for i in range(100)
+        ]
+
+        for i, handle in enumerate(handles):
+            self.assertEqual(arena.render(handle), f"<p>paragraph {i}</p>")
+
+        # one element and one text node per tree
+        self.assertEqual(len(arena), 200)
+
+    def test_text_node(self):
+        arena: Arena = Arena()
+        handle: int = arena.add(DOM("p", children=["text"]))
+        (text,) = arena.children(handle)
+
+        self.assertIsNone(arena.tag(text))
+        self.assertEqual(arena.text(text), "text")
+        self.assertEqual(arena.to_dom(text), "text")
+        with self.assertRaises(ValueError):
+            arena.text(handle)
+
+    def test_deeply_nested(self):
+        depth: int = 50000
+        tree: DOM = DOM("p", children=["deep"])
+        for _ in range(depth):
+            tree = DOM("div", children=[tree])
+
+        arena: Arena = Arena()
+        handle: int = arena.add(tree)
+
+        self.assertEqual(arena.render(handle), render(tree))
+
+    def test_parse_into(self):
+        markdown: str = "# header\n\nparagraph\n\n    code\n"
+        arena: Arena = Arena()
+
+        handle: int = BlockParser().parse_into(StringIO(markdown), arena)
+        expected: str = render(BlockParser().parse(StringIO(markdown)))
+
+        self.assertEqual(arena.render(handle), expected)
+
+        sink: StringIO = StringIO()
+        arena.render_to(handle, sink)
+        self.assertEqual(sink.getvalue(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+Tests for the binary encoding of DOM trees
+"""
+
+import pickle
+import unittest
+from io import StringIO
+from bench.corpus import generate
+from dom.binary import (
+    FORMAT_VERSION,
+    EncodedTree,
+    decode,
+    decode_blocks,
+    encode,
+    encode_blocks,
+    render_encoded,
+)
+from dom.renderer import DOM, render
+from parsing.parser import BlockParser, InlineParser
+
+
+def _same(first: DOM | str, second: DOM | str) -> bool:
+    if isinstance(first, str) or isinstance(second, str):
+        return first == second
+    return (
+        first.element == second.element
+        and first.attributes == second.attributes
+        and len(first.children) == len(second.children)
+        and all(map(_same, first.children, second.children))
+    )
+
+
+class BinaryTests(unittest.TestCase):
+    def test_round_trip(self):
+        link: DOM = DOM(
+            "a", children=["é ", DOM("em")], attributes={"href": 'u"rl', "title": ""}
+        )
+        tree: DOM = DOM(
+            "html",
+            children=[DOM("p", children=["Hello ", link, "\n"]), DOM("hr"), ""],
+        )
+
+        data: bytes = encode(tree)
+        self.assertTrue(_same(decode(data), tree))
+        self.assertEqual(render_encoded(data), render(tree))
+
+    def test_parsed_document(self):
+        markdown: str = generate(64 * 1024, "mixed", seed=2)
+        tree: DOM = InlineParser().parse(BlockParser().parse(StringIO(markdown)))
+
+        data: bytes = encode(tree)
+        self.assertTrue(_same(decode(data), tree))
+        self.assertEqual(render_encoded(data), render(tree))
+        # the point of the encoding
+        self.assertLess(len(data), len(pickle.dumps(tree)))
+
+    def test_blocks(self):
+        blocks: list[DOM | str] = [
+            DOM("h1", children=["a"]),
+            "text",
+            DOM("p", children=["b", DOM("code", children=["c"])]),
+        ]
+        data: bytes = encode_blocks(blocks)
+
+        self.assertTrue(all(map(_same, decode_blocks(data), blocks)))
+        self.assertEqual(len(decode_blocks(data)), 3)
+        self.assertEqual(
+            render_encoded(data), "<h1>a</h1>text<p>b<code>c</code></p>"
+        )
+        self.assertEqual(decode_blocks(encode_blocks([])), [])
+
+        with self.assertRaises(ValueError):
+            decode(data)
+
+    def test_render_to(self):
+        tree: DOM = DOM("p", children=["x" * 10, DOM("em", children=["y"])])
+        sink: StringIO = StringIO()
+        EncodedTree(encode(tree)).render_to(sink, buffer_size=4)
+        self.assertEqual(sink.getvalue(), render(tree))
+
+    def test_invalid_data(self):
+        data: bytes = encode(DOM("p", children=["text"]))
+        for invalid in (
+            b"",
+            b"XDOM" + data[4:],
+            data[:4] + bytes([FORMAT_VERSION + 1]) + data[5:],
+            data[:-1],
+            data[:30],
+        ):
+            with self.subTest(invalid=invalid):
+                with self.assertRaises(ValueError):
+                    decode(invalid)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,26 +3,187 @@ A simple command line program that parses markdown text into html.
 """
 
 import cli
-from parsing.parser import Parser
-from dom.renderer import render, DOM
+from convert.client import DEFAULT_SOCKET, DaemonUnavailable, convert_with_daemon
 from argparse import Namespace
-from sys import argv
+import json
+from glob import has_magic
+from os.path import isdir, isfile
+from sys import argv, stderr, stdin, stdout
+from typing import TYPE_CHECKING, Any, Iterable
 
+if TYPE_CHECKING:
+    from convert.batch import Result
+    from parsing.profiling import Profiler
 
-def main():
+
+def main() -> int:
     args: Namespace = cli.parse_args(argv[1:])
+    socket_path: str = args.socket or DEFAULT_SOCKET
 
-    # setup parsers and renders
-    parser: Parser = Parser()
+    if args.daemon:
+        from convert.daemon import CACHE_SIZE, serve
+
+        serve(socket_path, jobs=args.jobs, cache_size=args.cache_size or CACHE_SIZE)
+        return 0
+
+    if args.ndjson:
+        from convert.ndjson import convert_stream
+
+        convert_stream(
+            stdin.buffer, stdout.buffer, jobs=args.jobs, cache_size=args.cache_size
+        )
+        return 0
+
+    if args.output_dir is None:
+        path: str = args.file[0]
+        if len(args.file) != 1 or isdir(path) or has_magic(path):
+            print(
+                "markdownp: --output-dir is required to convert several files",
+                file=stderr,
+            )
+            return 2
+        if not isfile(path):
+            print(f"markdownp: {path}: No such file", file=stderr)
+            return 1
+
+        # the daemon parses files serially, --jobs asks for a parallel parse
+        if not (args.no_daemon or args.profile or args.verbose or args.jobs > 1):
+            try:
+                error: str | None = convert_with_daemon(
+                    args.file[0], args.output, args.encoding, socket_path
+                )
+            except DaemonUnavailable:
+                pass
+            else:
+                if error is not None:
+                    print(f"{args.file[0]}: {error}", file=stderr)
+                    return 1
+                return 0
+
+        return convert_locally(args)
+
+    return convert_batch(args)
+
+
+def convert_locally(args: Namespace) -> int:
+    """
+    Converts the single file of args in this process
+    """
+    # the parser is only imported when it is needed, so commands that are
+    # served by the daemon start quickly
+    from parsing.profiling import Profiler
+
+    profiler: Profiler | None = None
+    if args.profile or args.verbose:
+        # memory is only traced for --profile since it slows everything down
+        profiler = Profiler(memory=args.profile)
+
+    convert(args.file[0], args.output, args.encoding, profiler, args.jobs)
+
+    if args.profile:
+        json.dump({"file": args.file[0], **profiler.to_dict()}, stderr)
+        print(file=stderr)
+    elif args.verbose:
+        print(profiler.format(), file=stderr)
+    return 0
+
+
+def convert_batch(args: Namespace) -> int:
+    """
+    Converts the files of args into --output-dir
+    """
+    from convert.batch import convert_all
+    from convert.build import BuildReport, build, watch
 
-    # parse markdown and render html
-    tree: DOM = parser.parse(args.file)
-    html: str = render(tree)
+    if args.profile:
+        print("markdownp: --profile only supports a single file", file=stderr)
+        return 2
+
+    options: dict[str, Any] = {
+        "jobs": args.jobs,
+        "cache_size": args.cache_size,
+        "encoding": args.encoding,
+    }
+
+    if args.watch:
+        reports = watch(args.file, args.output_dir, **options)
+        try:
+            for report in reports:
+                failed: int = report_errors(report.results)
+                print(
+                    f"converted {len(report.results) - failed} file(s), "
+                    f"{failed} failed, {report.skipped} up to date"
+                )
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.incremental:
+        report: BuildReport = build(args.file, args.output_dir, **options)
+        return 1 if report_errors(report.results) else 0
+
+    # convert every file, reporting failures without stopping the batch
+    results = convert_all(args.file, args.output_dir, **options)
+    return 1 if report_errors(results) else 0
+
+
+def report_errors(results: Iterable["Result"]) -> int:
+    """
+    Prints the failed conversions to stderr and returns how many there were
+    """
+    failed: int = 0
+    for result in results:
+        if result.error is not None:
+            failed += 1
+            print(f"{result.source}: {result.error}", file=stderr)
+    return failed
+
+
+def convert(
+    path: str,
+    output_path: str,
+    encoding: str = "utf-8",
+    profiler: "Profiler | None" = None,
+    jobs: int = 1,
+):
+    from convert.batch import open_output
+    from dom.renderer import render_blocks_to
+    from parsing.parser import Parser
+
+    # the html is written to a new file that only replaces output_path once
+    # the whole document was converted
+
+    # large files are split between jobs processes, whose blocks are
+    # rendered without being decoded into a DOM
+    if jobs > 1 and profiler is None:
+        from parsing.parallel import ParallelParser
+
+        with open_output(output_path) as output:
+            parser = ParallelParser(jobs, encoding=encoding)
+            render_blocks_to(parser.iter_html(path), output)
+        return
+
+    # without a profile to report stages for, the html is compiled straight
+    # from the tokens into the new file without building a DOM
+    if profiler is None:
+        from parsing.compiler import HtmlCompiler
+        from parsing.parser import open_source
+
+        with open_source(path, encoding) as file, open_output(output_path) as output:
+            HtmlCompiler(encoding=encoding).compile_to(file, output)
+        return
+
+    # setup parsers and renders
+    parser: Parser = Parser(encoding=encoding, profiler=profiler)
 
-    # write markdown to new file
-    with open(args.output, "w") as output:
-        output.write(html)
+    # parse markdown block by block and render the html straight into the
+    # new file
+    with open_output(output_path) as output:
+        # parsing happens lazily while rendering and is measured as nested
+        # stages, so render only counts the rendering itself
+        with profiler.stage("render"):
+            render_blocks_to(parser.iter_blocks(path), output)
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,3 @@
+# bump whenever a change to the parser or renderer changes the html that is
+# produced, so incremental builds know to convert everything again
+__version__: str = "0.2"
@@ -0,0 +1,203 @@
+"""
+asyncio counterparts of the parser for documents that arrive as streams
+"""
+
+import re
+from asyncio import sleep
+from codecs import IncrementalDecoder, getincrementaldecoder
+from copy import copy
+from io import StringIO
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Iterable,
+    Protocol,
+    Union,
+)
+
+from dom.renderer import DOM
+from parsing.limits import Budget, Limits
+from parsing.parser import BlockParser, InlineParser
+from parsing.passes import Pass, Pipeline
+from parsing.profiling import Profiler
+
+
+class AsyncReader(Protocol):
+    """
+    A stream such as asyncio.StreamReader
+    """
+
+    def read(self, size: int, /) -> Awaitable[str | bytes]:
+        ...
+
+
+# a document that is read asynchronously, either from a stream or as chunks of
+# text or of encoded text
+AsyncSource = Union[AsyncReader, AsyncIterable[Union[str, bytes]]]
+
+# number of characters that are parsed at a time before the event loop gets a
+# turn, a piece only ends after a blank line so it can be longer
+PIECE_SIZE: int = 64 * 1024
+
+# number of characters or bytes read from a stream at a time
+READ_SIZE: int = 64 * 1024
+
+# the end of a blank line, after which a document can be split
+_BLANK_LINE: re.Pattern[str] = re.compile(r"^[ \t]*\r?\n", re.MULTILINE)
+_BLANK: re.Pattern[str] = re.compile(r"[ \t]*")
+
+
+class AsyncParser(object):
+    """
+    Parses documents that are read from asyncio streams or from async
+    iterators of chunks without blocking the event loop.
+
+    A blank line ends every block, so the document is split after blank lines
+    into pieces of about piece_size characters that are parsed one at a time
+    with the same result as the whole document. The loop gets a turn after
+    every piece, only a single paragraph or code block longer than piece_size
+    is parsed in one go. The passes are run on every block together with the
+    inline parser, as in a Parser.
+    """
+
+    def __init__(
+        self,
+        *,
+        encoding: str = "utf-8",
+        profiler: Profiler | None = None,
+        limits: Limits | None = None,
+        piece_size: int = PIECE_SIZE,
+        passes: Iterable[Pass] = (),
+    ):
+        # used to decode chunks that are bytes
+        self.encoding: str = encoding
+        self.profiler: Profiler | None = profiler
+        self.limits: Limits | None = limits
+        self.piece_size: int = piece_size
+        self.passes: list[Pass] = list(passes)
+
+    async def parse(self, source: AsyncSource) -> DOM:
+        blocks: list[DOM] = [block async for block in self.iter_blocks(source)]
+        return DOM("html", children=[DOM("body", children=blocks)])
+
+    async def iter_blocks(self, source: AsyncSource) -> AsyncIterator[DOM]:
+        """
+        Yields the top level blocks of the body as soon as the piece they are
+        in has been read, the result can be passed to render_blocks_async
+        """
+        # the limits apply to the whole document rather than to every piece
+        budget: Budget | None = None if self.limits is None else Budget(self.limits)
+        block_parser: BlockParser = BlockParser(
+            encoding=self.encoding, profiler=self.profiler, limits=self.limits
+        )
+        inline_parser: InlineParser = InlineParser(limits=self.limits)
+        inline_parser.budget = budget
+        pipeline: Pipeline = Pipeline([inline_parser, *map(copy, self.passes)])
+        pipeline.start()
+
+        async for piece in aiter_pieces(
+            source, encoding=self.encoding, piece_size=self.piece_size, budget=budget
+        ):
+            for block in block_parser.iter_blocks(StringIO(piece), budget=budget):
+                yield self._apply(pipeline, block)
+            await sleep(0)
+
+    def _apply(self, pipeline: Pipeline, block: DOM) -> DOM:
+        # blocks end up inside of html and body
+        if self.profiler is None:
+            return pipeline.apply(block, depth=3)
+        with self.profiler.stage("inline"):
+            return pipeline.apply(block, depth=3)
+
+
+async def aiter_pieces(
+    source: AsyncSource,
+    *,
+    encoding: str = "utf-8",
+    piece_size: int = PIECE_SIZE,
+    budget: Budget | None = None,
+) -> AsyncIterator[str]:
+    """
+    Reads source and yields its text in pieces that end after a blank line
+    and are at least piece_size characters long, except for the last one.
+
+    Chunks that are bytes are decoded incrementally with encoding. With a
+    budget, the input size, in characters or bytes as the chunks are, and the
+    length of the line that is being read are checked as chunks arrive, so a
+    single overlong line is not buffered past the limit.
+    """
+    decoder: IncrementalDecoder | None = None
+    parts: list[str] = []
+    pending_size: int = 0
+    # whether a blank line has arrived since the pending text was last split
+    split: bool = False
+    # whether the unfinished last line only has spaces and tabs so far
+    blank: bool = True
+    line_length: int = 0
+    size: int = 0
+
+    async for chunk in _aiter_chunks(source):
+        if budget is not None:
+            size += len(chunk)
+            budget.check_bytes(size)
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+        if not chunk:
+            continue
+
+        # a blank line at the start of the chunk may have begun in the last one
+        if _BLANK_LINE.search(chunk, 1) or (blank and _BLANK_LINE.match(chunk)):
+            split = True
+
+        newline: int = chunk.rfind("\n")
+        if newline < 0:
+            blank = blank and _BLANK.fullmatch(chunk) is not None
+            line_length += len(chunk)
+        else:
+            blank = _BLANK.fullmatch(chunk, newline + 1) is not None
+            line_length = len(chunk) - newline - 1
+        if budget is not None:
+            budget.check_line(line_length)
+
+        parts.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= piece_size and split:
+            text: str = "".join(parts)
+            start: int = 0
+            while True:
+                blank_line: re.Match[str] | None = _BLANK_LINE.search(
+                    text, start + piece_size - 1
+                )
+                if blank_line is None:
+                    break
+                yield text[start : blank_line.end()]
+                start = blank_line.end()
+            parts = [text[start:]]
+            pending_size -= start
+            # blank lines left in the pending text are too early to end a
+            # piece, the text is only joined again once another one arrives
+            split = False
+
+    if decoder is not None:
+        parts.append(decoder.decode(b"", final=True))
+    text = "".join(parts)
+    if text:
+        yield text
+
+
+async def _aiter_chunks(source: AsyncSource) -> AsyncIterator[str | bytes]:
+    if not hasattr(source, "read"):
+        async for chunk in source:
+            yield chunk
+        return
+
+    # streams are read in blocks rather than lines, since the line length of
+    # a StreamReader is limited
+    while True:
+        chunk: str | bytes = await source.read(READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
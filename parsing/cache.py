@@ -0,0 +1,106 @@
+"""
+Content addressed cache of rendered blocks shared between documents
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from io import StringIO, TextIOBase
+from typing import Iterator, NamedTuple
+
+from dom.renderer import render
+from parsing.parser import BlockParser, InlineParser
+from parsing.tokenizer import iter_chunks
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+    chars: int
+
+
+class BlockCache(object):
+    """
+    LRU cache mapping the source of a run of top level blocks to its html.
+
+    Documents are split at blank lines, which end every block, and each run
+    is looked up by a hash of its text. Repeated runs such as license headers
+    or boilerplate code are then neither parsed nor rendered again.
+
+    maxsize bounds the number of entries and max_chars, if given, the total
+    length of the cached html. The least recently used entries are evicted
+    first.
+    """
+
+    def __init__(self, maxsize: int = 4096, *, max_chars: int | None = None):
+        self.maxsize: int = maxsize
+        self.max_chars: int | None = max_chars
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self._chars: int = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(
+            self.hits,
+            self.misses,
+            self.evictions,
+            self.maxsize,
+            len(self._entries),
+            self._chars,
+        )
+
+    def clear(self):
+        self._entries.clear()
+        self._chars = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def render_chunk(self, source: str) -> str:
+        """
+        Returns the html of a run of blocks, parsing and rendering it only if
+        it is not cached
+        """
+        key: bytes = blake2b(source.encode(), digest_size=16).digest()
+
+        html: str | None = self._entries.get(key)
+        if html is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return html
+
+        self.misses += 1
+        inline_parser: InlineParser = InlineParser()
+        html = "".join(
+            render(inline_parser.parse(block))
+            for block in BlockParser().iter_blocks(StringIO(source))
+        )
+        self._store(key, html)
+        return html
+
+    def iter_blocks(self, stream: TextIOBase) -> Iterator[str]:
+        """
+        Yields the rendered html of the top level blocks of a document, a run
+        of blocks at a time. The result can be passed to render_blocks_to.
+        """
+        for _, source in iter_chunks(stream):
+            yield self.render_chunk(source)
+
+    def _store(self, key: bytes, html: str):
+        if self.maxsize <= 0:
+            return
+        if self.max_chars is not None and len(html) > self.max_chars:
+            return
+
+        self._entries[key] = html
+        self._chars += len(html)
+
+        while len(self._entries) > self.maxsize or (
+            self.max_chars is not None and self._chars > self.max_chars
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._chars -= len(evicted)
+            self.evictions += 1
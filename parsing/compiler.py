@@ -0,0 +1,109 @@
+"""
+Compiler from markdown straight to html, without building a DOM
+"""
+
+from itertools import chain
+from typing import Iterator
+
+from dom.renderer import BUFFER_SIZE, DOM, Writable, _write_chunks, iter_render
+from parsing.grammar import Grammar, default_grammar
+from parsing.inline import InlineScanner
+from parsing.parser import BlockParser, InlineParser, Source
+from parsing.tokenizer import EOF
+
+
+class HtmlCompiler(BlockParser):
+    """
+    Reads blocks with the grammar of the BlockParser but writes the html of
+    every block as soon as its lines have been read instead of building DOM
+    objects that are only rendered afterwards.
+
+    The html is the same, byte for byte, as rendering the document of a
+    Parser, or of a BlockParser when inline is False. Only the elements the
+    inline structure of a text is parsed into are allocated, text without
+    any is written as it is.
+
+    There is nothing to run passes on and nothing to count against limits
+    on nodes and depth, so a Parser with passes, limits or a profiler builds
+    the DOM instead.
+    """
+
+    def __init__(
+        self,
+        *,
+        encoding: str = "utf-8",
+        inline: bool = True,
+        grammar: Grammar = default_grammar,
+    ):
+        super().__init__(encoding=encoding, grammar=grammar)
+        # whether the text of paragraphs and headers is parsed for emphasis,
+        # code spans and links
+        self.inline: bool = inline
+        self._scanner: InlineScanner = InlineScanner()
+        # the opening and closing html of the tags of every kind of block and
+        # whether its text has inline structure
+        self._html_tags: dict[tuple[str, ...], tuple[str, str, bool]] = {}
+
+    def compile(self, file: Source) -> str:
+        return "".join(self.iter_compile(file))
+
+    def compile_to(
+        self, file: Source, writable: Writable, *, buffer_size: int = BUFFER_SIZE
+    ):
+        """
+        Writes the html of file to writable in chunks of at least buffer_size
+        characters
+        """
+        _write_chunks(self.iter_compile(file), writable, buffer_size)
+
+    def iter_compile(self, file: Source) -> Iterator[str]:
+        """
+        Lazily yields the html of the document, one top level block at a time
+        """
+        return chain(
+            ("<html><body>",), self.iter_blocks_html(file), ("</body></html>",)
+        )
+
+    def iter_blocks_html(self, file: Source) -> Iterator[str]:
+        """
+        Yields the html of each top level block, which can be passed to
+        render_blocks_to
+        """
+        self._start(file, 2)
+        while self._type != EOF:
+            html: str | None = self._element_html()
+            if html is not None:
+                yield html
+
+    def _element_html(self) -> str | None:
+        """
+        Same as BlockParser._element
+        """
+        tags, lines = self._read_block()
+        if not tags:
+            return None
+
+        html: tuple[str, str, bool] | None = self._html_tags.get(tags)
+        if html is None:
+            html = self._html_tags[tags] = (
+                "".join(f"<{tag}>" for tag in tags),
+                "".join(f"</{tag}>" for tag in reversed(tags)),
+                tags[-1] in InlineParser.elements,
+            )
+        opening, closing, inline = html
+        if inline:
+            return opening + self._text_html("\n".join(lines)) + closing
+        return opening + "\n".join(lines) + closing
+
+    def _text_html(self, text: str) -> str:
+        if not self.inline:
+            return text
+        children: list[DOM | str] = self._scanner.parse(text)
+        if len(children) == 1 and isinstance(children[0], str):
+            return children[0]
+        return "".join(
+            chain.from_iterable(
+                (child,) if isinstance(child, str) else iter_render(child)
+                for child in children
+            )
+        )
@@ -0,0 +1,152 @@
+"""
+The block grammar of markdownp as data, and the dispatch tables the
+BlockParser is driven by.
+
+    ElementList
+        : ElementList Element
+        | Element
+        ;
+
+    Element
+        : BLANK_LINE
+        | AtxHeader
+        | CodeBlock
+        | Paragraph
+        ;
+
+    AtxHeader
+        : ATX_HEADER
+        ;
+
+    CodeBlock
+        : CodeBlock IndentLine
+        | IndentLine
+        ;
+
+    Paragraph
+        : Paragraph TEXT_LINE
+        | Paragraph IndentLine
+        | TEXT_LINE
+        ;
+
+    IndentLine
+        : INDENT LINE
+        ;
+
+Every Element is decided by the first token of its first line and every
+following line is decided by its first token as well, so each is a Rule: the
+token that starts it, the elements it builds and the tokens of the lines
+that continue it.
+"""
+
+from typing import Iterable, NamedTuple
+
+from parsing.tokenizer import BlockScanner, default_scanner, token_code
+
+# how the text of a line is read, given the token it starts with, as flags
+
+# the value of the token
+VALUE: int = 0
+# the rest of the line after the token, which is not analyzed any further
+REST: int = 1
+# without surrounding whitespace
+STRIPPED: int = 2
+# the value of an ATX header token, the number of # at its start is appended
+# to the innermost tag and the text is what is left without them
+HEADER: int = 4
+
+
+class Rule(NamedTuple):
+    """
+    A top level block that starts with a line whose first token is of the
+    type start and goes on for as long as the first token of the next line
+    is one of continued.
+
+    The text of the lines, read as their reader flags say and separated by new
+    lines, becomes the children of the innermost of the elements tags, which
+    are nested from the outermost one. A rule without tags builds nothing.
+    """
+
+    name: str
+    start: str
+    tags: tuple[str, ...]
+    first: int = VALUE
+    continued: tuple[tuple[str, int], ...] = ()
+
+
+RULES: tuple[Rule, ...] = (
+    Rule("BlankLine", "BLANK_LINE", ()),
+    Rule("AtxHeader", "ATX_HEADER", ("h",), HEADER),
+    Rule("CodeBlock", "INDENT", ("pre", "code"), REST, (("INDENT", REST),)),
+    Rule(
+        "Paragraph",
+        "TEXT_LINE",
+        ("p",),
+        VALUE,
+        (("TEXT_LINE", STRIPPED), ("INDENT", REST | STRIPPED)),
+    ),
+)
+
+
+class Table(NamedTuple):
+    """
+    A Rule with its token types resolved to codes
+    """
+
+    tags: tuple[str, ...]
+    start: int
+    first: int
+    # reader of the lines that continue the block by the code of their first
+    # token
+    continued: dict[int, int]
+
+
+class Grammar(object):
+    """
+    Rules and the scanner that tokenizes their lines, compiled to a Table per
+    token code that starts a block.
+
+    Lines that start with a token no rule starts with are read with the rule
+    called default, which fails with a SyntaxError unless the token is the
+    one it starts with. New block types are a token registered with the
+    scanner and a Rule added here, for example
+
+        scanner.register("> ?", "BLOCK_QUOTE", first_chars=">")
+        grammar.add(Rule("BlockQuote", "BLOCK_QUOTE", ("blockquote",), REST,
+                         (("BLOCK_QUOTE", REST),)))
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[Rule] = RULES,
+        *,
+        default: str = "Paragraph",
+        scanner: BlockScanner = default_scanner,
+    ):
+        self.rules: list[Rule] = list(rules)
+        self.default_rule: str = default
+        self.scanner: BlockScanner = scanner
+        self._compile()
+
+    def add(self, rule: Rule):
+        """
+        Adds a rule, which replaces any rule that starts with the same token
+        """
+        self.rules.append(rule)
+        self._compile()
+
+    def _compile(self):
+        self.starts: dict[int, Table] = {}
+        tables: dict[str, Table] = {}
+        for rule in self.rules:
+            table: Table = Table(
+                rule.tags,
+                token_code(rule.start),
+                rule.first,
+                {token_code(token): reader for token, reader in rule.continued},
+            )
+            tables[rule.name] = self.starts[table.start] = table
+        self.default: Table = tables[self.default_rule]
+
+
+default_grammar: Grammar = Grammar()
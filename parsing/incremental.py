@@ -0,0 +1,194 @@
+"""
+Incremental re-parsing of documents that are edited in place
+"""
+
+from bisect import bisect_left
+from typing import Iterator, NamedTuple
+
+from dom.renderer import DOM
+from parsing.parser import BlockParser, InlineParser
+
+
+class Splice(NamedTuple):
+    """
+    Describes how an edit changed the top level blocks of the body: removed
+    blocks starting at index were replaced by inserted new ones.
+    """
+
+    index: int
+    removed: int
+    inserted: int
+
+
+class _LineReader(object):
+    """
+    Reads lines from a str starting at pos without copying the rest of it
+    """
+
+    def __init__(self, text: str, pos: int = 0):
+        self._text: str = text
+        self._pos: int = pos
+
+    def readline(self) -> str:
+        start: int = self._pos
+        if start >= len(self._text):
+            return ""
+
+        end: int = self._text.find("\n", start) + 1
+        if end == 0:
+            end = len(self._text)
+
+        self._pos = end
+        return self._text[start:end]
+
+
+class IncrementalDocument(object):
+    """
+    A parsed document that can be updated with text edits.
+
+    The source span of every top level block is tracked so an edit only
+    re-parses the blocks around it. Parsing stops as soon as a new block
+    starts where an old block that lies after the edit started, since
+    everything from there on is unchanged.
+    """
+
+    def __init__(self, text: str):
+        self.text: str = text
+        self._body: DOM = DOM("body")
+        self.tree: DOM = DOM("html", children=[self._body])
+
+        # source spans of the blocks of the body, the entries at indexes from
+        # _shift_from onwards are stale by _shift characters. Applying the
+        # shift lazily keeps an edit from touching every following block.
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._shift_from: int = 0
+        self._shift: int = 0
+
+        for start, end, block in self._parse_from(text, 0):
+            self._starts.append(start)
+            self._ends.append(end)
+            self._body.children.append(block)
+
+    def spans(self) -> list[tuple[int, int]]:
+        """
+        Returns the (start, end) offsets of every top level block
+        """
+        return [
+            (self._start(index), self._end(index))
+            for index in range(len(self._starts))
+        ]
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> Splice:
+        """
+        Replaces deleted characters at offset with inserted and updates the
+        tree, returning which blocks of the body were replaced.
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > len(self.text):
+            raise ValueError(
+                f"Edit at {offset} deleting {deleted} characters is outside of "
+                f"the document"
+            )
+
+        old_end: int = offset + deleted
+        delta: int = len(inserted) - deleted
+        # the document only changes once the new text parsed, a SyntaxError
+        # leaves it as it was before the edit
+        text: str = self.text[:offset] + inserted + self.text[old_end:]
+
+        count: int = len(self._starts)
+
+        # the block before the first one touching the edit has to be parsed
+        # again too since the line that ended it may have changed
+        touched: int = self._bisect(self._ends, offset)
+        first: int = max(touched - 1, 0)
+        restart: int = self._start(touched - 1) if touched > 0 else 0
+
+        # old blocks starting after the edit can be reused once the new parse
+        # reaches one of them
+        reused: int = self._bisect(self._starts, old_end)
+
+        starts: list[int] = []
+        ends: list[int] = []
+        blocks: list[DOM] = []
+        for start, end, block in self._parse_from(text, restart):
+            while reused < count and self._start(reused) + delta < start:
+                reused += 1
+            if reused < count and self._start(reused) + delta == start:
+                break
+
+            starts.append(start)
+            ends.append(end)
+            blocks.append(block)
+        else:
+            reused = count
+
+        self.text = text
+        self._splice(first, reused, starts, ends, blocks, delta)
+        return Splice(first, reused - first, len(blocks))
+
+    def _splice(
+        self,
+        first: int,
+        reused: int,
+        starts: list[int],
+        ends: list[int],
+        blocks: list[DOM],
+        delta: int,
+    ):
+        """
+        Replaces the blocks in [first, reused) and folds delta into the
+        pending shift of the blocks after them.
+        """
+        shift_from: int = self._shift_from
+        shift: int = self._shift
+
+        # only the blocks between the previous edit and this one need to be
+        # updated to keep a single pending shift
+        if shift_from < reused:
+            if shift:
+                for index in range(shift_from, first):
+                    self._starts[index] += shift
+                    self._ends[index] += shift
+            pivot: int = reused
+        else:
+            if delta:
+                for index in range(reused, shift_from):
+                    self._starts[index] += delta
+                    self._ends[index] += delta
+            pivot = shift_from
+
+        self._starts[first:reused] = starts
+        self._ends[first:reused] = ends
+        self._body.children[first:reused] = blocks
+
+        self._shift_from = pivot - (reused - first) + len(blocks)
+        self._shift = shift + delta
+
+    def _parse_from(self, text: str, pos: int) -> Iterator[tuple[int, int, DOM]]:
+        """
+        Parses text from pos, which must be the start of a line
+        """
+        inline_parser: InlineParser = InlineParser()
+        lines: _LineReader = _LineReader(text, pos)
+        for start, end, block in BlockParser().iter_spans(lines):
+            yield pos + start, pos + end, inline_parser.parse(block)
+
+    def _start(self, index: int) -> int:
+        if index >= self._shift_from:
+            return self._starts[index] + self._shift
+        return self._starts[index]
+
+    def _end(self, index: int) -> int:
+        if index >= self._shift_from:
+            return self._ends[index] + self._shift
+        return self._ends[index]
+
+    def _bisect(self, values: list[int], target: int) -> int:
+        """
+        Returns the first index whose shifted value is at least target
+        """
+        index: int = bisect_left(values, target, 0, self._shift_from)
+        if index < self._shift_from:
+            return index
+        return bisect_left(values, target - self._shift, self._shift_from)
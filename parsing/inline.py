@@ -0,0 +1,481 @@
+"""
+Inline parsing of emphasis, code spans and links
+"""
+
+import re
+from typing import Union
+from unicodedata import category
+
+from dom.renderer import DOM
+
+# characters that can start inline structure, everything between them is
+# plain text
+_SPECIAL: re.Pattern[str] = re.compile(r"[\\`*_\[\]]")
+_BACKTICKS: re.Pattern[str] = re.compile("`+")
+
+_ESCAPABLE: str = "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"
+_WHITESPACE: str = " \t\n\r\f\v"
+
+# parts of links. A backslash escapes the ASCII punctuation after it and is
+# literal otherwise. Every character can only be matched in one way, so the
+# patterns never backtrack more than once over what they matched.
+_ESCAPE: str = r"\\[!-/:-@\[-`{-~]|\\(?![!-/:-@\[-`{-~])"
+_SPACE: re.Pattern[str] = re.compile(r"\s*")
+_POINTY_DESTINATION: re.Pattern[str] = re.compile(rf"<((?:[^<>\n\\]|{_ESCAPE})*)>")
+_DESTINATION: re.Pattern[str] = re.compile(rf"((?:[^\s()\\]|{_ESCAPE})*)")
+_TITLE: re.Pattern[str] = re.compile(
+    rf'"((?:[^"\\]|{_ESCAPE})*)"' rf"|'((?:[^'\\]|{_ESCAPE})*)'"
+)
+_ESCAPED: re.Pattern[str] = re.compile(r"\\([!-/:-@\[-`{-~])")
+
+
+def _unescape(text: str) -> str:
+    """
+    Resolves the backslash escapes of ASCII punctuation in text
+    """
+    return _ESCAPED.sub(r"\1", text) if "\\" in text else text
+
+
+def _is_punctuation(char: str) -> bool:
+    return category(char)[0] in "PS"
+
+
+class _Node(object):
+    """
+    An entry in the doubly linked list of inline nodes. value is a str for
+    text and a DOM for elements that have already been built.
+    """
+
+    __slots__ = ("value", "prev", "next")
+
+    def __init__(self, value: Union[DOM, str]):
+        self.value: Union[DOM, str] = value
+        self.prev: _Node | None = None
+        self.next: _Node | None = None
+
+
+class _Delimiter(object):
+    """
+    A run of * or _ that may open or close emphasis, kept in the delimiter
+    stack
+    """
+
+    __slots__ = (
+        "node",
+        "char",
+        "count",
+        "original",
+        "can_open",
+        "can_close",
+        "position",
+        "prev",
+        "next",
+    )
+
+    def __init__(
+        self, node: _Node, char: str, count: int, can_open: bool, can_close: bool
+    ):
+        self.node: _Node = node
+        self.char: str = char
+        self.count: int = count  # delimiters of the run left to match
+        self.original: int = count
+        self.can_open: bool = can_open
+        self.can_close: bool = can_close
+        self.position: int = 0  # order of the delimiter in the text
+        self.prev: _Delimiter | None = None
+        self.next: _Delimiter | None = None
+
+
+class _Bracket(object):
+    """
+    An opening [ that may start a link
+    """
+
+    __slots__ = ("node", "delimiters")
+
+    def __init__(self, node: _Node, delimiters: int):
+        self.node: _Node = node
+        # position of the last delimiter before the bracket
+        self.delimiters: int = delimiters
+
+
+class InlineScanner(object):
+    """
+    Parses the inline structure of a string into text and em, strong, code
+    and a elements.
+
+    Follows the delimiter stack algorithm of CommonMark: text is scanned once
+    from left to right and emphasis is resolved with a lower bound on the
+    openers searched for every kind of closer, so the work is linear in the
+    length of the text whatever it contains. Link destinations can not
+    contain parentheses, which keeps failed links from being rescanned.
+    """
+
+    def parse(self, text: str) -> list[Union[DOM, str]]:
+        if _SPECIAL.search(text) is None:
+            return [text]
+
+        self._text: str = text
+        self._head: _Node | None = None
+        self._tail: _Node | None = None
+        self._delimiters: _Delimiter | None = None  # top of the stack
+        self._positions: int = 0
+        self._brackets: list[_Bracket] = []
+        # brackets below this index can not open links any more
+        self._active_brackets: int = 0
+
+        # positions of every run of backticks by length and the index of the
+        # first one that could still close a code span
+        self._backticks: dict[int, list[int]] | None = None
+        self._backtick_index: dict[int, int] = {}
+
+        pos: int = 0
+        end: int = len(text)
+        while pos < end:
+            matched: re.Match[str] | None = _SPECIAL.search(text, pos)
+            if matched is None:
+                self._append(text[pos:])
+                break
+
+            start: int = matched.start()
+            if start > pos:
+                self._append(text[pos:start])
+
+            char: str = text[start]
+            if char == "\\":
+                pos = self._backslash(start)
+            elif char == "`":
+                pos = self._code_span(start)
+            elif char == "[":
+                self._brackets.append(_Bracket(self._append("["), self._positions))
+                pos = start + 1
+            elif char == "]":
+                pos = self._close_bracket(start)
+            else:
+                pos = self._delimiter_run(start)
+
+        self._process_emphasis(0)
+        return self._collect(self._head, None)
+
+    def _append(self, value: Union[DOM, str]) -> _Node:
+        node: _Node = _Node(value)
+        if self._tail is None:
+            self._head = node
+        else:
+            self._tail.next = node
+            node.prev = self._tail
+        self._tail = node
+        return node
+
+    def _unlink(self, node: _Node):
+        if node.prev is None:
+            self._head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is None:
+            self._tail = node.prev
+        else:
+            node.next.prev = node.prev
+
+    def _collect(self, first: _Node | None, stop: _Node | None) -> list:
+        """
+        Returns the values of the nodes from first up to stop, joining
+        adjacent text
+        """
+        children: list[Union[DOM, str]] = []
+        texts: list[str] = []
+        node: _Node | None = first
+        while node is not stop:
+            if isinstance(node.value, str):
+                texts.append(node.value)
+            else:
+                if texts:
+                    children.append("".join(texts))
+                    texts.clear()
+                children.append(node.value)
+            node = node.next
+
+        if texts:
+            children.append("".join(texts))
+        return [child for child in children if child != ""]
+
+    def _backslash(self, start: int) -> int:
+        """
+        A backslash before ASCII punctuation makes it literal text
+        """
+        text: str = self._text
+        if start + 1 < len(text) and text[start + 1] in _ESCAPABLE:
+            self._append(text[start + 1])
+            return start + 2
+
+        self._append("\\")
+        return start + 1
+
+    def _code_span(self, start: int) -> int:
+        """
+        Matches a run of backticks with the next run of the same length
+        """
+        text: str = self._text
+        end: int = _BACKTICKS.match(text, start).end()
+        length: int = end - start
+
+        if self._backticks is None:
+            self._backticks = {}
+            for run in _BACKTICKS.finditer(text):
+                self._backticks.setdefault(run.end() - run.start(), []).append(
+                    run.start()
+                )
+
+        # runs are only ever looked up after the previous opener, so the
+        # search for every length only moves forward
+        runs: list[int] = self._backticks.get(length, [])
+        index: int = self._backtick_index.get(length, 0)
+        while index < len(runs) and runs[index] < end:
+            index += 1
+        self._backtick_index[length] = index
+
+        if index == len(runs):
+            self._append(text[start:end])
+            return end
+
+        closer: int = runs[index]
+        content: str = text[end:closer].replace("\n", " ")
+        if (
+            len(content) > 2
+            and content[0] == " "
+            and content[-1] == " "
+            and content.strip(" ")
+        ):
+            content = content[1:-1]
+        self._append(DOM("code", children=[content]))
+        return closer + length
+
+    def _delimiter_run(self, start: int) -> int:
+        """
+        Adds a run of * or _ to the delimiter stack
+        """
+        text: str = self._text
+        char: str = text[start]
+        end: int = start + 1
+        while end < len(text) and text[end] == char:
+            end += 1
+
+        before: str = text[start - 1] if start > 0 else "\n"
+        after: str = text[end] if end < len(text) else "\n"
+        before_space: bool = before in _WHITESPACE or before.isspace()
+        after_space: bool = after in _WHITESPACE or after.isspace()
+        before_punctuation: bool = _is_punctuation(before)
+        after_punctuation: bool = _is_punctuation(after)
+
+        left_flanking: bool = not after_space and (
+            not after_punctuation or before_space or before_punctuation
+        )
+        right_flanking: bool = not before_space and (
+            not before_punctuation or after_space or after_punctuation
+        )
+
+        if char == "*":
+            can_open, can_close = left_flanking, right_flanking
+        else:
+            # _ can not be used for emphasis inside of words
+            can_open = left_flanking and (not right_flanking or before_punctuation)
+            can_close = right_flanking and (not left_flanking or after_punctuation)
+
+        node: _Node = self._append(text[start:end])
+        if can_open or can_close:
+            delimiter: _Delimiter = _Delimiter(
+                node, char, end - start, can_open, can_close
+            )
+            self._positions += 1
+            delimiter.position = self._positions
+            delimiter.prev = self._delimiters
+            if self._delimiters is not None:
+                self._delimiters.next = delimiter
+            self._delimiters = delimiter
+        return end
+
+    def _remove_delimiter(self, delimiter: _Delimiter):
+        if delimiter.prev is not None:
+            delimiter.prev.next = delimiter.next
+        if delimiter.next is None:
+            self._delimiters = delimiter.prev
+        else:
+            delimiter.next.prev = delimiter.prev
+
+    def _close_bracket(self, start: int) -> int:
+        """
+        Turns the text since the last [ into a link if ] is followed by a
+        destination
+        """
+        if len(self._brackets) <= self._active_brackets:
+            # there is no [ or it is inside of another link
+            if self._brackets:
+                self._brackets.pop()
+                self._active_brackets = len(self._brackets)
+            self._append("]")
+            return start + 1
+
+        bracket: _Bracket = self._brackets.pop()
+        link: tuple[int, str, str | None] | None = self._link_destination(start + 1)
+        if link is None:
+            self._append("]")
+            return start + 1
+
+        end, destination, title = link
+        self._process_emphasis(bracket.delimiters)
+
+        attributes: dict[str, str] = {"href": destination}
+        if title is not None:
+            attributes["title"] = title
+        element: DOM = DOM(
+            "a",
+            children=self._collect(bracket.node.next, None),
+            attributes=attributes,
+        )
+
+        # the text of the link replaces the bracket and everything after it
+        self._tail = bracket.node
+        bracket.node.value = element
+        bracket.node.next = None
+
+        # links can not contain other links
+        self._active_brackets = len(self._brackets)
+        return end
+
+    def _link_destination(self, pos: int) -> tuple[int, str, str | None] | None:
+        """
+        Parses (destination "title") at pos and returns the position after it,
+        the destination and the title
+        """
+        text: str = self._text
+        if not text.startswith("(", pos):
+            return None
+
+        pos = _SPACE.match(text, pos + 1).end()
+        matched: re.Match[str] | None = _POINTY_DESTINATION.match(text, pos)
+        if matched is None:
+            if text.startswith("<", pos):
+                return None
+            matched = _DESTINATION.match(text, pos)
+        destination: str = _unescape(matched.group(1))
+        pos = matched.end()
+
+        title: str | None = None
+        after: int = _SPACE.match(text, pos).end()
+        if after > pos:
+            matched = _TITLE.match(text, after)
+            if matched is not None:
+                title = _unescape(matched.group(1) or matched.group(2) or "")
+                after = _SPACE.match(text, matched.end()).end()
+
+        if not text.startswith(")", after):
+            return None
+        return after + 1, destination, title
+
+    def _process_emphasis(self, bottom: int):
+        """
+        Matches the delimiters after position bottom into em and strong
+        elements and removes them from the stack
+        """
+        # find the first delimiter above the bottom
+        closer: _Delimiter | None = self._delimiters
+        first: _Delimiter | None = None
+        while closer is not None and closer.position > bottom:
+            first = closer
+            closer = closer.prev
+        closer = first
+
+        # positions below which no opener was found for a kind of closer, the
+        # kind decides which openers could match
+        openers_bottom: dict[tuple[str, bool, int], int] = {}
+
+        while closer is not None:
+            if not closer.can_close:
+                closer = closer.next
+                continue
+
+            kind: tuple[str, bool, int] = (
+                closer.char,
+                closer.can_open,
+                closer.original % 3,
+            )
+            floor: int = max(bottom, openers_bottom.get(kind, bottom))
+            opener: _Delimiter | None = closer.prev
+            while opener is not None and opener.position > floor:
+                if (
+                    opener.char == closer.char
+                    and opener.can_open
+                    and not self._odd_match(opener, closer)
+                ):
+                    break
+                opener = opener.prev
+            else:
+                opener = None
+
+            if opener is None:
+                openers_bottom[kind] = closer.prev.position if closer.prev else 0
+                following: _Delimiter | None = closer.next
+                if not closer.can_open:
+                    self._remove_delimiter(closer)
+                closer = following
+                continue
+
+            closer = self._emphasis(opener, closer)
+
+        # everything above the bottom has been matched or is literal text
+        while self._delimiters is not None and self._delimiters.position > bottom:
+            self._remove_delimiter(self._delimiters)
+
+    def _odd_match(self, opener: _Delimiter, closer: _Delimiter) -> bool:
+        """
+        The rule of 3: a delimiter that can both open and close can not match
+        one whose length adds up with it to a multiple of 3, unless both are
+        multiples of 3
+        """
+        return (
+            (opener.can_close or closer.can_open)
+            and (opener.original + closer.original) % 3 == 0
+            and not (opener.original % 3 == 0 and closer.original % 3 == 0)
+        )
+
+    def _emphasis(self, opener: _Delimiter, closer: _Delimiter) -> _Delimiter | None:
+        """
+        Wraps the nodes between opener and closer in an em or strong element
+        and returns the closer to continue with
+        """
+        used: int = 2 if opener.count >= 2 and closer.count >= 2 else 1
+        opener.count -= used
+        closer.count -= used
+        opener.node.value = opener.node.value[:-used]
+        closer.node.value = closer.node.value[used:]
+
+        element: DOM = DOM(
+            "strong" if used == 2 else "em",
+            children=self._collect(opener.node.next, closer.node),
+        )
+        node: _Node = _Node(element)
+        node.prev = opener.node
+        node.next = closer.node
+        opener.node.next = node
+        closer.node.prev = node
+
+        # delimiters in between are now inside of the element as text
+        opener.next = closer
+        closer.prev = opener
+
+        if opener.count == 0:
+            self._unlink(opener.node)
+            self._remove_delimiter(opener)
+        if closer.count == 0:
+            following: _Delimiter | None = closer.next
+            self._unlink(closer.node)
+            self._remove_delimiter(closer)
+            return following
+        return closer
+
+
+def parse_inline(text: str) -> list[Union[DOM, str]]:
+    """
+    Returns the text and elements making up the inline structure of text
+    """
+    return InlineScanner().parse(text)
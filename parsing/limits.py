@@ -0,0 +1,105 @@
+"""
+Resource limits for parsing untrusted documents
+"""
+
+from sys import maxsize
+from time import perf_counter
+from typing import NamedTuple
+
+# stands in for unset limits, it is never reached and adding to it still
+# gives a valid index
+UNLIMITED: int = maxsize // 2
+
+
+class Limits(NamedTuple):
+    """
+    Bounds on the resources a single parse may use, None meaning unlimited.
+
+    max_bytes and max_line_length count characters for text streams and
+    bytes for encoded buffers. Elements count as one node each and so do
+    strings of text. max_steps bounds the tokens read plus the characters
+    scanned for inline structure.
+
+    With fallback set, a paragraph or header whose inline structure would
+    exceed max_nodes or max_depth keeps its text, escaped, instead of the
+    parse failing.
+    """
+
+    max_bytes: int | None = None
+    max_line_length: int | None = None
+    max_nodes: int | None = None
+    max_depth: int | None = None
+    max_steps: int | None = None
+    max_seconds: float | None = None
+    fallback: bool = False
+
+
+class LimitExceeded(ValueError):
+    """
+    Raised when a parse goes over one of its Limits
+    """
+
+    def __init__(self, limit: str, maximum: float):
+        super().__init__(f"{limit} exceeds the limit of {maximum}")
+        self.limit: str = limit
+        self.maximum: float = maximum
+
+
+class Budget(object):
+    """
+    The resources used so far by one parse, checked against its limits.
+
+    Unset limits are stored as UNLIMITED so the checks are plain
+    comparisons.
+    """
+
+    def __init__(self, limits: Limits):
+        self.limits: Limits = limits
+        self.max_bytes: int = _or_max(limits.max_bytes)
+        self.max_line_length: int = _or_max(limits.max_line_length)
+        self.max_nodes: int = _or_max(limits.max_nodes)
+        self.max_depth: int = _or_max(limits.max_depth)
+        self.max_steps: int = _or_max(limits.max_steps)
+        self.deadline: float | None = (
+            None if limits.max_seconds is None else perf_counter() + limits.max_seconds
+        )
+
+        self.nodes: int = 0
+        self.steps: int = 0
+
+    def check_bytes(self, size: int):
+        if size > self.max_bytes:
+            raise LimitExceeded("input size", self.max_bytes)
+
+    def check_line(self, length: int):
+        if length > self.max_line_length:
+            raise LimitExceeded("line length", self.max_line_length)
+
+    def check_depth(self, depth: int):
+        if depth > self.max_depth:
+            raise LimitExceeded("nesting depth", self.max_depth)
+
+    def fits(self, nodes: int, depth: int) -> bool:
+        """
+        Returns whether nodes more nodes reaching depth stay within the limits
+        """
+        return self.nodes + nodes <= self.max_nodes and depth <= self.max_depth
+
+    def add_nodes(self, count: int):
+        self.nodes += count
+        if self.nodes > self.max_nodes:
+            raise LimitExceeded("number of nodes", self.max_nodes)
+
+    def step(self, count: int = 1):
+        """
+        Adds count steps and checks the step and time budgets
+        """
+        self.steps += count
+        if self.steps > self.max_steps:
+            raise LimitExceeded("number of steps", self.max_steps)
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise LimitExceeded("parse time", self.limits.max_seconds)
+
+
+def _or_max(limit: int | None) -> int:
+    return UNLIMITED if limit is None else limit
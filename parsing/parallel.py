@@ -0,0 +1,170 @@
+"""
+Parsing of single large documents with a pool of processes
+"""
+
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import repeat
+from os import cpu_count
+from os.path import getsize
+from typing import Iterable, Iterator
+
+from dom.binary import EncodedTree, decode_blocks, encode_blocks
+from dom.renderer import DOM, render
+from parsing.limits import Limits
+from parsing.parser import BlockParser, InlineParser, Parser, open_source
+from parsing.passes import Pass
+from parsing.profiling import Profiler
+from parsing.tokenizer import Buffer, ascii_compatible
+
+# files smaller than this are parsed in this process since starting the
+# workers and sending the blocks back would take longer than the parse
+MIN_SIZE: int = 4 * 1024**2
+
+# number of ranges handed to every worker, more ranges even out the load
+# when parts of the document take longer to parse than others
+RANGES_PER_JOB: int = 4
+
+# a blank line together with the end of the line before it, lines end at
+# \n, \r\n or a lone \r. A \r is only a line end of its own when no \n
+# follows, so a \r\n is never taken for two line ends.
+_BLANK_LINE: re.Pattern[bytes] = re.compile(
+    rb"(?:\r\n|\r(?!\n)|\n)[ \t]*(?:\r\n|\r(?!\n)|\n)"
+)
+
+
+class ParallelParser(Parser):
+    """
+    A Parser that splits large documents into ranges of lines which are
+    parsed by jobs processes, cpu_count() by default.
+
+    A blank line ends every block, including code blocks, so the document is
+    only split after blank lines and every range parses to the same blocks
+    as in the whole document. The blocks of the ranges are put back together
+    in order.
+
+    Documents are parsed in this process when they are smaller than min_size,
+    when their encoding has to be decoded before tokenizing or when they are
+    profiled or limited, since profiles and budgets can not be combined
+    across processes, or when there are passes, which may keep state across
+    the whole document like HeadingIds. An executor can be passed to share a
+    pool between parses, otherwise one is started for every parse.
+    """
+
+    def __init__(
+        self,
+        jobs: int | None = None,
+        *,
+        encoding: str = "utf-8",
+        profiler: Profiler | None = None,
+        limits: Limits | None = None,
+        min_size: int = MIN_SIZE,
+        executor: Executor | None = None,
+        passes: Iterable[Pass] = (),
+    ):
+        super().__init__(
+            encoding=encoding, profiler=profiler, limits=limits, passes=passes
+        )
+        self.jobs: int = jobs or cpu_count() or 1
+        self.min_size: int = min_size
+        self.executor: Executor | None = executor
+
+    def parse(self, path: str) -> DOM:
+        if not self._parallel(path):
+            return super().parse(path)
+        return DOM("html", children=[DOM("body", children=self.iter_blocks(path))])
+
+    def iter_blocks(self, path: str) -> Iterator[DOM]:
+        """
+        Yields the top level blocks of the body in order. Unlike in a Parser
+        the blocks of a range are produced all at once by a worker.
+        """
+        if not self._parallel(path):
+            yield from super().iter_blocks(path)
+            return
+
+        for encoded in self._iter_encoded(path):
+            yield from decode_blocks(encoded)
+
+    def iter_html(self, path: str) -> Iterator[str]:
+        """
+        Yields the html of the top level blocks in order, which can be passed
+        to render_blocks_to.
+
+        The ranges parsed by the workers are rendered straight from their
+        binary encoding, so no DOM is built in this process.
+        """
+        if not self._parallel(path):
+            yield from map(render, super().iter_blocks(path))
+            return
+
+        for encoded in self._iter_encoded(path):
+            yield from EncodedTree(encoded).iter_render()
+
+    def _iter_encoded(self, path: str) -> Iterator[bytes]:
+        """
+        Yields the blocks of every range encoded by encode_blocks
+        """
+        with open_source(path, self.encoding) as buffer:
+            offsets: list[int] = split_offsets(buffer, self.jobs * RANGES_PER_JOB)
+
+        arguments: tuple = (
+            repeat(path),
+            offsets[:-1],
+            offsets[1:],
+            repeat(self.encoding),
+        )
+        if self.executor is not None:
+            yield from self.executor.map(_parse_range, *arguments)
+            return
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            yield from executor.map(_parse_range, *arguments)
+
+    def _parallel(self, path: str) -> bool:
+        return (
+            self.jobs > 1
+            and self.profiler is None
+            and self.limits is None
+            and not self.passes
+            and ascii_compatible(self.encoding)
+            and getsize(path) >= self.min_size
+        )
+
+
+def split_offsets(buffer: Buffer, parts: int) -> list[int]:
+    """
+    Returns the offsets that split buffer into at most parts ranges of about
+    the same size, from 0 to the end of buffer.
+
+    Ranges start at the line after a blank line, so they can be parsed on
+    their own.
+    """
+    size: int = len(buffer)
+    offsets: list[int] = [0]
+    for part in range(1, parts):
+        target: int = size * part // parts
+        if target <= offsets[-1]:
+            continue
+
+        blank_line: re.Match[bytes] | None = _BLANK_LINE.search(buffer, target - 1)
+        if blank_line is None:
+            break
+        if blank_line.end() < size:
+            offsets.append(blank_line.end())
+    offsets.append(size)
+    return offsets
+
+
+def _parse_range(path: str, start: int, end: int, encoding: str) -> bytes:
+    """
+    Parses the bytes from start to end of the file at path in a worker and
+    returns the blocks encoded, which is much cheaper to send back than
+    pickled DOM objects
+    """
+    block_parser: BlockParser = BlockParser(encoding=encoding)
+    inline_parser: InlineParser = InlineParser()
+    with open_source(path, encoding) as buffer:
+        return encode_blocks(
+            inline_parser.parse(block)
+            for block in block_parser.iter_blocks(buffer[start:end])
+        )
@@ -1,60 +1,356 @@
 """
 Simple parser for markdownp
 """
-from io import TextIOBase
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import copy
+from html import escape
+from io import StringIO, TextIOBase
+from mmap import mmap, ACCESS_READ
+from os import fstat
+from dom.arena import Arena
 from dom.renderer import DOM
-from parsing.tokenizer import BlockTokenizer
-import re
-from typing import Union
+from parsing.inline import InlineScanner
+from parsing.grammar import HEADER, REST, STRIPPED, Grammar, Table, default_grammar
+from parsing.limits import Budget, Limits
+from parsing.passes import Pass, Pipeline
+from parsing.profiling import Profiler, count_nodes
+from parsing.tokenizer import (
+    EOF,
+    Buffer,
+    BlockTokenizer,
+    SpanTokenizer,
+    TokenBatch,
+    ascii_compatible,
+    token_names,
+)
+from typing import IO, Callable, Iterable, Iterator, Union
+
+# a document to parse, either a text stream or an encoded buffer
+Source = Union[TextIOBase, Buffer]
+
+# markdown handed to Parser.parse_markdown, as text, encoded text or a stream
+# of either
+Markdown = Union[str, bytes, bytearray, memoryview, IO[str], IO[bytes]]
+
+
+@contextmanager
+def open_source(path: str, encoding: str = "utf-8") -> Iterator[Source]:
+    """
+    Opens the file at path for parsing.
+
+    Files are memory mapped and tokenized in place when the encoding allows
+    it and read as text otherwise.
+    """
+    if not ascii_compatible(encoding):
+        with open(path, encoding=encoding) as file:
+            yield file
+        return
+
+    with open(path, "rb") as file:
+        # empty files can not be mapped
+        if fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+
+        with mmap(file.fileno(), 0, access=ACCESS_READ) as buffer:
+            yield buffer
+
+
+def as_source(markdown: Markdown, encoding: str = "utf-8") -> Source:
+    """
+    Returns markdown as a Source. Encoded text is tokenized in place when the
+    encoding allows it, streams that are not text streams are read whole.
+    """
+    # lines end at a lone \r as well, as they do when bytes are tokenized
+    if isinstance(markdown, str):
+        return StringIO(markdown, newline=None)
+    if isinstance(markdown, TextIOBase):
+        return markdown
+    if not isinstance(markdown, (bytes, bytearray, memoryview)):
+        return as_source(markdown.read(), encoding)
+
+    if not ascii_compatible(encoding):
+        return StringIO(str(markdown, encoding), newline=None)
+    if isinstance(markdown, memoryview):
+        return markdown.tobytes()
+    return markdown
 
 
 class Parser(object):
+    """
+    Parses markdown files into DOM trees.
+
+    The inline structure is parsed and the passes are run in the same
+    traversal of the document, or of every block as soon as it is closed
+    with iter_blocks. A profiler reports that traversal as the inline stage.
+
+    With lazy_inline the text of paragraphs and headers is only parsed when
+    their children are first read, for example by the renderer, so callers
+    that only use part of a document do not pay for the rest, see
+    defer_inline. Limits and passes work on the parsed text and can not be
+    combined with it.
+
+    A Parser only holds options. Every parse gets its own BlockParser,
+    InlineParser and copies of the passes, so one Parser can be shared by
+    any number of threads. Only a profiler, which adds up the stages of
+    every parse it sees, should not be used by several at a time.
+    """
+
+    def __init__(
+        self,
+        *,
+        encoding: str = "utf-8",
+        profiler: Profiler | None = None,
+        limits: Limits | None = None,
+        passes: Iterable[Pass] = (),
+        lazy_inline: bool = False,
+    ):
+        self.encoding: str = encoding
+        # reports the stages of the parse when set
+        self.profiler: Profiler | None = profiler
+        # bounds the resources used by every parse when set
+        self.limits: Limits | None = limits
+        # run after the inline parser on every element
+        self.passes: list[Pass] = list(passes)
+        self.lazy_inline: bool = lazy_inline
+        if lazy_inline and (limits is not None or self.passes):
+            raise ValueError("lazy_inline can not be combined with limits or passes")
+
     def parse(self, path: str) -> DOM:
-        with open(path) as file:
-            block_parser: BlockParser = BlockParser()
-            inline_parser: InlineParser = InlineParser()
-            dom: DOM = block_parser.parse(file)
-            dom = inline_parser.parse(dom)
-            return dom
+        with open_source(path, self.encoding) as file:
+            return self._parse(file)
+
+    def parse_markdown(self, markdown: Markdown) -> DOM:
+        """
+        Parses markdown given as a str, as bytes in the encoding of the
+        parser or as a text or binary stream
+        """
+        return self._parse(as_source(markdown, self.encoding))
+
+    def parse_many(
+        self, documents: Iterable[Markdown], *, workers: int | None = None
+    ) -> list[DOM]:
+        """
+        Parses every document with parse_markdown on a pool of worker
+        threads and returns the trees in the same order.
+
+        The threads share nothing but this Parser, so on Python builds
+        without the global interpreter lock they parse in parallel. With a
+        profiler the documents are parsed one at a time.
+        """
+        if self.profiler is not None:
+            return list(map(self.parse_markdown, documents))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.parse_markdown, documents))
+
+    def iter_blocks(self, path: str) -> Iterator[DOM]:
+        """
+        Lazily parses the file at path and yields each top level block of the
+        body as soon as it is complete.
+
+        Only the block that is currently being parsed is held in memory, so
+        documents of any size can be rendered block by block.
+        """
+        with open_source(path, self.encoding) as file:
+            block_parser: BlockParser = BlockParser(
+                encoding=self.encoding, profiler=self.profiler, limits=self.limits
+            )
+            inline_parser: InlineParser = InlineParser(limits=self.limits)
+            pipeline: Pipeline = self._pipeline(inline_parser)
+            for block in block_parser.iter_blocks(file):
+                inline_parser.budget = block_parser.budget
+                # blocks end up inside of html and body
+                yield self._apply(pipeline, block, 3)
+
+    def parse_into(self, path: str, arena: Arena) -> int:
+        """
+        Parses the file at path straight into arena and returns the handle of
+        the document
+        """
+        return arena.add_blocks(self.iter_blocks(path))
+
+    def _parse(self, file: Source) -> DOM:
+        block_parser: BlockParser = BlockParser(
+            encoding=self.encoding, profiler=self.profiler, limits=self.limits
+        )
+        inline_parser: InlineParser = InlineParser(limits=self.limits)
+        pipeline: Pipeline = self._pipeline(inline_parser)
+        dom: DOM = block_parser.parse(file)
+        inline_parser.budget = block_parser.budget
+        return self._apply(pipeline, dom, 1)
+
+    def _pipeline(self, inline_parser: "InlineParser") -> Pipeline:
+        """
+        Returns the started pipeline of the inline parser and copies of the
+        passes for a new document
+        """
+        pipeline: Pipeline = Pipeline([inline_parser, *map(copy, self.passes)])
+        pipeline.start()
+        return pipeline
+
+    def _apply(self, pipeline: Pipeline, dom: DOM, depth: int) -> DOM:
+        if self.lazy_inline:
+            return defer_inline(dom)
+        if self.profiler is None:
+            return pipeline.apply(dom, depth=depth)
+        with self.profiler.stage("inline"):
+            return pipeline.apply(dom, depth=depth)
 
 
 class BlockParser(object):
-    def parse(self, file: TextIOBase) -> DOM:
-        self._tokenizer = BlockTokenizer(file)
-        self._lookahead = self._tokenizer.get_next_token()
-        self._open_block_stack: list[DOM] = []
+    def __init__(
+        self,
+        *,
+        encoding: str = "utf-8",
+        profiler: Profiler | None = None,
+        limits: Limits | None = None,
+        grammar: Grammar = default_grammar,
+    ):
+        # used to decode sources that are encoded buffers
+        self.encoding: str = encoding
+        # the rules the blocks are read with and the scanner of their lines
+        self.grammar: Grammar = grammar
+        # times tokenizing and parsing and counts tokens and nodes when set
+        self.profiler: Profiler | None = profiler
+        # bounds the input and the tree of every parse when set, the usage of
+        # the current parse is kept in budget
+        self.limits: Limits | None = limits
+        self.budget: Budget | None = None
+
+    def parse(self, file: Source) -> DOM:
+        self._start(file, 0)
+        if self.profiler is None:
+            return self._html()
+
+        with self.profiler.stage("block"):
+            tree: DOM = self._html()
+        self._count_nodes(tree)
+        return tree
+
+    def iter_blocks(
+        self, file: Source, *, budget: Budget | None = None
+    ) -> Iterator[DOM]:
+        """
+        Yields the top level blocks of the body one at a time instead of
+        building the whole document.
 
-        return self._html()
+        budget continues the usage of an earlier parse, for example of the
+        previous part of a document that is parsed piece by piece.
+        """
+        self._start(file, 2, budget)
+        if self.profiler is None:
+            yield from self._elements()
+            return
 
-    def _eat(self, expected_type: str) -> dict[str, str]:
+        for block in self.profiler.iter_stage("block", self._elements()):
+            self._count_nodes(block)
+            yield block
+
+    def iter_spans(self, file: Source) -> Iterator[tuple[int, int, DOM]]:
+        """
+        Yields (start, end, block) for every top level block where start and
+        end are the offsets of the lines the block was parsed from. Offsets
+        are in characters for text streams and in bytes for buffers.
+        """
+        self._start(file, 2)
+        yield from self._spanned_elements()
+
+    def parse_into(self, file: Source, arena: Arena) -> int:
+        """
+        Stores the document in arena one block at a time and returns its
+        handle
+        """
+        return arena.add_blocks(self.iter_blocks(file))
+
+    def _start(self, file: Source, depth: int, budget: Budget | None = None):
+        """
+        Resets the parse state to the beginning of file. depth is the number
+        of ancestors the elements that are opened will have.
+        """
+        if budget is None and self.limits is not None:
+            budget = Budget(self.limits)
+        self.budget = budget
+        self._depth: int = depth
+
+        if isinstance(file, (bytes, bytearray, mmap)):
+            self._tokenizer = SpanTokenizer(
+                file,
+                encoding=self.encoding,
+                scanner=self.grammar.scanner,
+                budget=self.budget,
+            )
+        else:
+            self._tokenizer = BlockTokenizer(
+                file, self.grammar.scanner, budget=self.budget
+            )
+        self._read_batch: Callable[[], TokenBatch] = self._tokenizer.read_batch
+        if self.profiler is not None:
+            self._read_batch = self._profiled_read_batch
+
+        # the lookahead is token _index of _batch and _type is its type code
+        self._batch: TokenBatch = self._read_batch()
+        self._index: int = 0
+        self._type: int = self._batch.types[0]
+        self._open_block_stack: list[DOM] = []
+        # the dispatch tables of the grammar as they are for this parse
+        self._starts: dict[int, Table] = self.grammar.starts
+        self._default: Table = self.grammar.default
+
+    def _profiled_read_batch(self) -> TokenBatch:
+        with self.profiler.stage("tokenize"):
+            batch: TokenBatch = self._tokenizer.read_batch()
+        self.profiler.count("tokens", len(batch))
+        return batch
+
+    def _count_nodes(self, tree: DOM):
+        elements, texts = count_nodes(tree)
+        self.profiler.count("elements", elements)
+        self.profiler.count("text nodes", texts)
+
+    def _advance(self, index: int):
         """
-        Consume the lookahead and set the lookahead to the next token
+        Moves the lookahead to token index of the current batch, reading the
+        next batch once the current one is used up
         """
-        if self._lookahead["type"] == expected_type:
-            old_token = self._lookahead
-            self._lookahead = self._tokenizer.get_next_token()
-            return old_token
+        if index >= len(self._batch.types):
+            self._batch = self._read_batch()
+            index = 0
+        self._index = index
+        self._type = self._batch.types[index]
 
+    def _eat(self, expected_type: int) -> str | None:
+        """
+        Consume the lookahead, set the lookahead to the next token and return
+        the value of the consumed token
+        """
+        if self._type == expected_type:
+            value: str | None = self._batch.values[self._index]
+            self._advance(self._index + 1)
+            return value
+
+        lookahead: dict[str, str] = {"type": token_names[self._type]}
+        if self._batch.values[self._index] is not None:
+            lookahead["value"] = self._batch.values[self._index]
         raise SyntaxError(
-            f"Received unexpected line {self._lookahead}, " f"expected {expected_type}"
+            f"Received unexpected line {lookahead}, "
+            f"expected {token_names[expected_type]}"
         )
 
-    def _eat_rest_of_line(self) -> str:
+    @property
+    def _line_start(self) -> int:
         """
-        Consume entire stream until the next '\\n' character.
-
-        Used when token values for a line should be ignored.
+        The offset of the line the lookahead was read from
         """
-        # the line is the current token + any remaining text in the line
-        line: str = self._lookahead["value"] + self._tokenizer.get_rest_of_line()
-        self._lookahead = self._tokenizer.get_next_token()
-        return line
+        return self._batch.line_starts[self._batch.lines[self._index]]
 
     def _write_to_current_open_block(self, *items: Union["DOM", str]):
         """
         Writes the provided items to the children of the top element in the
         open_block_stack.
         """
+        if self.budget is not None:
+            self.budget.add_nodes(sum(not isinstance(item, DOM) for item in items))
         self._open_block_stack[-1].children.extend(items)
 
     def _open_block(self, block_type: str):
@@ -62,6 +358,9 @@ class BlockParser(object):
         Pushes given block to the open block stack and updates the current block
         pointer.
         """
+        if self.budget is not None:
+            self.budget.add_nodes(1)
+            self.budget.check_depth(self._depth + len(self._open_block_stack) + 1)
         self._open_block_stack.append(DOM(block_type))
 
     def _close_block(self) -> DOM:
@@ -92,121 +391,293 @@ class BlockParser(object):
             | Element
             ;
         """
-        elements: list[DOM | str] = []
-        while self._lookahead["type"] != "EOF":
-            next_element: DOM | None = self._element()
-            if next_element:
-                elements.append(next_element)
-
-        return elements
+        return list(self._elements())
 
-    def _element(self) -> DOM | None:
+    def _elements(self) -> Iterator[DOM]:
         """
-        Element
-            :   AtxHeader
-            |   Paragraph
-            |   CodeBlock
-            ;
+        Lazily parses the ElementList, yielding each Element once it is
+        closed.
         """
-        if self._lookahead["type"] == "BLANK_LINE":
-            # if there is a blank line here then skip it
-            self._eat("BLANK_LINE")
-            return
-        if self._lookahead["type"] == "ATX_HEADER":
-            return self._atx_header()
-        if self._lookahead["type"] == "INDENT":
-            return self._code_block()
-
-        # otherwise treat as a paragraph
-        return self._paragraph()
+        for _, _, element in self._spanned_elements():
+            yield element
 
-    def _code_block(self) -> DOM:
+    def _spanned_elements(self) -> Iterator[tuple[int, int, DOM]]:
         """
-        CodeBlock
-            : CodeBlock IndentLine
-            | IndentLine
-            ;
+        Same as _elements but also yields the character offsets of the source
+        lines each Element was parsed from.
         """
-        self._open_block("pre")
-        self._open_block("code")
-        self._write_to_current_open_block(self._indent_line())
-        while self._lookahead["type"] == "INDENT":
-            self._write_to_current_open_block("\n" + self._indent_line())
-        self._write_to_current_open_block(self._close_block())
-        return self._close_block()
+        while self._type != EOF:
+            start: int = self._line_start
+            next_element: DOM | None = self._element()
+            if next_element:
+                # elements always stop at the start of a line, which is where
+                # the lookahead was read from
+                yield start, self._line_start, next_element
 
-    def _indent_line(self) -> str:
+    def _element(self) -> DOM | None:
         """
-        IndentLine
-            : INDENT LINE
+        Element
+            : BLANK_LINE
+            | AtxHeader
+            | CodeBlock
+            | Paragraph
             ;
 
-        LINE = the rest of the line it will not be analyzed as a token
+        Each is read with the rule of self.grammar for the type of its first
+        token, see parsing.grammar
         """
-        self._eat("INDENT")
-        return self._eat_rest_of_line()
-
-    def _atx_header(self) -> DOM:
+        tags, lines = self._read_block()
+        if not tags:
+            return None
+
+        # every line after the first is a text node of its own that starts
+        # with the new line before it
+        for index in range(1, len(lines)):
+            lines[index] = "\n" + lines[index]
+        children: list[DOM | str] = lines
+        for tag in reversed(tags):
+            children = [DOM(tag, children=children)]
+        return children[0]
+
+    def _read_block(self) -> tuple[tuple[str, ...], list[str]]:
         """
-        AtxHeader
-            : ATX_HEADER
-            ;
+        Reads the lines of the next Element with the rule for the type of the
+        lookahead and returns the tags of its elements, outermost first, and
+        the text of its lines
         """
-
-        header: str = self._eat("ATX_HEADER")["value"]
-
-        # we need to figure out how many '#'s there are
-        matched: re.Match[str] | None = re.match("#{1,6}", header)
-        if matched:
-            header_level: int = len(matched.group())
-
-            return DOM(f"h{header_level}", children=[header.strip(" \t#")])
-
-        raise SyntaxError(
-            f"Incorrect header format. Received {header}, "
-            "expected 1-6 # characters leading"
-        )
-
-    def _paragraph(self) -> DOM:
-        # paragraph should end if it is followed by anything other than
-        # TEXT_LINE, INDENT_LINE,  but it can have multiple of them.
-        # I'm not sure the best way to write this but here is a stab
-        # at it
+        table: Table = self._starts.get(self._type, self._default)
+        tags: tuple[str, ...] = table.tags
+        continued: dict[int, int] = table.continued
+        budget: Budget | None = self.budget
+        if budget is not None:
+            for nested in range(len(tags)):
+                budget.add_nodes(1)
+                budget.check_depth(
+                    self._depth + len(self._open_block_stack) + nested + 1
+                )
+
+        if self._type != table.start:
+            # raises the SyntaxError for the lookahead
+            self._eat(table.start)
+        if not tags:
+            # nothing is built so only the tokens are consumed
+            self._advance(self._index + 1)
+            while self._type in continued:
+                self._advance(self._index + 1)
+            return tags, []
+
+        lines: list[str] = []
+        reader: int | None = table.first
+        while reader is not None:
+            batch: TokenBatch = self._batch
+            index: int = self._index
+            if reader & REST:
+                # lines are whole in a batch, so the token after the one the
+                # line starts with is in it too
+                index += 1
+                text: str = batch.values[index] + batch.rest(index)
+                index = batch.line_tokens[batch.lines[index] + 1]
+            else:
+                text = batch.values[index]
+                index += 1
+            # moves the lookahead without a call while it is in the batch
+            if index < len(batch.types):
+                self._index = index
+                self._type = batch.types[index]
+            else:
+                self._advance(index)
+            if reader & STRIPPED:
+                text = text.strip()
+            lines.append(text)
+            reader = continued.get(self._type)
+
+        if table.first & HEADER:
+            # the token always starts with one to six #
+            header: str = lines[0]
+            level: int = len(header) - len(header.lstrip("#"))
+            tags = (*tags[:-1], f"{tags[-1]}{level}")
+            lines[0] = header.strip(" \t#")
+        if budget is not None:
+            budget.add_nodes(len(lines))
+        return tags, lines
+
+
+class InlineParser(Pass):
+    """
+    Parses emphasis, code spans and links in the text of paragraphs and
+    headers.
+    """
+
+    # elements whose text has inline structure
+    elements: frozenset[str] = frozenset(("p", "h1", "h2", "h3", "h4", "h5", "h6"))
+    # the elements the text is parsed into
+    contents: frozenset[str] = frozenset(("em", "strong", "code", "a"))
+
+    def __init__(self, *, limits: Limits | None = None):
+        self.limits: Limits | None = limits
+        # charged for the inline nodes of the document that is being parsed
+        self.budget: Budget | None = None
+        self._scanner: InlineScanner = InlineScanner()
+
+    def parse(self, dom: DOM, budget: Budget | None = None, *, depth: int = 1) -> DOM:
         """
-        Paragraph
-            : TEXT_LINE Paragraph
-            | ParagraphContinuationLine
-            | None
-            ;
+        Replaces the text of the elements in dom with their inline structure
+        and returns dom.
+
+        budget, for example the one of the BlockParser that built dom, is
+        charged for the inline nodes. A new one is used if it is not given
+        and there are limits. depth is the depth of dom in the document.
         """
-        self._open_block("p")
-        self._write_to_current_open_block(self._eat("TEXT_LINE")["value"])
-
-        while (
-            self._lookahead["type"] == "TEXT_LINE"
-            or self._lookahead["type"] == "INDENT"
-        ):
-            # we append the stripped contents of this line to the paragraph
-            # contents and consume the token
-            self._write_to_current_open_block(
-                f"\n{self._p_continuation_line().strip()}"
+        if budget is None and self.limits is not None:
+            budget = Budget(self.limits)
+        self.budget = budget
+        return Pipeline([self]).apply(dom, depth=depth)
+
+    def visit(self, node: DOM, depth: int):
+        scanner: InlineScanner = self._scanner
+        budget: Budget | None = self.budget
+        if budget is None:
+            node.children = _parse_texts(
+                node.children, lambda text, replaced: scanner.parse(text)
             )
+            return
 
-        return self._close_block()
+        node.children = _parse_texts(
+            node.children,
+            lambda text, replaced: self._budgeted(
+                scanner, text, replaced, budget, depth
+            ),
+        )
 
-    def _p_continuation_line(self) -> str:
+    def _budgeted(
+        self,
+        scanner: InlineScanner,
+        text: str,
+        replaced: int,
+        budget: Budget,
+        depth: int,
+    ) -> list[DOM | str]:
         """
-        ParagraphContinuationLine
-            : TEXT_LINE
-            | IndentLine
-            ;
+        Parses text, which replaces replaced text nodes of an element at
+        depth, within budget
         """
-        if self._lookahead["type"] == "TEXT_LINE":
-            return self._eat("TEXT_LINE")["value"]
-        else:
-            return self._indent_line()
-
-
-class InlineParser(object):
-    def parse(self, dom: DOM):
-        return dom
+        budget.step(len(text))
+        children: list[DOM | str] = scanner.parse(text)
+        nodes, levels = _measure(children)
+
+        if not budget.fits(nodes - replaced, depth + levels):
+            if not budget.limits.fallback:
+                budget.check_depth(depth + levels)
+                budget.add_nodes(nodes - replaced)
+            # the text is kept as it is, escaped so it stays plain text
+            children = [escape(text, quote=False)]
+            nodes = 1
+
+        budget.add_nodes(nodes - replaced)
+        return children
+
+
+# the slot descriptor of the children of a DOM
+_CHILDREN = DOM.children
+
+
+class _LazyInline(DOM):
+    """
+    A paragraph or header whose children are the text runs it was parsed
+    from, as a tuple, until they are first read. The text is then parsed and
+    the node turns back into a plain DOM.
+    """
+
+    __slots__ = ()
+
+    @property
+    def children(self) -> list[Union[DOM, str]]:
+        children: tuple | list[Union[DOM, str]] = _CHILDREN.__get__(self)
+        if type(children) is tuple:
+            # threads reading the node at the same time may both parse the
+            # text, which gives them equal children
+            children = _parse_texts(children, _scan)
+            _CHILDREN.__set__(self, children)
+        self.__class__ = DOM
+        return children
+
+    @children.setter
+    def children(self, children: list[Union[DOM, str]]):
+        _CHILDREN.__set__(self, children)
+        self.__class__ = DOM
+
+    def __reduce_ex__(self, protocol):
+        # the text is parsed first, since reading the children while the
+        # node is pickled would change its class halfway, and the node is
+        # pickled as the plain DOM it turns into
+        self.children
+        return self.__reduce_ex__(protocol)
+
+
+def defer_inline(dom: DOM) -> DOM:
+    """
+    Defers the work of the InlineParser on the paragraphs and headers of dom
+    until their children are first read and returns dom.
+
+    Nothing else changes, rendering or walking the whole tree gives the same
+    result as an InlineParser. Since every node is parsed on its own and
+    without limits, this is meant for trees of which only a part is used,
+    such as the excerpt of a long document.
+    """
+    elements: frozenset[str] = InlineParser.elements
+    stack: list[DOM] = [dom]
+    while stack:
+        node: DOM = stack.pop()
+        if node.element not in elements:
+            stack.extend(child for child in node.children if type(child) is not str)
+        elif type(node) is DOM:
+            node.children = tuple(node.children)
+            node.__class__ = _LazyInline
+    return dom
+
+
+def _scan(text: str, replaced: int) -> list[Union[DOM, str]]:
+    # a scanner keeps the state of a parse, lazy nodes may be parsed by
+    # several threads at once
+    return InlineScanner().parse(text)
+
+
+def _parse_texts(
+    children: Iterable[DOM | str], parse: Callable[[str, int], list[DOM | str]]
+) -> list[DOM | str]:
+    """
+    Returns children with every run of adjacent text replaced by what parse
+    returns for the joined text and the number of text nodes it replaces
+    """
+    # adjacent text, such as the lines of a paragraph, is parsed as a whole
+    # so emphasis and links can span lines
+    parsed: list[DOM | str] = []
+    texts: list[str] = []
+    for child in [*children, None]:
+        if isinstance(child, str):
+            texts.append(child)
+            continue
+
+        if texts:
+            text: str = "".join(texts)
+            parsed.extend(parse(text, len(texts)))
+            texts.clear()
+        if child is not None:
+            parsed.append(child)
+    return parsed
+
+
+def _measure(children: list[DOM | str]) -> tuple[int, int]:
+    """
+    Returns the number of nodes in children and how many levels deep they go
+    """
+    nodes: int = 0
+    levels: int = 0
+    stack: list[tuple[DOM | str, int]] = [(child, 1) for child in children]
+    while stack:
+        node, level = stack.pop()
+        nodes += 1
+        levels = max(levels, level)
+        if isinstance(node, DOM):
+            stack.extend((child, level + 1) for child in node.children)
+    return nodes, levels
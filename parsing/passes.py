@@ -0,0 +1,187 @@
+"""
+Transformations of parsed documents that run together in one traversal
+"""
+
+from abc import ABC, abstractmethod
+import re
+from typing import Callable, Iterable
+
+from dom.renderer import DOM
+
+
+class Pass(ABC):
+    """
+    A transformation of the elements of a document.
+
+    The passes of a Pipeline are not run one after the other over the whole
+    document. Instead each element is visited once and handed to every pass
+    that asked for it, in the order of the passes, before its children are
+    visited. A pass therefore sees the children that earlier passes made,
+    for example the links found by the InlineParser.
+    """
+
+    # tags of the elements that are visited, None for every element
+    elements: frozenset[str] | None = None
+
+    # tags of the elements that can be inside of a visited element afterwards,
+    # None if they are not known. A Pipeline does not walk into the elements
+    # that no pass can find anything in.
+    contents: frozenset[str] | None = None
+
+    def start(self):
+        """
+        Called before every document, passes that keep state across the
+        elements of a document reset it here.
+
+        Parsers run a shallow copy of every pass on each document so that
+        documents can be parsed concurrently. State is therefore replaced
+        here rather than changed in place, which would share it between the
+        copies.
+        """
+
+    @abstractmethod
+    def visit(self, node: DOM, depth: int):
+        """
+        Transforms node in place, depth is its depth in the document with the
+        root at 1
+        """
+
+
+class Pipeline(object):
+    """
+    Runs passes over documents or their top level blocks in a single
+    traversal
+    """
+
+    def __init__(self, passes: Iterable[Pass] = ()):
+        self.passes: list[Pass] = list(passes)
+
+        # the passes that visit every element and those for specific tags
+        self._every: list[Pass] = []
+        self._by_tag: dict[str, list[Pass]] = {}
+        for transform in self.passes:
+            if transform.elements is None:
+                self._every.append(transform)
+                for passes in self._by_tag.values():
+                    passes.append(transform)
+                continue
+            for tag in transform.elements:
+                self._by_tag.setdefault(tag, list(self._every)).append(transform)
+
+        # tags of the elements whose descendants no pass visits
+        self._skipped: frozenset[str] = frozenset()
+        if not self._every:
+            self._skipped = frozenset(
+                tag
+                for tag, passes in self._by_tag.items()
+                if all(
+                    transform.contents is not None
+                    and transform.contents.isdisjoint(self._by_tag)
+                    for transform in passes
+                )
+            )
+
+    def start(self):
+        for transform in self.passes:
+            transform.start()
+
+    def run(self, tree: DOM, *, depth: int = 1) -> DOM:
+        """
+        Runs the passes over a whole document and returns it
+        """
+        self.start()
+        return self.apply(tree, depth=depth)
+
+    def apply(self, tree: DOM, *, depth: int = 1) -> DOM:
+        """
+        Runs the passes over tree, which can be a block of a document that
+        was started with start, and returns it
+        """
+        every: list[Pass] = self._every
+        by_tag: dict[str, list[Pass]] = self._by_tag
+        skipped: frozenset[str] = self._skipped
+
+        # elements are visited in document order so passes such as HeadingIds
+        # number them as they appear
+        stack: list[tuple[DOM, int]] = [(tree, depth)]
+        push: Callable[[tuple[DOM, int]], None] = stack.append
+        while stack:
+            node, node_depth = stack.pop()
+            for transform in by_tag.get(node.element, every):
+                transform.visit(node, node_depth)
+            if node.element in skipped:
+                continue
+
+            # a plain loop costs less than extending the stack from a
+            # generator, children are either text or elements
+            node_depth += 1
+            for child in reversed(node.children):
+                if type(child) is not str:
+                    push((child, node_depth))
+        return tree
+
+
+class HeadingIds(Pass):
+    """
+    Gives every header an id made from its text, such as "getting-started",
+    so it can be linked to. Repeated ids are numbered.
+    """
+
+    elements: frozenset[str] = frozenset(("h1", "h2", "h3", "h4", "h5", "h6"))
+
+    def __init__(self):
+        self._used: set[str] = set()
+
+    def start(self):
+        self._used = set()
+
+    def visit(self, node: DOM, depth: int):
+        if node.attributes and "id" in node.attributes:
+            return
+
+        slug: str = _slug(_text(node)) or "section"
+        unique: str = slug
+        number: int = 1
+        while unique in self._used:
+            unique = f"{slug}-{number}"
+            number += 1
+        self._used.add(unique)
+        node.attributes = {**(node.attributes or {}), "id": unique}
+
+
+class RewriteLinks(Pass):
+    """
+    Replaces the href of every link with what rewrite returns for it, for
+    example to make relative links absolute or point .md files to .html
+    """
+
+    elements: frozenset[str] = frozenset(("a",))
+
+    def __init__(self, rewrite: Callable[[str], str]):
+        self.rewrite: Callable[[str], str] = rewrite
+
+    def visit(self, node: DOM, depth: int):
+        if node.attributes and "href" in node.attributes:
+            node.attributes["href"] = self.rewrite(node.attributes["href"])
+
+
+_NOT_SLUG: re.Pattern[str] = re.compile(r"[^\w\- ]+")
+
+
+def _slug(text: str) -> str:
+    return "-".join(_NOT_SLUG.sub("", text).lower().split())
+
+
+def _text(node: DOM) -> str:
+    """
+    Returns the text of node and of all its descendants
+    """
+    parts: list[str] = []
+    stack: list[DOM | str] = [node]
+    while stack:
+        current: DOM | str = stack.pop()
+        if isinstance(current, DOM):
+            stack.extend(reversed(current.children))
+        else:
+            parts.append(current)
+    return "".join(parts)
@@ -0,0 +1,224 @@
+"""
+Instrumentation of the stages of the parse and render pipeline
+"""
+
+from contextlib import contextmanager
+from time import perf_counter
+import tracemalloc
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, TypeVar
+
+from dom.renderer import DOM
+
+T = TypeVar("T")
+
+
+class StageEvent(NamedTuple):
+    """
+    One run of a stage, passed to the callbacks of a Profiler.
+
+    seconds excludes the time spent in stages nested inside of this one.
+    peak_bytes is the most memory in use at once above the level at the start
+    of the run and allocated_bytes what was still in use at its end, both 0
+    unless memory is traced.
+    """
+
+    stage: str
+    seconds: float
+    peak_bytes: int
+    allocated_bytes: int
+
+
+class StageStats(NamedTuple):
+    """
+    The runs of a stage added up. peak_bytes is the largest peak of a single
+    run.
+    """
+
+    calls: int
+    seconds: float
+    peak_bytes: int
+    allocated_bytes: int
+
+
+class _Frame(object):
+    __slots__ = ("stage", "started", "nested", "memory_start", "memory_peak")
+
+    def __init__(self, stage: str, memory_start: int):
+        self.stage: str = stage
+        self.started: float = perf_counter()
+        self.nested: float = 0.0  # time spent in nested stages
+        self.memory_start: int = memory_start
+        self.memory_peak: int = memory_start
+
+
+class Profiler(object):
+    """
+    Collects the time, the memory and counters of the stages of the pipeline.
+
+    Parser, BlockParser and the renderer report their stages to a profiler
+    that is passed to them. Stages can be nested, for example tokenizing
+    happens while blocks are parsed, and only count their own time.
+
+    Each finished run of a stage is passed to the callbacks as a StageEvent.
+    With memory set, memory is traced with tracemalloc while a stage runs,
+    which makes everything noticeably slower.
+    """
+
+    def __init__(
+        self,
+        *,
+        memory: bool = False,
+        callbacks: Iterable[Callable[[StageEvent], Any]] = (),
+    ):
+        self.memory: bool = memory
+        self.callbacks: list[Callable[[StageEvent], Any]] = list(callbacks)
+        self.counts: dict[str, int] = {}
+
+        # calls, seconds, peak and allocated bytes of every stage
+        self._stats: dict[str, list] = {}
+        self._stack: list[_Frame] = []
+        self._started_tracing: bool = False
+
+    def add_callback(self, callback: Callable[[StageEvent], Any]):
+        self.callbacks.append(callback)
+
+    def count(self, name: str, amount: int = 1):
+        """
+        Adds amount to the counter called name
+        """
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Measures the code run inside of the with block as the stage name
+        """
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def iter_stage(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Yields the items of iterable, measuring the production of every item
+        as a run of the stage name.
+
+        This is used for lazy stages, which are interleaved with the stages
+        consuming their items.
+        """
+        iterator: Iterator[T] = iter(iterable)
+        while True:
+            self._enter(name)
+            try:
+                item: T = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def stats(self) -> dict[str, StageStats]:
+        """
+        Returns the stats of every stage in the order they first finished
+        """
+        return {name: StageStats(*stats) for name, stats in self._stats.items()}
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns the stats and the counters as plain values that can be
+        serialized to JSON
+        """
+        return {
+            "stages": {name: stats._asdict() for name, stats in self.stats().items()},
+            "counts": dict(self.counts),
+            "seconds": sum(stats[1] for stats in self._stats.values()),
+            "memory": self.memory,
+        }
+
+    def format(self) -> str:
+        """
+        Formats the stats and the counters as a plain text table
+        """
+        lines: list[str] = [f"{'stage':<10}{'calls':>8}{'seconds':>10}{'peak KB':>10}"]
+        for name, stats in self.stats().items():
+            lines.append(
+                f"{name:<10}{stats.calls:>8}{stats.seconds:>10.4f}"
+                f"{stats.peak_bytes / 1024:>10.0f}"
+            )
+        lines.extend(f"{name}: {count}" for name, count in self.counts.items())
+        return "\n".join(lines)
+
+    def _enter(self, name: str):
+        memory_start: int = 0
+        if self.memory:
+            if not self._stack and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # the peak is reset for the nested stage, so the outer stage
+                # has to remember its own peak so far
+                outer: _Frame = self._stack[-1]
+                outer.memory_peak = max(outer.memory_peak, peak)
+            tracemalloc.reset_peak()
+            memory_start = current
+
+        self._stack.append(_Frame(name, memory_start))
+
+    def _exit(self):
+        frame: _Frame = self._stack.pop()
+        elapsed: float = perf_counter() - frame.started
+
+        peak_bytes: int = 0
+        allocated_bytes: int = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            frame.memory_peak = max(frame.memory_peak, peak)
+            peak_bytes = frame.memory_peak - frame.memory_start
+            allocated_bytes = max(0, current - frame.memory_start)
+
+            if self._stack:
+                outer: _Frame = self._stack[-1]
+                outer.memory_peak = max(outer.memory_peak, frame.memory_peak)
+            elif self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+        if self._stack:
+            self._stack[-1].nested += elapsed
+
+        seconds: float = elapsed - frame.nested
+        stats: list | None = self._stats.get(frame.stage)
+        if stats is None:
+            stats = self._stats[frame.stage] = [0, 0.0, 0, 0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], peak_bytes)
+        stats[3] += allocated_bytes
+
+        if self.callbacks:
+            event: StageEvent = StageEvent(
+                frame.stage, seconds, peak_bytes, allocated_bytes
+            )
+            for callback in self.callbacks:
+                callback(event)
+
+
+def count_nodes(tree: DOM) -> tuple[int, int]:
+    """
+    Returns the number of elements and of text nodes in tree
+    """
+    elements: int = 0
+    texts: int = 0
+    stack: list[DOM] = [tree]
+    while stack:
+        node: DOM = stack.pop()
+        elements += 1
+        for child in node.children:
+            if isinstance(child, DOM):
+                stack.append(child)
+            else:
+                texts += 1
+    return elements, texts
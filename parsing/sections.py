@@ -0,0 +1,209 @@
+"""
+Indexes of the headers and top level blocks of documents, so single sections
+of large files can be parsed without tokenizing the rest
+"""
+
+import json
+from os import replace, stat
+from typing import Any, NamedTuple
+
+from dom.renderer import DOM
+from parsing import __version__
+from parsing.parser import BlockParser, InlineParser, open_source
+from parsing.tokenizer import ascii_compatible
+
+# appended to the path of a document for the path of its index
+INDEX_SUFFIX: str = ".sections.json"
+INDEX_FORMAT: int = 1
+
+_HEADERS: dict[str, int] = {f"h{level}": level for level in range(1, 7)}
+
+
+class Header(NamedTuple):
+    """
+    A header of a document, block is the index of the header among the top
+    level blocks
+    """
+
+    block: int
+    level: int
+    title: str
+
+
+class SectionIndex(object):
+    """
+    The byte offsets of the lines every top level block of a document was
+    parsed from and its headers, together with the size and modification
+    time of the file they were read from.
+
+    The offsets are kept as plain lists of ints rather than a record per
+    block, which makes saved indexes of large documents quick to load.
+    """
+
+    def __init__(
+        self,
+        starts: list[int],
+        ends: list[int],
+        headers: list[Header],
+        size: int,
+        mtime_ns: int,
+    ):
+        self.starts: list[int] = starts
+        self.ends: list[int] = ends
+        self.headers: list[Header] = headers
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+
+    def section(self, title: str, *, level: int | None = None) -> tuple[int, int]:
+        """
+        Returns the byte offsets of the first section with the header title,
+        from the header up to the next header of the same or a higher level,
+        or to the end of the document. level restricts the headers searched.
+
+        Raises KeyError if there is no such header.
+        """
+        for index, header in enumerate(self.headers):
+            if header.title == title and level in (None, header.level):
+                break
+        else:
+            raise KeyError(title)
+
+        for following in self.headers[index + 1 :]:
+            if following.level <= header.level:
+                return self.starts[header.block], self.starts[following.block]
+        return self.starts[header.block], self.size
+
+    def is_current(self, path: str) -> bool:
+        """
+        Whether the file at path is still the one the index was built from
+        """
+        stats = stat(path)
+        return stats.st_size == self.size and stats.st_mtime_ns == self.mtime_ns
+
+    def save(self, path: str):
+        """
+        Writes the index to path, replacing any index that was there in one
+        step
+        """
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "format": INDEX_FORMAT,
+                    "parser": __version__,
+                    "size": self.size,
+                    "mtime_ns": self.mtime_ns,
+                    "starts": self.starts,
+                    "ends": self.ends,
+                    "headers": self.headers,
+                },
+                file,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "SectionIndex | None":
+        """
+        Reads the index at path, or returns None if it is missing,
+        unreadable or was written by another parser version
+        """
+        try:
+            with open(path, encoding="utf-8") as file:
+                data: dict[str, Any] = json.load(file)
+            if data.get("format") != INDEX_FORMAT or data.get("parser") != __version__:
+                return None
+            return cls(
+                data["starts"],
+                data["ends"],
+                [Header(*header) for header in data["headers"]],
+                data["size"],
+                data["mtime_ns"],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+def index_path(path: str) -> str:
+    """
+    Returns the path of the index saved next to the document at path
+    """
+    return path + INDEX_SUFFIX
+
+
+def build_index(path: str, *, encoding: str = "utf-8") -> SectionIndex:
+    """
+    Indexes the document at path.
+
+    The blocks are parsed to find where they start and end but their inline
+    structure is neither parsed nor rendered. The offsets are in bytes so
+    encoding has to be ASCII compatible.
+    """
+    _check_encoding(encoding)
+    stats = stat(path)
+    starts: list[int] = []
+    ends: list[int] = []
+    headers: list[Header] = []
+    block_parser: BlockParser = BlockParser(encoding=encoding)
+    with open_source(path, encoding) as buffer:
+        for start, end, block in block_parser.iter_spans(buffer):
+            level: int | None = _HEADERS.get(block.element)
+            if level is not None:
+                headers.append(Header(len(starts), level, "".join(block.children)))
+            starts.append(start)
+            ends.append(end)
+    return SectionIndex(starts, ends, headers, stats.st_size, stats.st_mtime_ns)
+
+
+def load_index(
+    path: str, *, encoding: str = "utf-8", save: bool = True
+) -> SectionIndex:
+    """
+    Returns the saved index of the document at path if it is current, or
+    builds a new one and, with save, writes it next to the document.
+    Documents in read only directories are indexed every time.
+    """
+    index: SectionIndex | None = SectionIndex.load(index_path(path))
+    if index is not None and index.is_current(path):
+        return index
+
+    index = build_index(path, encoding=encoding)
+    if save:
+        try:
+            index.save(index_path(path))
+        except OSError:
+            pass
+    return index
+
+
+def parse_section(
+    path: str,
+    title: str,
+    *,
+    level: int | None = None,
+    encoding: str = "utf-8",
+    index: SectionIndex | None = None,
+) -> DOM:
+    """
+    Parses the section of the document at path under the header title, see
+    SectionIndex.section, into a document of its own. Only the bytes of the
+    section are read and parsed.
+
+    The saved index is used, or built and saved, unless one is given.
+    """
+    _check_encoding(encoding)
+    if index is None:
+        index = load_index(path, encoding=encoding)
+    start, end = index.section(title, level=level)
+
+    block_parser: BlockParser = BlockParser(encoding=encoding)
+    with open_source(path, encoding) as buffer:
+        # a header ends the block before it, so the section parses to the
+        # same blocks as in the whole document
+        body: DOM = block_parser.parse(buffer[start:end])
+    return InlineParser().parse(body)
+
+
+def _check_encoding(encoding: str):
+    if not ascii_compatible(encoding):
+        raise ValueError(f"sections can not be indexed in {encoding}")
@@ -0,0 +1,149 @@
+"""
+Tests for the asyncio parser and renderer
+"""
+
+import asyncio
+import unittest
+from io import StringIO
+from typing import AsyncIterator
+from dom.renderer import DOM, render, render_async, render_blocks_async
+from parsing.aio import AsyncParser, aiter_pieces
+from parsing.limits import LimitExceeded, Limits
+from parsing.parser import BlockParser, InlineParser
+
+MARKDOWN: str = (
+    "# header\n\n*some* text\nmore `code`\n  \n    code\n    block\n\n"
+    "para\n\t\n## é [link](url)\n\n\nlast line"
+)
+
+
+async def _chunks(text: str | bytes, size: int) -> AsyncIterator[str | bytes]:
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
+
+
+def _expected(markdown: str) -> str:
+    return render(InlineParser().parse(BlockParser().parse(StringIO(markdown))))
+
+
+class _Writer(object):
+    def __init__(self):
+        self.written: list[str] = []
+
+    async def write(self, text: str):
+        self.written.append(text)
+
+
+class _StreamWriter(object):
+    def __init__(self):
+        self.written: list[bytes] = []
+        self.drained: int = 0
+
+    def write(self, data: bytes):
+        self.written.append(data)
+
+    async def drain(self):
+        self.drained += 1
+
+
+class AsyncParserTests(unittest.IsolatedAsyncioTestCase):
+    async def test_same_as_parser(self):
+        expected: str = _expected(MARKDOWN)
+        for size in (1, 2, 3, 7, 1000):
+            for piece_size in (1, 10, 1000):
+                parser: AsyncParser = AsyncParser(piece_size=piece_size)
+                with self.subTest(size=size, piece_size=piece_size):
+                    tree: DOM = await parser.parse(_chunks(MARKDOWN, size))
+                    self.assertEqual(render(tree), expected)
+
+    async def test_encoded_chunks(self):
+        # splits the two bytes of é between chunks
+        tree: DOM = await AsyncParser().parse(_chunks(MARKDOWN.encode(), 1))
+        self.assertEqual(render(tree), _expected(MARKDOWN))
+
+    async def test_stream_reader(self):
+        reader: asyncio.StreamReader = asyncio.StreamReader()
+        reader.feed_data(MARKDOWN.encode())
+        reader.feed_eof()
+
+        tree: DOM = await AsyncParser().parse(reader)
+        self.assertEqual(render(tree), _expected(MARKDOWN))
+
+    async def test_pieces_end_after_blank_lines(self):
+        markdown: str = "a\nb\n\nc\n \nd\n"
+        pieces: list[str] = [
+            piece async for piece in aiter_pieces(_chunks(markdown, 1), piece_size=1)
+        ]
+        self.assertEqual(pieces, ["a\nb\n\n", "c\n \n", "d\n"])
+
+    async def test_yields_to_the_loop(self):
+        ticks: int = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker: asyncio.Task = asyncio.create_task(tick())
+        markdown: str = "some text\n\n" * 100
+        parser: AsyncParser = AsyncParser(piece_size=100)
+        # the chunks are all available at once, so the parser is the one that
+        # has to give the loop a turn
+        chunks: AsyncIterator[str] = _chunks(markdown, len(markdown))
+        blocks: list[DOM] = [block async for block in parser.iter_blocks(chunks)]
+        ticker.cancel()
+
+        self.assertEqual(len(blocks), 100)
+        self.assertGreater(ticks, 5)
+
+    async def test_line_length_limit(self):
+        read: int = 0
+
+        async def endless_line() -> AsyncIterator[str]:
+            nonlocal read
+            while True:
+                read += 1
+                yield "a" * 100
+
+        parser: AsyncParser = AsyncParser(limits=Limits(max_line_length=1000))
+        with self.assertRaises(LimitExceeded):
+            await parser.parse(endless_line())
+        self.assertLessEqual(read, 11)
+
+    async def test_limits_span_pieces(self):
+        parser: AsyncParser = AsyncParser(limits=Limits(max_nodes=10), piece_size=1)
+        with self.assertRaises(LimitExceeded):
+            await parser.parse(_chunks("text\n\n" * 10, 6))
+
+
+class AsyncRenderTests(unittest.IsolatedAsyncioTestCase):
+    async def test_render_async(self):
+        tree: DOM = await AsyncParser().parse(_chunks(MARKDOWN, 10))
+        writer: _Writer = _Writer()
+        await render_async(tree, writer, buffer_size=8)
+
+        self.assertEqual("".join(writer.written), render(tree))
+        self.assertGreater(len(writer.written), 1)
+
+    async def test_render_to_stream_writer(self):
+        tree: DOM = await AsyncParser().parse(_chunks(MARKDOWN, 10))
+        writer: _StreamWriter = _StreamWriter()
+        await render_async(tree, writer, buffer_size=8)
+
+        self.assertEqual(b"".join(writer.written).decode(), render(tree))
+        self.assertEqual(writer.drained, len(writer.written))
+
+    async def test_render_blocks_async(self):
+        parser: AsyncParser = AsyncParser(piece_size=1)
+        writer: _Writer = _Writer()
+        await render_blocks_async(parser.iter_blocks(_chunks(MARKDOWN, 3)), writer)
+        self.assertEqual("".join(writer.written), _expected(MARKDOWN))
+
+        writer = _Writer()
+        await render_blocks_async([DOM("p", children=["text"])], writer)
+        self.assertEqual(writer.written, ["<html><body><p>text</p></body></html>"])
+
+
+if __name__ == "__main__":
+    unittest.main()
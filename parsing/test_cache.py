@@ -0,0 +1,76 @@
+"""
+Tests for the rendered block cache
+"""
+
+import unittest
+from io import StringIO
+from dom.renderer import render, render_blocks_to
+from parsing.cache import BlockCache
+from parsing.parser import BlockParser
+from parsing.tokenizer import iter_chunks
+
+
+class BlockCacheTests(unittest.TestCase):
+    def render_cached(self, markdown: str, cache: BlockCache) -> str:
+        sink: StringIO = StringIO()
+        render_blocks_to(cache.iter_blocks(StringIO(markdown)), sink)
+        return sink.getvalue()
+
+    def test_iter_chunks(self):
+        markdown: str = "\n# header\nparagraph\n  \t\n\n    code\n    more\n\nend"
+        self.assertEqual(
+            list(iter_chunks(StringIO(markdown))),
+            [(1, "# header\nparagraph\n"), (25, "    code\n    more\n"), (44, "end")],
+        )
+
+    def test_same_output_as_parser(self):
+        markdown: str = """
+# header
+paragraph
+    continued
+
+    code block
+    more code
+
+## another header
+
+last paragraph"""
+        expected: str = render(BlockParser().parse(StringIO(markdown)))
+        self.assertEqual(self.render_cached(markdown, BlockCache()), expected)
+
+    def test_hits_across_documents(self):
+        cache: BlockCache = BlockCache()
+        license: str = "Copyright (c) markdownp\nAll rights reserved.\n\n"
+
+        self.render_cached(license + "first document\n", cache)
+        self.render_cached(license + "second document\n", cache)
+
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 3, 3))
+
+    def test_lru_eviction(self):
+        cache: BlockCache = BlockCache(maxsize=2)
+
+        cache.render_chunk("a\n")
+        cache.render_chunk("b\n")
+        cache.render_chunk("a\n")  # a is now the most recently used
+        cache.render_chunk("c\n")  # evicts b
+        cache.render_chunk("a\n")
+        cache.render_chunk("b\n")
+
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.evictions), (2, 4, 2))
+
+    def test_max_chars(self):
+        cache: BlockCache = BlockCache(max_chars=20)
+
+        cache.render_chunk("abcd\n")  # <p>abcd</p> is 11 characters
+        cache.render_chunk("efgh\n")  # evicts the first entry
+
+        self.assertEqual(cache.info().currsize, 1)
+        self.assertEqual(cache.info().chars, 11)
+        self.assertEqual(cache.evictions, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests for compiling markdown straight to html
+"""
+
+import unittest
+from io import StringIO
+from bench.corpus import generate
+from dom.renderer import render, render_blocks_to
+from parsing.compiler import HtmlCompiler
+from parsing.parser import BlockParser, InlineParser
+
+_EDGE_CASES: tuple[str, ...] = (
+    "",
+    "\n\n   \n",
+    "# *header* #\n###### deep\n####### not a header\n#\n",
+    "##  spaced  ##  \ntext\n",
+    "text *em*\n  more\n    indented `code`\nlast",
+    "    code *not em*\n\tafter a tab\n\n    \n    more code\ntext\n",
+    "[link](url \"title\") **strong** \\*escaped\n",
+    "no new line at the end",
+)
+
+
+class HtmlCompilerTests(unittest.TestCase):
+    def assert_same(self, markdown: str):
+        for source in (StringIO, str.encode):
+            tree = BlockParser().parse(source(markdown))
+            self.assertEqual(
+                HtmlCompiler(inline=False).compile(source(markdown)), render(tree)
+            )
+            self.assertEqual(
+                HtmlCompiler().compile(source(markdown)),
+                render(InlineParser().parse(tree)),
+            )
+
+    def test_edge_cases(self):
+        for markdown in _EDGE_CASES:
+            with self.subTest(markdown=markdown):
+                self.assert_same(markdown)
+
+    def test_generated_documents(self):
+        for profile in ("paragraphs", "headers", "code", "mixed"):
+            with self.subTest(profile=profile):
+                self.assert_same(generate(64 * 1024, profile, seed=7))
+
+    def test_output(self):
+        markdown: str = "# a\n\n*b*\n"
+        html: str = "<html><body><h1>a</h1><p><em>b</em></p></body></html>"
+
+        output: StringIO = StringIO()
+        HtmlCompiler().compile_to(StringIO(markdown), output, buffer_size=1)
+        self.assertEqual(output.getvalue(), html)
+
+        output = StringIO()
+        render_blocks_to(HtmlCompiler().iter_blocks_html(StringIO(markdown)), output)
+        self.assertEqual(output.getvalue(), html)
+
+    def test_errors(self):
+        with self.assertRaises(SyntaxError):
+            HtmlCompiler().compile(StringIO("text\n\n1. list\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Tests for the grammar tables the block parser is driven by
+"""
+
+import unittest
+from io import StringIO
+from dom.renderer import DOM, render
+from parsing.compiler import HtmlCompiler
+from parsing.grammar import REST, RULES, STRIPPED, Grammar, Rule, default_grammar
+from parsing.parser import BlockParser
+from parsing.tokenizer import BlockScanner, token_code
+
+
+def _quote_grammar() -> Grammar:
+    scanner: BlockScanner = BlockScanner()
+    scanner.register("> ?", "BLOCK_QUOTE", first_chars=">")
+    grammar: Grammar = Grammar(scanner=scanner)
+    grammar.add(
+        Rule(
+            "BlockQuote",
+            "BLOCK_QUOTE",
+            ("blockquote",),
+            REST | STRIPPED,
+            (("BLOCK_QUOTE", REST | STRIPPED),),
+        )
+    )
+    return grammar
+
+
+class GrammarTests(unittest.TestCase):
+    def test_tables(self):
+        self.assertEqual(len(default_grammar.starts), len(RULES))
+        self.assertEqual(
+            default_grammar.starts[token_code("INDENT")].tags, ("pre", "code")
+        )
+        self.assertIs(
+            default_grammar.default, default_grammar.starts[token_code("TEXT_LINE")]
+        )
+
+    def test_new_block_type(self):
+        markdown: str = "> a *b*\n>  c\ntext\n\n    code\n"
+        expected: str = (
+            "<html><body><blockquote>a *b*\nc</blockquote><p>text</p>"
+            "<pre><code>code</code></pre></body></html>"
+        )
+        parser: BlockParser = BlockParser(grammar=_quote_grammar())
+        self.assertEqual(render(parser.parse(StringIO(markdown))), expected)
+        self.assertEqual(render(parser.parse(markdown.encode())), expected)
+        self.assertEqual(
+            HtmlCompiler(grammar=_quote_grammar()).compile(StringIO(markdown)),
+            expected,
+        )
+
+        # the default grammar is left as it was
+        self.assertEqual(
+            render(BlockParser().parse(StringIO("> a\n"))),
+            "<html><body><p>> a</p></body></html>",
+        )
+
+    def test_replaced_rule(self):
+        grammar: Grammar = Grammar()
+        grammar.add(Rule("Listing", "INDENT", ("div", "pre"), REST))
+
+        tree: DOM = BlockParser(grammar=grammar).parse(StringIO("    a\n    b\n"))
+        self.assertEqual(
+            render(tree),
+            "<html><body><div><pre>a</pre></div><div><pre>b</pre></div>"
+            "</body></html>",
+        )
+        self.assertEqual(
+            HtmlCompiler(grammar=grammar, inline=False).compile(b"    a\n    b\n"),
+            render(tree),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
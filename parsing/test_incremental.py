@@ -0,0 +1,96 @@
+"""
+Tests for incremental re-parsing
+"""
+
+import random
+import unittest
+from io import StringIO
+from dom.renderer import render
+from parsing.incremental import IncrementalDocument, Splice
+from parsing.parser import BlockParser
+
+
+class IncrementalTests(unittest.TestCase):
+    def assert_matches_full_parse(self, document: IncrementalDocument):
+        expected: str = render(BlockParser().parse(StringIO(document.text)))
+        self.assertEqual(render(document.tree), expected)
+
+        expected_spans = [
+            (start, end)
+            for start, end, _ in BlockParser().iter_spans(StringIO(document.text))
+        ]
+        self.assertEqual(document.spans(), expected_spans)
+
+    def test_spans(self):
+        document = IncrementalDocument("# header\n\nparagraph\nmore\n\n    code\n")
+        self.assertEqual(document.spans(), [(0, 9), (10, 25), (26, 35)])
+
+    def test_edit_only_reparses_nearby_blocks(self):
+        text: str = "".join(f"paragraph {i}\n\n" for i in range(1000))
+        document = IncrementalDocument(text)
+        last = document.tree.children[0].children[-1]
+
+        # turn paragraph 500 into a header
+        splice: Splice = document.edit(text.index("paragraph 500"), 0, "# ")
+
+        self.assertEqual(splice, Splice(499, 2, 2))
+        self.assertEqual(
+            render(document.tree.children[0].children[500]), "<h1>paragraph 500</h1>"
+        )
+        self.assertIs(document.tree.children[0].children[-1], last)
+        self.assert_matches_full_parse(document)
+
+    def test_joining_paragraphs(self):
+        document = IncrementalDocument("first\n\nsecond\n\nthird\n")
+
+        # deleting the blank line merges the first two paragraphs
+        document.edit(5, 1, "")
+
+        self.assertEqual(
+            render(document.tree),
+            "<html><body><p>first\nsecond</p><p>third</p></body></html>",
+        )
+        self.assert_matches_full_parse(document)
+
+    def test_invalid_edit(self):
+        document = IncrementalDocument("text\n")
+        with self.assertRaises(ValueError):
+            document.edit(3, 5, "")
+
+    def test_failed_edit(self):
+        text: str = "first\n\nsecond\n\nthird\n"
+        document = IncrementalDocument(text)
+        with self.assertRaises(SyntaxError):
+            document.edit(text.index("second"), 0, "1. ")
+
+        # the document is left as it was, so later edits still line up
+        self.assertEqual(document.text, text)
+        document.edit(text.index("third"), 0, "# ")
+        self.assertEqual(
+            render(document.tree),
+            "<html><body><p>first</p><p>second</p><h1>third</h1></body></html>",
+        )
+        self.assert_matches_full_parse(document)
+
+    def test_random_edits(self):
+        pieces: tuple[str, ...] = ("\n", "\n\n", "# ", "    ", "\t", "text", " ", "##")
+        generator = random.Random(6)
+
+        for _ in range(50):
+            text: str = "".join(generator.choice(pieces) for _ in range(30))
+            document = IncrementalDocument(text)
+
+            for _ in range(20):
+                offset: int = generator.randint(0, len(document.text))
+                deleted: int = generator.randint(
+                    0, min(5, len(document.text) - offset)
+                )
+                inserted: str = "".join(
+                    generator.choice(pieces) for _ in range(generator.randint(0, 3))
+                )
+                document.edit(offset, deleted, inserted)
+                self.assert_matches_full_parse(document)
+
+
+if __name__ == "__main__":
+    unittest.main()
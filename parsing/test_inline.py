@@ -0,0 +1,121 @@
+"""
+Tests for the inline parser
+"""
+
+import time
+import unittest
+from io import StringIO
+from dom.arena import Arena
+from dom.renderer import DOM, render
+from parsing.inline import parse_inline
+from parsing.parser import BlockParser, InlineParser
+
+
+def inline_html(text: str) -> str:
+    return "".join(
+        child if isinstance(child, str) else render(child)
+        for child in parse_inline(text)
+    )
+
+
+class InlineTests(unittest.TestCase):
+    def run_test(self, cases: dict[str, str]):
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(inline_html(text), expected)
+
+    def test_plain_text(self):
+        self.assertEqual(parse_inline("no markup here"), ["no markup here"])
+
+    def test_emphasis(self):
+        self.run_test(
+            {
+                "*a*": "<em>a</em>",
+                "_a_": "<em>a</em>",
+                "**a**": "<strong>a</strong>",
+                "***a***": "<em><strong>a</strong></em>",
+                "*a **b** c*": "<em>a <strong>b</strong> c</em>",
+                "foo*bar*": "foo<em>bar</em>",
+                "foo_bar_": "foo_bar_",
+                "**a*": "*<em>a</em>",
+                "*a**": "<em>a</em>*",
+                "* a *": "* a *",
+                "*a _b* c_": "<em>a _b</em> c_",
+                "*a\nb*": "<em>a\nb</em>",
+            }
+        )
+
+    def test_code_spans(self):
+        self.run_test(
+            {
+                "`code`": "<code>code</code>",
+                "`` a `b` ``": "<code>a `b`</code>",
+                "`*not emphasis*`": "<code>*not emphasis*</code>",
+                "`a\nb`": "<code>a b</code>",
+                "`unclosed": "`unclosed",
+                "```a``": "```a``",
+            }
+        )
+
+    def test_links(self):
+        self.run_test(
+            {
+                "[x](http://e.com)": '<a href="http://e.com">x</a>',
+                '[x](<a b> "t")': '<a href="a b" title="t">x</a>',
+                "[*a*](u)": '<a href="u"><em>a</em></a>',
+                "*[a*](b)": '*<a href="b">a*</a>',
+                "[a [b](c)](d)": '[a <a href="c">b</a>](d)',
+                '[a]("q)': '<a href="&quot;q">a</a>',
+                "[a](b\\(c\\))": '<a href="b(c)">a</a>',
+                "[a](b(c))": "[a](b(c))",
+                "[a] (b)": "[a] (b)",
+                "[a": "[a",
+            }
+        )
+
+    def test_escapes(self):
+        self.run_test({"\\*a*": "*a*", "\\[a](b)": "[a](b)", "a\\b": "a\\b"})
+
+    def test_pathological_inputs(self):
+        size: int = 20000
+        for text in (
+            "*" * size,
+            "[" * size,
+            "]" * size,
+            "*a " * size,
+            "_a _" * size,
+            "[](" * size,
+            '[](x "' * size,
+            "*_[*_]" * size,
+            "[" * size + "a" + "](b)" * size,
+            "`a``" * size,
+        ):
+            with self.subTest(text=text[:12]):
+                started: float = time.perf_counter()
+                parse_inline(text)
+                self.assertLess(time.perf_counter() - started, 2.0)
+
+    def test_paragraphs_and_headers(self):
+        markdown: str = "# a *b*\n\nsome *text\nover* lines\n\n    *code*\n"
+        tree: DOM = InlineParser().parse(BlockParser().parse(StringIO(markdown)))
+
+        self.assertEqual(
+            render(tree),
+            "<html><body><h1>a <em>b</em></h1>"
+            "<p>some <em>text\nover</em> lines</p>"
+            "<pre><code>*code*</code></pre></body></html>",
+        )
+
+    def test_attributes_in_arena(self):
+        tree: DOM = DOM("p", children=parse_inline('[a](b "c")'))
+        arena: Arena = Arena()
+        handle: int = arena.add(tree)
+
+        self.assertEqual(arena.render(handle), render(tree))
+        self.assertEqual(render(arena.to_dom(handle)), render(tree))
+        (link,) = arena.children(handle)
+        self.assertEqual(arena.attributes(link), {"href": "b", "title": "c"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests for deferring inline parsing until nodes are read
+"""
+
+import pickle
+import unittest
+from io import StringIO
+from os import remove
+from tempfile import NamedTemporaryFile
+from threading import Thread
+from bench.corpus import generate
+from dom.binary import encode, render_encoded
+from dom.renderer import DOM, render
+from parsing.limits import Limits
+from parsing.parser import BlockParser, Parser, _LazyInline, defer_inline
+from parsing.passes import HeadingIds
+
+
+def _lazy_nodes(tree: DOM) -> int:
+    count: int = 0
+    stack: list[DOM] = [tree]
+    while stack:
+        node: DOM = stack.pop()
+        if type(node) is _LazyInline:
+            count += 1
+            continue
+        stack.extend(child for child in node.children if isinstance(child, DOM))
+    return count
+
+
+class LazyInlineTests(unittest.TestCase):
+    def test_same_as_eager(self):
+        markdown: str = generate(64 * 1024, "mixed", seed=4)
+        parser: Parser = Parser(lazy_inline=True)
+        expected: str = render(Parser().parse_markdown(markdown))
+
+        self.assertEqual(render(parser.parse_markdown(markdown)), expected)
+        self.assertEqual(
+            render_encoded(encode(parser.parse_markdown(markdown))), expected
+        )
+
+    def test_only_read_nodes_are_parsed(self):
+        tree: DOM = Parser(lazy_inline=True).parse_markdown(
+            "# *a*\n\n*b*\n\n    *code*\n\n*c*\n"
+        )
+        body: DOM = tree.children[0]
+        header, paragraph, code, last = body.children
+        self.assertEqual(_lazy_nodes(tree), 3)
+        self.assertEqual(code.children[0].children, ["*code*"])
+
+        self.assertEqual(render(header), "<h1><em>a</em></h1>")
+        self.assertIs(type(header), DOM)
+        self.assertEqual(_lazy_nodes(tree), 2)
+
+        # the children can be replaced before they are parsed
+        last.children = ["*d*"]
+        self.assertEqual(render(last), "<p>*d*</p>")
+        self.assertEqual(_lazy_nodes(tree), 1)
+
+        self.assertEqual(paragraph.children[0].element, "em")
+        self.assertEqual(_lazy_nodes(tree), 0)
+
+    def test_iter_blocks(self):
+        with NamedTemporaryFile("w", suffix=".md", delete=False) as file:
+            file.write("# *a*\n\n    *b*\n\n*c*\n")
+        try:
+            blocks: list[DOM] = list(Parser(lazy_inline=True).iter_blocks(file.name))
+        finally:
+            remove(file.name)
+
+        self.assertEqual(
+            [type(block) for block in blocks], [_LazyInline, DOM, _LazyInline]
+        )
+        self.assertEqual(
+            "".join(map(render, blocks)),
+            "<h1><em>a</em></h1><pre><code>*b*</code></pre><p><em>c</em></p>",
+        )
+
+    def test_defer_inline(self):
+        tree: DOM = defer_inline(BlockParser().parse(StringIO("a `b`\n")))
+        self.assertEqual(_lazy_nodes(tree), 1)
+        self.assertEqual(
+            render(tree), "<html><body><p>a <code>b</code></p></body></html>"
+        )
+
+    def test_read_by_threads(self):
+        markdown: str = generate(16 * 1024, "mixed", seed=6)
+        tree: DOM = Parser(lazy_inline=True).parse_markdown(markdown)
+        results: list[str] = []
+        threads: list[Thread] = [
+            Thread(target=lambda: results.append(render(tree))) for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [render(Parser().parse_markdown(markdown))] * 4)
+
+    def test_pickle(self):
+        markdown: str = "# *a*\n\n*b* `c`\n\n    code\n"
+        tree: DOM = Parser(lazy_inline=True).parse_markdown(markdown)
+        copy: DOM = pickle.loads(pickle.dumps(tree))
+
+        self.assertEqual(_lazy_nodes(copy), 0)
+        self.assertEqual(render(copy), render(Parser().parse_markdown(markdown)))
+
+    def test_options(self):
+        with self.assertRaises(ValueError):
+            Parser(lazy_inline=True, limits=Limits())
+        with self.assertRaises(ValueError):
+            Parser(lazy_inline=True, passes=[HeadingIds()])
+
+
+if __name__ == "__main__":
+    unittest.main()
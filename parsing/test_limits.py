@@ -0,0 +1,121 @@
+"""
+Tests for the resource limits of the parser
+"""
+
+import unittest
+from io import StringIO
+from dom.renderer import DOM, render
+from parsing.limits import LimitExceeded, Limits
+from parsing.parser import BlockParser, InlineParser
+
+
+class _CountingStream(StringIO):
+    """
+    Remembers how many characters were read
+    """
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.characters_read: int = 0
+
+    def readline(self, size: int = -1) -> str:
+        line: str = super().readline(size)
+        self.characters_read += len(line)
+        return line
+
+
+def _parse(markdown: str, limits: Limits) -> DOM:
+    block_parser: BlockParser = BlockParser(limits=limits)
+    tree: DOM = block_parser.parse(StringIO(markdown))
+    return InlineParser(limits=limits).parse(tree, block_parser.budget)
+
+
+class LimitsTests(unittest.TestCase):
+    def test_unlimited(self):
+        markdown: str = "# header\n\n*some* text\n"
+        self.assertEqual(
+            render(_parse(markdown, Limits())),
+            render(InlineParser().parse(BlockParser().parse(StringIO(markdown)))),
+        )
+
+    def test_max_bytes(self):
+        markdown: str = "some text\n" * 10
+        limits: Limits = Limits(max_bytes=50)
+        _parse(markdown[:50], limits)
+
+        with self.assertRaises(LimitExceeded) as context:
+            _parse(markdown, limits)
+        self.assertEqual(context.exception.limit, "input size")
+
+        with self.assertRaises(LimitExceeded):
+            BlockParser(limits=limits).parse(markdown.encode())
+
+    def test_max_line_length(self):
+        limits: Limits = Limits(max_line_length=20)
+        BlockParser(limits=limits).parse(StringIO("a" * 20 + "\n"))
+
+        stream: _CountingStream = _CountingStream("a" * 10000 + "\n")
+        with self.assertRaises(LimitExceeded) as context:
+            BlockParser(limits=limits).parse(stream)
+        self.assertEqual(context.exception.limit, "line length")
+        # the long line is not read past the limit
+        self.assertLessEqual(stream.characters_read, 21)
+
+        with self.assertRaises(LimitExceeded):
+            BlockParser(limits=limits).parse(b"short\n" + b"a" * 10000)
+
+    def test_max_nodes(self):
+        markdown: str = "text\n\n" * 10
+        # html, body and a p with its text for every paragraph
+        _parse(markdown, Limits(max_nodes=22))
+
+        with self.assertRaises(LimitExceeded) as context:
+            _parse(markdown, Limits(max_nodes=21))
+        self.assertEqual(context.exception.limit, "number of nodes")
+
+    def test_max_depth(self):
+        markdown: str = "*a **b [c](d)** e*\n"
+        # html, body, p, em, strong, a and the text of the link
+        _parse(markdown, Limits(max_depth=7))
+
+        with self.assertRaises(LimitExceeded) as context:
+            _parse(markdown, Limits(max_depth=6))
+        self.assertEqual(context.exception.limit, "nesting depth")
+
+    def test_fallback(self):
+        markdown: str = "# title\n\n*a **b <c>** d*\n\n*e*\n"
+        tree: DOM = _parse(markdown, Limits(max_depth=5, fallback=True))
+
+        self.assertEqual(
+            render(tree),
+            "<html><body><h1>title</h1><p>*a **b &lt;c&gt;** d*</p>"
+            "<p><em>e</em></p></body></html>",
+        )
+
+    def test_block_limits_ignore_fallback(self):
+        with self.assertRaises(LimitExceeded):
+            _parse("text\n", Limits(max_depth=2, fallback=True))
+
+    def test_max_steps(self):
+        markdown: str = "some text\n" * 100
+        _parse(markdown, Limits(max_steps=10000))
+
+        with self.assertRaises(LimitExceeded) as context:
+            _parse(markdown, Limits(max_steps=50))
+        self.assertEqual(context.exception.limit, "number of steps")
+
+    def test_max_seconds(self):
+        with self.assertRaises(LimitExceeded) as context:
+            _parse("some text\n" * 10, Limits(max_seconds=-1))
+        self.assertEqual(context.exception.limit, "parse time")
+
+    def test_iter_blocks(self):
+        markdown: str = "*a*\n\n*b*\n"
+        parser: BlockParser = BlockParser(limits=Limits(max_depth=2))
+        # blocks are counted as if they were inside of html and body
+        with self.assertRaises(LimitExceeded):
+            list(parser.iter_blocks(StringIO(markdown)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Tests for parsing large documents with a pool of processes
+"""
+
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join
+from tempfile import TemporaryDirectory
+from bench.corpus import generate
+from dom.renderer import render
+from parsing.parallel import ParallelParser, split_offsets
+from parsing.parser import Parser
+
+
+class ParallelParserTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessPoolExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.root: str = self._directory.name
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def write(self, text: str) -> str:
+        path: str = join(self.root, "document.md")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return path
+
+    def parser(self, **options) -> ParallelParser:
+        return ParallelParser(2, min_size=0, executor=self.executor, **options)
+
+    def test_split_offsets(self):
+        buffer: bytes = b"a\nb\n\nc\n    \n\td\n \ne"
+        offsets: list[int] = split_offsets(buffer, 8)
+
+        self.assertEqual(offsets, [0, 5, 12, 17, len(buffer)])
+        self.assertEqual(split_offsets(b"no blank lines\nat all", 4), [0, 21])
+        self.assertEqual(split_offsets(b"", 4), [0, 0])
+        self.assertEqual(split_offsets(b"a\r\nb\r\n \r\nc\r\n", 2), [0, 9, 12])
+        self.assertEqual(split_offsets(b"para one\r\nline two\r\n" * 2, 4), [0, 40])
+
+    def test_same_as_parser(self):
+        for profile in ("paragraphs", "headers", "code", "mixed"):
+            path: str = self.write(generate(64 * 1024, profile, seed=1))
+            with self.subTest(profile=profile):
+                self.assertEqual(
+                    render(self.parser().parse(path)), render(Parser().parse(path))
+                )
+
+        # multi-line paragraphs with CRLF line ends are never split
+        markdown: str = "para one\nline two\n\npara three\nline four\n" * 200
+        for line_end in ("\r\n", "\r"):
+            path = self.write(markdown.replace("\n", line_end))
+            with self.subTest(line_end=line_end):
+                self.assertEqual(
+                    render(self.parser().parse(path)), render(Parser().parse(path))
+                )
+
+    def test_code_block_with_blank_lines(self):
+        markdown: str = "    code\n\n    more code\n    \n# header\n\ntext\n" * 50
+        path: str = self.write(markdown)
+        self.assertEqual(
+            render(self.parser().parse(path)), render(Parser().parse(path))
+        )
+
+    def test_errors_are_raised(self):
+        path: str = self.write("text\n\n" * 1000 + "1. list\n")
+        with self.assertRaises(SyntaxError):
+            self.parser().parse(path)
+
+    def test_small_documents_are_parsed_in_process(self):
+        path: str = self.write("# header\n\ntext\n")
+        parser: ParallelParser = ParallelParser(2)
+        self.assertFalse(parser._parallel(path))
+        self.assertEqual(
+            render(parser.parse(path)),
+            "<html><body><h1>header</h1><p>text</p></body></html>",
+        )
+
+    def test_own_pool(self):
+        path: str = self.write("*text*\n\n" * 100)
+        blocks = list(ParallelParser(2, min_size=0).iter_blocks(path))
+        self.assertEqual(len(blocks), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
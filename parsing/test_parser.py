@@ -3,8 +3,10 @@ Tests for the markdownp parser module
 """
 
 import unittest
+from os import remove
+from tempfile import NamedTemporaryFile
 from dom.renderer import render, DOM
-from parsing.parser import BlockParser
+from parsing.parser import BlockParser, Parser
 from io import StringIO
 
 
@@ -18,6 +20,10 @@ class ParserTests(unittest.TestCase):
 
         self.assertEqual(html, expected_dom)
 
+        # parsing the encoded bytes in place gives the same document
+        html = render(parser.parse(markdown.encode()))
+        self.assertEqual(html, expected_dom)
+
     def test_paragraph(self):
         markdown: str = """
 This is a paragraph.
@@ -87,6 +93,79 @@ This is a paragraph
         expected: str = "<html><body><pre><code>this is a code block\nthis is another part of code\n\tx = a + b</code></pre><p>This is a paragraph</p></body></html>"
         self.run_test(markdown, expected)
 
+    def test_iter_blocks(self):
+        markdown: str = """
+# header
+
+first paragraph
+    with a continuation
+
+    some code
+second paragraph
+"""
+        blocks: list[str] = [
+            render(block) for block in BlockParser().iter_blocks(StringIO(markdown))
+        ]
+        expected: list[str] = [
+            "<h1>header</h1>",
+            "<p>first paragraph\nwith a continuation</p>",
+            "<pre><code>some code</code></pre>",
+            "<p>second paragraph</p>",
+        ]
+        self.assertEqual(blocks, expected)
+
+    def test_iter_blocks_is_lazy(self):
+        markdown: str = "# header\n\n" + "paragraph\n\n" * 10000
+        stream: StringIO = StringIO(markdown)
+
+        blocks = BlockParser().iter_blocks(stream)
+        self.assertEqual(render(next(blocks)), "<h1>header</h1>")
+
+        # only the lines needed for the first block have been read
+        self.assertLess(stream.tell(), 100)
+
+    def test_parse_file_encodings(self):
+        markdown: str = "# caf\u00e9\n\n\tna\u00efve\n"
+        expected: str = "<html><body><h1>caf\u00e9</h1><pre><code>na\u00efve</code></pre></body></html>"
+
+        for encoding in ("utf-8", "latin-1", "utf-16"):
+            with NamedTemporaryFile("w", encoding=encoding, delete=False) as file:
+                file.write(markdown)
+            try:
+                html = render(Parser(encoding=encoding).parse(file.name))
+            finally:
+                remove(file.name)
+
+            self.assertEqual(html, expected)
+
+    def test_crlf_line_ends(self):
+        expected: str = "<html><body><p>a</p><p>b\ncode</p></body></html>"
+        self.run_test("a\r\n   \r\nb\r\n    code\r\n", expected)
+        # lone \r are line ends too, text streams leave them to newline
+        # translation
+        self.assertEqual(
+            render(BlockParser().parse(b"a\r   \rb\r    code\r")), expected
+        )
+
+        with NamedTemporaryFile("wb", delete=False) as file:
+            file.write(b"a\r\n   \r\nb\r\n\tcode\r\n")
+        try:
+            html = render(Parser().parse(file.name))
+        finally:
+            remove(file.name)
+
+        self.assertEqual(html, expected)
+
+    def test_parse_empty_file(self):
+        with NamedTemporaryFile(delete=False) as file:
+            pass
+        try:
+            html = render(Parser().parse(file.name))
+        finally:
+            remove(file.name)
+
+        self.assertEqual(html, "<html><body></body></html>")
+
 
 if __name__ == "__main__":
     unittest.main()
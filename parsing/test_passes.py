@@ -0,0 +1,120 @@
+"""
+Tests for the passes that run in the traversal of the inline parser
+"""
+
+import asyncio
+import unittest
+from io import StringIO
+from os import remove
+from tempfile import NamedTemporaryFile
+from dom.renderer import DOM, render
+from parsing.aio import AsyncParser
+from parsing.parser import BlockParser, InlineParser, Parser
+from parsing.passes import HeadingIds, Pass, Pipeline, RewriteLinks
+
+
+class _Recorder(Pass):
+    """
+    Remembers the elements it visited in order
+    """
+
+    def __init__(self, elements: frozenset[str] | None = None):
+        self.elements = elements
+        self.visited: list[tuple[str, int]] = []
+        self.starts: int = 0
+
+    def start(self):
+        self.starts += 1
+
+    def visit(self, node: DOM, depth: int):
+        self.visited.append((node.element, depth))
+
+
+class PassesTests(unittest.TestCase):
+    def setUp(self):
+        with NamedTemporaryFile("w", suffix=".md", delete=False) as file:
+            file.write("# Title\n\nsee [the docs](docs.md)\n\n## Title\n")
+            self.path: str = file.name
+
+    def tearDown(self):
+        remove(self.path)
+
+    def test_single_traversal(self):
+        every: _Recorder = _Recorder()
+        headers: _Recorder = _Recorder(frozenset(("h1", "h2")))
+        tree: DOM = BlockParser().parse(StringIO("# a\n\n*b* [c](d)\n"))
+        Pipeline([InlineParser(), every, headers]).run(tree)
+
+        # every element is visited once in document order, including the
+        # ones made by the inline parser before the passes after it
+        self.assertEqual(
+            every.visited,
+            [("html", 1), ("body", 2), ("h1", 3), ("p", 3), ("em", 4), ("a", 4)],
+        )
+        self.assertEqual(headers.visited, [("h1", 3)])
+        self.assertEqual((every.starts, headers.starts), (1, 1))
+
+    def test_visit_is_required(self):
+        class Incomplete(Pass):
+            elements = frozenset({"p"})
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_inline_elements_are_walked_when_visited(self):
+        links: _Recorder = _Recorder(frozenset(("a",)))
+        tree: DOM = BlockParser().parse(StringIO("# [a](b)\n\n*[c](d)*\n"))
+        Pipeline([InlineParser(), links]).run(tree)
+        self.assertEqual(links.visited, [("a", 4), ("a", 5)])
+
+    def test_heading_ids(self):
+        tree: DOM = BlockParser().parse(
+            StringIO(
+                "# Getting *started*!\n\n# Getting started\n\n## ?!\n\n# section\n"
+            )
+        )
+        Pipeline([InlineParser(), HeadingIds()]).run(tree)
+        self.assertEqual(
+            render(tree),
+            '<html><body><h1 id="getting-started">Getting <em>started</em>!</h1>'
+            '<h1 id="getting-started-1">Getting started</h1>'
+            '<h2 id="section">?!</h2><h1 id="section-1">section</h1></body></html>',
+        )
+
+    def test_parser(self):
+        rewrite: RewriteLinks = RewriteLinks(lambda href: href[:-3] + ".html")
+        parser: Parser = Parser(passes=[HeadingIds(), rewrite])
+        expected: str = (
+            '<html><body><h1 id="title">Title</h1>'
+            '<p>see <a href="docs.html">the docs</a></p>'
+            '<h2 id="title-1">Title</h2></body></html>'
+        )
+
+        self.assertEqual(render(parser.parse(self.path)), expected)
+        # the ids start over for every document
+        self.assertEqual(render(parser.parse(self.path)), expected)
+        self.assertEqual(
+            "<html><body>" + "".join(map(render, parser.iter_blocks(self.path))),
+            expected[: -len("</body></html>")],
+        )
+
+    def test_async_parser(self):
+        async def chunks():
+            yield "# a\n\n# a\n"
+
+        tree: DOM = asyncio.run(AsyncParser(passes=[HeadingIds()]).parse(chunks()))
+        self.assertEqual(
+            render(tree),
+            '<html><body><h1 id="a">a</h1><h1 id="a-1">a</h1></body></html>',
+        )
+
+    def test_no_passes(self):
+        self.assertEqual(
+            render(Parser().parse(self.path)),
+            "<html><body><h1>Title</h1><p>see <a href=\"docs.md\">the docs</a></p>"
+            "<h2>Title</h2></body></html>",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Tests for the profiling hooks of the pipeline
+"""
+
+import unittest
+from io import StringIO
+from dom.renderer import DOM, render
+from parsing.parser import BlockParser
+from parsing.profiling import Profiler, StageEvent, count_nodes
+
+MARKDOWN: str = "# header\n\nsome text\n    more\n\n    code\n    block\n"
+
+
+class ProfilerTests(unittest.TestCase):
+    def test_nested_stages(self):
+        events: list[StageEvent] = []
+        profiler: Profiler = Profiler(callbacks=[events.append])
+
+        with profiler.stage("outer"):
+            with profiler.stage("inner"):
+                pass
+            with profiler.stage("inner"):
+                pass
+
+        self.assertEqual([event.stage for event in events], ["inner", "inner", "outer"])
+        stats = profiler.stats()
+        self.assertEqual(list(stats), ["inner", "outer"])
+        self.assertEqual(stats["inner"].calls, 2)
+        # the outer stage does not count the time of the nested ones
+        self.assertEqual(events[-1].seconds, stats["outer"].seconds)
+
+    def test_iter_stage(self):
+        profiler: Profiler = Profiler()
+        items = list(profiler.iter_stage("numbers", iter(range(3))))
+
+        self.assertEqual(items, [0, 1, 2])
+        # the last run finds the iterator exhausted
+        self.assertEqual(profiler.stats()["numbers"].calls, 4)
+
+    def test_memory(self):
+        profiler: Profiler = Profiler(memory=True)
+        with profiler.stage("outer"):
+            with profiler.stage("allocate"):
+                kept = [0] * 100000
+            del kept
+
+        stats = profiler.stats()
+        self.assertGreaterEqual(stats["allocate"].peak_bytes, 800000)
+        self.assertGreaterEqual(stats["allocate"].allocated_bytes, 800000)
+        self.assertGreaterEqual(stats["outer"].peak_bytes, 800000)
+        self.assertLess(stats["outer"].allocated_bytes, 800000)
+
+    def test_block_parser(self):
+        profiler: Profiler = Profiler()
+        tree: DOM = BlockParser(profiler=profiler).parse(StringIO(MARKDOWN))
+
+        self.assertEqual(list(profiler.stats()), ["tokenize", "block"])
+        self.assertEqual(profiler.counts["tokens"], 11)
+        self.assertEqual(
+            (profiler.counts["elements"], profiler.counts["text nodes"]),
+            count_nodes(tree),
+        )
+        self.assertEqual(count_nodes(tree), (6, 5))
+
+    def test_iter_blocks_output_unchanged(self):
+        profiler: Profiler = Profiler(memory=True)
+        blocks = BlockParser(profiler=profiler).iter_blocks(StringIO(MARKDOWN))
+
+        expected: str = render(BlockParser().parse(StringIO(MARKDOWN)))
+        body: DOM = DOM("body", children=list(blocks))
+        self.assertEqual(render(DOM("html", children=[body])), expected)
+        self.assertEqual(profiler.stats()["block"].calls, 4)
+        self.assertEqual(profiler.to_dict()["counts"]["elements"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Tests for sharing a parser between threads
+"""
+
+import unittest
+from io import BytesIO, StringIO
+from threading import Barrier, Thread
+from bench.corpus import generate
+from dom.renderer import render
+from parsing.parser import Parser
+from parsing.passes import HeadingIds
+
+
+class ReentrantParserTests(unittest.TestCase):
+    def test_markdown_sources(self):
+        markdown: str = "# café\n\n*text*\n\n    code\n"
+        expected: str = render(Parser().parse_markdown(markdown))
+        self.assertEqual(
+            expected,
+            "<html><body><h1>café</h1><p><em>text</em></p>"
+            "<pre><code>code</code></pre></body></html>",
+        )
+
+        encoded: bytes = markdown.encode()
+        for source in (
+            encoded,
+            bytearray(encoded),
+            memoryview(encoded),
+            StringIO(markdown),
+            BytesIO(encoded),
+        ):
+            with self.subTest(source=type(source).__name__):
+                self.assertEqual(render(Parser().parse_markdown(source)), expected)
+
+        parser: Parser = Parser(encoding="utf-16")
+        self.assertEqual(
+            render(parser.parse_markdown(markdown.encode("utf-16"))), expected
+        )
+
+    def test_line_ends(self):
+        # str and bytes sources split lines at the same line ends
+        for markdown in ("a\r# h\r", "a\r\n# h\r\n", "a\n# h\n"):
+            with self.subTest(markdown=markdown):
+                expected: str = render(Parser().parse_markdown(markdown.encode()))
+                self.assertEqual(
+                    expected, "<html><body><p>a</p><h1>h</h1></body></html>"
+                )
+                self.assertEqual(render(Parser().parse_markdown(markdown)), expected)
+                encoded: bytes = markdown.encode("utf-16")
+                self.assertEqual(
+                    render(Parser(encoding="utf-16").parse_markdown(encoded)),
+                    expected,
+                )
+
+    def test_parse_many(self):
+        documents: list[str] = [
+            generate(2048, "mixed", seed=seed) + "\n# Title\n\n# Title\n"
+            for seed in range(40)
+        ]
+        parser: Parser = Parser(passes=[HeadingIds()])
+        expected: list[str] = [
+            render(parser.parse_markdown(document)) for document in documents
+        ]
+
+        trees = parser.parse_many(documents, workers=8)
+        self.assertEqual(list(map(render, trees)), expected)
+        self.assertEqual(parser.parse_many([]), [])
+
+        with self.assertRaises(SyntaxError):
+            parser.parse_many(["text\n", "1. list\n"], workers=2)
+
+    def test_shared_between_threads(self):
+        parser: Parser = Parser(passes=[HeadingIds()])
+        documents: list[str] = [f"# {index}\n\n# {index}\n" * 200 for index in range(8)]
+        barrier: Barrier = Barrier(len(documents))
+        results: dict[int, str] = {}
+
+        def parse(index: int):
+            barrier.wait()
+            for _ in range(5):
+                results[index] = render(parser.parse_markdown(documents[index]))
+
+        threads: list[Thread] = [
+            Thread(target=parse, args=(index,)) for index in range(len(documents))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for index, document in enumerate(documents):
+            self.assertEqual(results[index], render(parser.parse_markdown(document)))
+            self.assertIn(f'<h1 id="{index}-399">', results[index])
+
+
+if __name__ == "__main__":
+    unittest.main()
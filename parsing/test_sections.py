@@ -0,0 +1,146 @@
+"""
+Tests for the section index of large documents
+"""
+
+import unittest
+from os import utime
+from os.path import exists, join
+from tempfile import TemporaryDirectory
+from bench.corpus import generate
+from dom.renderer import DOM, render
+from parsing.parser import Parser
+from parsing.sections import (
+    Header,
+    SectionIndex,
+    build_index,
+    index_path,
+    load_index,
+    parse_section,
+)
+
+_DOCUMENT: str = """# Guide
+
+intro
+    more intro
+
+## Installation
+
+    pip install markdownp
+# not a paragraph
+### Details
+
+*fine* print
+
+## Usage
+
+run it
+"""
+
+
+class SectionsTests(unittest.TestCase):
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.path: str = join(self._directory.name, "guide.md")
+        self.write(_DOCUMENT)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def write(self, text: str):
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def test_build_index(self):
+        index: SectionIndex = build_index(self.path)
+        source: bytes = _DOCUMENT.encode()
+
+        self.assertEqual(
+            index.headers,
+            [
+                Header(0, 1, "Guide"),
+                Header(2, 2, "Installation"),
+                Header(4, 1, "not a paragraph"),
+                Header(5, 3, "Details"),
+                Header(7, 2, "Usage"),
+            ],
+        )
+        self.assertEqual(len(index.starts), 9)
+        self.assertEqual(
+            source[index.starts[3] : index.ends[3]], b"    pip install markdownp\n"
+        )
+        self.assertEqual(
+            source[index.starts[1] : index.ends[1]], b"intro\n    more intro\n"
+        )
+
+    def test_section(self):
+        index: SectionIndex = build_index(self.path)
+        source: bytes = _DOCUMENT.encode()
+
+        start, end = index.section("Installation")
+        self.assertTrue(source[start:end].startswith(b"## Installation\n"))
+        self.assertTrue(source[start:end].endswith(b"markdownp\n"))
+        self.assertEqual(index.section("Details")[1], source.index(b"## Usage"))
+        self.assertEqual(index.section("Guide")[1], source.index(b"# not"))
+        self.assertEqual(index.section("Usage")[1], len(source))
+
+        with self.assertRaises(KeyError):
+            index.section("Usage", level=3)
+
+    def test_parse_section(self):
+        self.assertEqual(
+            render(parse_section(self.path, "Details")),
+            "<html><body><h3>Details</h3><p><em>fine</em> print</p></body></html>",
+        )
+
+    def test_sections_of_generated_documents(self):
+        self.write(generate(64 * 1024, "mixed", seed=3))
+        full: DOM = Parser().parse(self.path)
+        blocks: list[str] = list(map(render, full.children[0].children))
+        index: SectionIndex = load_index(self.path)
+
+        # every section renders to the blocks it covers in the whole document,
+        # titles that repeat find their first section
+        titles: set[str] = set()
+        for header in index.headers:
+            if header.title in titles:
+                continue
+            titles.add(header.title)
+            with self.subTest(title=header.title):
+                start, end = index.section(header.title)
+                count: int = sum(start <= offset < end for offset in index.starts)
+                self.assertEqual(
+                    render(parse_section(self.path, header.title, index=index)),
+                    "<html><body>"
+                    + "".join(blocks[header.block : header.block + count])
+                    + "</body></html>",
+                )
+
+    def test_saved_index(self):
+        index: SectionIndex = load_index(self.path)
+        self.assertTrue(exists(index_path(self.path)))
+        saved: SectionIndex | None = SectionIndex.load(index_path(self.path))
+        self.assertEqual(
+            (saved.starts, saved.ends, saved.headers),
+            (index.starts, index.ends, index.headers),
+        )
+
+        # a changed document is indexed again
+        self.write(_DOCUMENT + "\n## More\n")
+        utime(self.path, ns=(0, index.mtime_ns + 1))
+        self.assertFalse(index.is_current(self.path))
+        index = load_index(self.path)
+        self.assertEqual(index.headers[-1], Header(9, 2, "More"))
+        self.assertEqual(index.starts[-1], len(_DOCUMENT) + 1)
+
+        with open(index_path(self.path), "w") as file:
+            file.write("{broken")
+        self.assertIsNone(SectionIndex.load(index_path(self.path)))
+        self.assertEqual(len(load_index(self.path, save=False).headers), 6)
+
+    def test_encoding(self):
+        with self.assertRaises(ValueError):
+            build_index(self.path, encoding="utf-16")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,44 +1,338 @@
 """
 Tokenizers for markdownp
 """
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
 from io import TextIOBase
+from mmap import mmap
 import re
+from typing import TYPE_CHECKING, Iterator, Union
 
-block_spec: tuple[tuple[str, str], ...] = (
-    # indent (four spaces)
-    ("( {4})", "INDENT"),
-    # whitespace (any amount of spaces less than four (INDENT))
-    ("( *)", "WHITESPACE"),
+if TYPE_CHECKING:
+    # only annotations use it, so the module keeps working when it is
+    # imported from inside the package directory like the legacy tests do
+    from parsing.limits import Budget
+
+# encoded buffers that can be tokenized in place
+Buffer = Union[bytes, bytearray, mmap]
+
+# token type codes, tokens are stored as these small ints instead of names
+EOF: int = 0
+BLANK_LINE: int = 1
+INDENT: int = 2
+TEXT_LINE: int = 3
+OL_LINE: int = 4
+ATX_HEADER: int = 5
+
+# names of the token types, indexed by their codes
+token_names: list[str] = [
+    "EOF",
+    "BLANK_LINE",
+    "INDENT",
+    "TEXT_LINE",
+    "OL_LINE",
+    "ATX_HEADER",
+]
+_token_codes: dict[str, int] = {name: code for code, name in enumerate(token_names)}
+
+
+def token_code(name: str) -> int:
+    """
+    Returns the code of the token type called name, assigning a new code to
+    types that have not been seen before
+    """
+    code: int | None = _token_codes.get(name)
+    if code is None:
+        code = _token_codes[name] = len(token_names)
+        token_names.append(name)
+    return code
+
+
+# (pattern, token type, characters the pattern can start with)
+#
+# Patterns are matched after the indentation of a line has been consumed, so
+# they never need to account for leading spaces. A first_chars value of None
+# means the pattern can start with any character and will be tried on every
+# line.
+block_spec: tuple[tuple[str, str, str | None], ...] = (
     # ordered
-    (" *\\d+\\. .*", "OL_LINE"),
+    ("\\d+\\. .*", "OL_LINE", "0123456789"),
     # headers
-    ("#{1,6} .+", "ATX_HEADER"),
+    ("#{1,6} .+", "ATX_HEADER", "#"),
 )
 
+# number of lines tokenized at a time when reading ahead
+BATCH_LINES: int = 1024
+
 
-class BlockTokenizer(object):
+class BlockScanner(object):
     """
-    Lazily returns token based on the block structures of a markdown
-    document.
+    Classifies the content of a line with a single regex match.
+
+    Patterns are indexed by the characters they can start with and every
+    index entry is compiled into one alternation, so classifying a line costs
+    one dict lookup and one match regardless of how many block types have
+    been registered.
     """
 
-    def __init__(self, stream: TextIOBase):
-        self._stream: TextIOBase = stream
-        self._current_line: str = ""
-        self._cursor: int = 0
+    def __init__(
+        self, spec: tuple[tuple[str, str, str | None], ...] = block_spec
+    ) -> None:
+        self._spec: list[tuple[str, str, str | None]] = list(spec)
+        self._codes: dict[str, int] = {}
+        self._dispatch: dict[str, re.Pattern[str]] = {}
+        self._fallback: re.Pattern[str] | None = None
+
+        # byte level indexes are only built for the encodings that are used
+        self._bytes_indexes: dict[
+            str, tuple[dict[int, re.Pattern[bytes]], re.Pattern[bytes] | None]
+        ] = {}
+        self._compile()
+
+    def register(
+        self, pattern: str, token_type: str, *, first_chars: str | None = None
+    ) -> int:
+        """
+        Adds a new block type to the scanner and returns its token code.
+
+        Patterns registered earlier take priority over later ones. Patterns
+        must not use numbered backreferences since they are combined into a
+        single expression.
+        """
+        self._spec.append((pattern, token_type, first_chars))
+        self._compile()
+        return token_code(token_type)
+
+    def _compile(self) -> None:
+        """
+        Rebuilds the first character dispatch index from the spec
+        """
+        self._codes = {}
+        by_char: dict[str, list[int]] = {}
+        fallback: list[int] = []
+
+        for index, (_, token_type, first_chars) in enumerate(self._spec):
+            self._codes[f"t{index}"] = token_code(token_type)
+            if first_chars is None:
+                fallback.append(index)
+                continue
+            for char in first_chars:
+                by_char.setdefault(char, []).append(index)
+
+        # patterns without a known first character can match anywhere so
+        # they are part of every alternation
+        self._dispatch = {
+            char: self._alternation(sorted(indices + fallback))
+            for char, indices in by_char.items()
+        }
+        self._fallback = self._alternation(fallback) if fallback else None
+        self._bytes_indexes = {}
+
+    def _alternation(self, indices: list[int]) -> re.Pattern[str]:
+        return re.compile(
+            "|".join(f"(?P<t{index}>{self._spec[index][0]})" for index in indices)
+        )
+
+    def _bytes_index(
+        self, encoding: str
+    ) -> tuple[dict[int, re.Pattern[bytes]], re.Pattern[bytes] | None]:
+        """
+        Returns the dispatch index for lines encoded with encoding, keyed by
+        the first byte of each pattern's first characters
+        """
+        index = self._bytes_indexes.get(encoding)
+        if index is not None:
+            return index
 
-    def _match_line(self, regexp: str, string: str):
-        matched: re.Match[str] | None = re.compile(regexp).match(
-            string, pos=self._cursor
+        by_byte: dict[int, list[int]] = {}
+        fallback: list[int] = []
+        for position, (_, _, first_chars) in enumerate(self._spec):
+            if first_chars is None:
+                fallback.append(position)
+                continue
+            for char in first_chars:
+                indices = by_byte.setdefault(char.encode(encoding)[0], [])
+                if position not in indices:
+                    indices.append(position)
+
+        def alternation(indices: list[int]) -> re.Pattern[bytes]:
+            return re.compile(
+                b"|".join(
+                    b"(?P<t%d>%s)" % (i, self._spec[i][0].encode(encoding))
+                    for i in indices
+                )
+            )
+
+        index = (
+            {
+                first: alternation(sorted(indices + fallback))
+                for first, indices in by_byte.items()
+            },
+            alternation(fallback) if fallback else None,
+        )
+        self._bytes_indexes[encoding] = index
+        return index
+
+    def match(self, line: str, pos: int) -> tuple[int, int] | None:
+        """
+        Returns the token code and the end of the block structure at pos or
+        None if nothing matches
+        """
+        pattern: re.Pattern[str] | None = self._dispatch.get(
+            line[pos : pos + 1], self._fallback
         )
+        if pattern is None:
+            return None
 
-        if matched == None:
+        # empty matches are ignored so the tokenizer always makes progress
+        matched: re.Match[str] | None = pattern.match(line, pos)
+        if matched is None or matched.end() == pos:
             return None
 
-        # if there was a match then advance the cursor
-        self._cursor += len(matched.group())
+        return self._codes[matched.lastgroup], matched.end()
 
-        return matched.group()
+    def match_bytes(
+        self, line: Buffer, pos: int, endpos: int, encoding: str
+    ) -> tuple[int, int] | None:
+        """
+        Same as match for a line encoded with an ASCII compatible encoding
+        """
+        dispatch, fallback = self._bytes_index(encoding)
+        pattern: re.Pattern[bytes] | None = (
+            dispatch.get(line[pos], fallback) if pos < endpos else fallback
+        )
+        if pattern is None:
+            return None
+
+        matched: re.Match[bytes] | None = pattern.match(line, pos, endpos)
+        if matched is None or matched.end() == pos:
+            return None
+
+        return self._codes[matched.lastgroup], matched.end()
+
+
+default_scanner: BlockScanner = BlockScanner()
+
+
+class TokenBatch(object):
+    """
+    The tokens of a run of whole lines, stored in parallel arrays.
+
+    Token i has the type code types[i] and the value values[i], which is None
+    for EOF and BLANK_LINE tokens. It was read from line lines[i] of the batch
+    between the positions starts[i] and ends[i] of the text that line was
+    matched in.
+
+    line_starts holds the offset of every line in the source and line_tokens
+    the index of the first token of every line, followed by the number of
+    tokens in the batch.
+    """
+
+    __slots__ = (
+        "types",
+        "values",
+        "starts",
+        "ends",
+        "lines",
+        "line_starts",
+        "line_tokens",
+        "_buffer",
+        "_texts",
+        "_encoding",
+        "_tabs",
+    )
+
+    def __init__(self, buffer: Buffer | None = None, encoding: str | None = None):
+        # filled as lists by the tokenizers and packed once the batch is done
+        self.types: array[int] | list[int] = []
+        self.values: list[str | None] = []
+        self.starts: array[int] | list[int] = []
+        self.ends: array[int] | list[int] = []
+        self.lines: array[int] | list[int] = []
+        self.line_starts: array[int] | list[int] = []
+        self.line_tokens: array[int] | list[int] = []
+
+        # lines are matched in _buffer unless they have an entry in _texts,
+        # they are decoded with _encoding unless it is None
+        self._buffer: Buffer | None = buffer
+        self._texts: dict[int, str | bytes] = {}
+        self._encoding: str | None = encoding
+        # expanded positions of the tabs of lines that had to be expanded
+        self._tabs: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def rest(self, index: int) -> str:
+        """
+        Returns the text of the line after token index without analyzing it
+        """
+        line: int = self.lines[index]
+        # the last token of a line always reaches the end of the line
+        end: int = self.ends[self.line_tokens[line + 1] - 1]
+        text = self._texts.get(line, self._buffer)[self.ends[index] : end]
+        return text if self._encoding is None else str(text, self._encoding)
+
+    def _pack(self):
+        """
+        Converts the lists the batch was filled in to arrays
+        """
+        self.line_tokens.append(len(self.types))
+        self.types = array("B", self.types)
+        self.starts = array("q", self.starts)
+        self.ends = array("q", self.ends)
+        self.lines = array("I", self.lines)
+        self.line_starts = array("q", self.line_starts)
+        self.line_tokens = array("I", self.line_tokens)
+
+
+class _BatchTokenizer(ABC):
+    """
+    The token at a time interface shared by the tokenizers, implemented on
+    top of their tokenize_batch method.
+    """
+
+    def _init_batches(self):
+        self._batch: TokenBatch | None = None
+        self._index: int = 0  # index of the next token in _batch
+        self._batch_lines: int = 1
+
+    @abstractmethod
+    def tokenize_batch(self, max_lines: int | None = BATCH_LINES) -> TokenBatch:
+        """
+        Tokenizes up to max_lines lines, or everything that is left if it is
+        None, into a batch that ends with EOF once the input is exhausted
+        """
+
+    def tokenize_all(self) -> TokenBatch:
+        """
+        Tokenizes everything that is left in one batch ending with EOF
+        """
+        return self.tokenize_batch(None)
+
+    def read_batch(self) -> TokenBatch:
+        """
+        Tokenizes the next batch of lines.
+
+        Batches start with a single line and double in size up to
+        BATCH_LINES, so short documents and callers that stop early do not
+        pay for reading far ahead.
+        """
+        batch: TokenBatch = self.tokenize_batch(self._batch_lines)
+        self._batch_lines = min(self._batch_lines * 2, BATCH_LINES)
+        return batch
+
+    @property
+    def line_start(self) -> int:
+        """
+        The offset of the line the last token was read from.
+
+        At the end of the source this is the length of the source.
+        """
+        if self._batch is None:
+            return 0
+        return self._batch.line_starts[self._batch.lines[self._index - 1]]
 
     def get_rest_of_line(self) -> str:
         """
@@ -48,61 +342,416 @@ class BlockTokenizer(object):
         This is used when a specific structure ignores the token value of a line
         and just returns a string of plane text. (For example, in a code block)
         """
-        line: str = self._current_line[
-            self._cursor : -1
-        ]  # skip the new line at the end
-        self._cursor = len(self._current_line)
-        return line
+        batch: TokenBatch | None = self._batch
+        if batch is None:
+            return ""
+
+        current: int = self._index - 1
+        # the remaining tokens of the line are skipped
+        self._index = batch.line_tokens[batch.lines[current] + 1]
+        return batch.rest(current)
 
     def get_next_token(self) -> dict[str, str]:
         """
         Grab the next token off the stream
         """
-        # lazily load the next line
-        # if the entire current line has been tokenized
-        # subtract 1 from length 1 for the new line at the end
-        if self._cursor >= len(self._current_line) - 1:
-            # get the next line from the stream
-            self._current_line = self._stream.readline()
-            self._cursor = 0  # reset cursor
+        batch: TokenBatch | None = self._batch
+        index: int = self._index
+        if batch is None or index >= len(batch.types):
+            batch = self._batch = self.read_batch()
+            index = 0
+
+        self._index = index + 1
+        name: str = token_names[batch.types[index]]
+        value: str | None = batch.values[index]
+        if value is None:
+            return {"type": name}
+        return {"type": name, "value": value}
+
+
+_STR_SPACES: re.Pattern[str] = re.compile(" *")
+
+
+class BlockTokenizer(_BatchTokenizer):
+    """
+    Lazily returns token based on the block structures of a markdown
+    document.
+    """
+
+    def __init__(
+        self,
+        stream: TextIOBase,
+        scanner: BlockScanner = default_scanner,
+        *,
+        budget: "Budget | None" = None,
+    ):
+        self._stream: TextIOBase = stream
+        self._scanner: BlockScanner = scanner
+        self._offset: int = 0  # offset of the next line in the stream
+        # bounds the input read, no line is buffered further than its limits
+        self._budget: Budget | None = budget
+        self._init_batches()
+
+    def tokenize_batch(self, max_lines: int | None = BATCH_LINES) -> TokenBatch:
+        """
+        Tokenizes up to max_lines whole lines, or the rest of the stream if
+        max_lines is None. Once the stream is exhausted the batch ends with an
+        EOF token.
+        """
+        batch: TokenBatch = TokenBatch()
+        readline = self._stream.readline
+        match = self._scanner.match
+        texts: dict[int, str | bytes] = batch._texts
+        budget: Budget | None = self._budget
+
+        types_append = batch.types.append
+        values_append = batch.values.append
+        starts_append = batch.starts.append
+        ends_append = batch.ends.append
+        lines_append = batch.lines.append
+
+        line_index: int = 0
+        while max_lines is None or line_index < max_lines:
+            if budget is None:
+                line: str = readline()
+            else:
+                # reading one character past the limits is enough to tell
+                # that they are exceeded
+                line = readline(
+                    min(
+                        budget.max_line_length + 1,
+                        budget.max_bytes - self._offset + 1,
+                    )
+                )
+                budget.check_line(len(line) - line.endswith("\n"))
+                budget.check_bytes(self._offset + len(line))
+
+            batch.line_starts.append(self._offset)
+            batch.line_tokens.append(len(batch.types))
+            self._offset += len(line)
 
-            # if there are no more lines in the stream return EOF
-            if self._current_line == "":
-                return {"type": "EOF"}
+            if line == "":
+                # there are no more lines in the stream
+                types_append(EOF)
+                values_append(None)
+                starts_append(0)
+                ends_append(0)
+                lines_append(line_index)
+                break
 
-            # check if the line is blank
-            if re.match("^([ \\t]*)$", self._current_line):
-                self._cursor = len(self._current_line)
-                return {"type": "BLANK_LINE"}
+            if line[-1] == "\n":
+                line = line[:-1]
+            # streams without newline translation keep the \r of \r\n
+            if line.endswith("\r"):
+                line = line[:-1]
+
+            if line.strip(" \t") == "":
+                types_append(BLANK_LINE)
+                values_append(None)
+                starts_append(0)
+                ends_append(0)
+                lines_append(line_index)
+                line_index += 1
+                continue
 
             # replace all \t with four spaces
-            self._current_line = self._current_line.replace("\t", "    ")
-
-        # try to match with each pattern in block_spec
-        for pattern in block_spec:
-            token: str | None = self._match_line(pattern[0], self._current_line)
-
-            # if there is a match then return it
-            if token != None:
-                # special case tokens
-                if pattern[1] == "WHITESPACE":
-                    # skip whitespace
-                    continue
-                elif pattern[1] == "INDENT":
-                    return {"type": pattern[1], "value": "\t"}
-                elif pattern[1] == "BLOCK":
-                    return {"type": pattern[1], "value": ""}
-
-                # all other token types are returned here
-                return {"type": pattern[1], "value": token.strip()}
-
-        # if the line does not match any pattern then we just return a normal
-        # text line
-        text_line = {
-            "type": "TEXT_LINE",
-            "value": self._current_line[self._cursor :].strip(),
-        }
+            line = line.replace("\t", "    ")
+            texts[line_index] = line
+            end: int = len(line)
+
+            cursor: int = 0
+            spaces: int = _STR_SPACES.match(line).end()
+            while True:
+                # indent (four spaces)
+                while spaces - cursor >= 4:
+                    types_append(INDENT)
+                    values_append("\t")
+                    starts_append(cursor)
+                    ends_append(cursor + 4)
+                    lines_append(line_index)
+                    cursor += 4
+                if cursor >= end:
+                    break
+
+                # skip whitespace (any amount of spaces less than four)
+                cursor = spaces
+
+                matched: tuple[int, int] | None = match(line, cursor)
+                if matched is None:
+                    # if the line does not match any pattern then it is a
+                    # normal text line
+                    types_append(TEXT_LINE)
+                    values_append(line[cursor:].strip())
+                    starts_append(cursor)
+                    ends_append(end)
+                    lines_append(line_index)
+                    break
+
+                code, token_end = matched
+                types_append(code)
+                values_append(line[cursor:token_end].strip())
+                starts_append(cursor)
+                ends_append(token_end)
+                lines_append(line_index)
+                cursor = token_end
+                spaces = _STR_SPACES.match(line, cursor).end()
+
+            line_index += 1
+
+        batch._pack()
+        if budget is not None:
+            budget.step(len(batch.types))
+        return batch
+
+
+def iter_chunks(stream: TextIOBase) -> Iterator[tuple[int, str]]:
+    """
+    Splits a stream into runs of non blank lines and yields the offset and
+    text of each run.
+
+    A blank line ends every block structure, so each chunk can be tokenized
+    and parsed on its own with the same result as in the full document.
+    """
+    lines: list[str] = []
+    start: int = 0
+    offset: int = 0
+
+    while True:
+        line: str = stream.readline()
+        if line == "":
+            break
+
+        # same rule as the BLANK_LINE check in BlockTokenizer
+        if line.strip(" \t\r\n") == "":
+            if lines:
+                yield start, "".join(lines)
+                lines.clear()
+        else:
+            if not lines:
+                start = offset
+            lines.append(line)
+
+        offset += len(line)
+
+    if lines:
+        yield start, "".join(lines)
+
+
+def ascii_compatible(encoding: str) -> bool:
+    """
+    Returns whether the markup characters are encoded as single ASCII bytes
+    in encoding, which is required to tokenize encoded text in place
+    """
+    probe: str = "\t\n #.0123456789"
+    try:
+        return probe.encode(encoding) == probe.encode("ascii")
+    except (LookupError, UnicodeError):
+        return False
+
+
+_SPACES: re.Pattern[bytes] = re.compile(b" *")
+# the leading spaces of a line, the text up to the first tab and the rest,
+# lines end at \n, \r\n or a lone \r like in files read as text
+_LINE: re.Pattern[bytes] = re.compile(b"( *)([^\r\n\t]*)([^\r\n]*)")
+
+
+class SpanTokenizer(_BatchTokenizer):
+    """
+    Tokenizes an encoded buffer, such as bytes or an mmap, in place.
+
+    iter_spans yields every token as (type, start, end) byte offsets into the
+    buffer. Batches and the token at a time interface of BlockTokenizer only
+    decode the values of tokens, which end up in the document, and the rest
+    of a line when it is asked for.
+
+    Lines are matched directly in the buffer. Only lines containing a tab are
+    copied, since tabs have to be expanded to four spaces.
+    """
+
+    def __init__(
+        self,
+        buffer: Buffer,
+        *,
+        encoding: str = "utf-8",
+        scanner: BlockScanner = default_scanner,
+        budget: "Budget | None" = None,
+    ):
+        if not ascii_compatible(encoding):
+            raise ValueError(f"{encoding} can not be tokenized as bytes")
+
+        self._buffer: Buffer = buffer
+        self._size: int = len(buffer)
+        self._encoding: str = encoding
+        self._scanner: BlockScanner = scanner
+        self._offset: int = 0  # offset of the next line in the buffer
+        self._budget: Budget | None = budget
+        self._max_line: int = self._size
+        if budget is not None:
+            budget.check_bytes(self._size)
+            self._max_line = min(self._size, budget.max_line_length)
+        self._init_batches()
+
+    def iter_spans(self) -> Iterator[tuple[int, int, int]]:
+        """
+        Yields every remaining token as its type code and (start, end) byte
+        offsets.
+
+        The last token is EOF with an empty span at the end of the buffer.
+        """
+        while True:
+            batch: TokenBatch = self.read_batch()
+            for index in range(len(batch.types)):
+                line: int = batch.lines[index]
+                tabs: list[int] | None = batch._tabs.get(line)
+                start: int = batch.starts[index]
+                end: int = batch.ends[index]
+
+                if tabs is not None:
+                    line_start: int = batch.line_starts[line]
+                    start = _buffer_position(tabs, line_start, start)
+                    end = _buffer_position(tabs, line_start, end)
+
+                yield batch.types[index], start, end
+                if batch.types[index] == EOF:
+                    return
+
+    def tokenize_batch(self, max_lines: int | None = BATCH_LINES) -> TokenBatch:
+        """
+        See BlockTokenizer.tokenize_batch.
 
-        # and advance the cursor
-        self._cursor = len(self._current_line)
-        return text_line
+        Positions of lines without tabs are offsets in the buffer, lines with
+        tabs are expanded and their positions refer to the expanded copy.
+        """
+        encoding: str = self._encoding
+        buffer: Buffer = self._buffer
+        batch: TokenBatch = TokenBatch(buffer, encoding)
+        size: int = self._size
+        budget: Budget | None = self._budget
+        max_line: int = self._max_line
+        dispatch, fallback = self._scanner._bytes_index(encoding)
+        codes: dict[str, int] = self._scanner._codes
+
+        types_append = batch.types.append
+        values_append = batch.values.append
+        starts_append = batch.starts.append
+        ends_append = batch.ends.append
+        lines_append = batch.lines.append
+
+        line_index: int = 0
+        while max_lines is None or line_index < max_lines:
+            start: int = self._offset
+            batch.line_tokens.append(len(batch.types))
+
+            if start >= size:
+                # the last line may not have had a new line to skip
+                batch.line_starts.append(size)
+                types_append(EOF)
+                values_append(None)
+                starts_append(size)
+                ends_append(size)
+                lines_append(line_index)
+                break
+
+            batch.line_starts.append(start)
+            # lines are never matched further than the line length limit
+            line_match: re.Match[bytes] = _LINE.match(
+                buffer, start, start + max_line + 1
+            )
+            end: int = line_match.end()
+            if end - start > max_line:
+                budget.check_line(end - start)
+            self._offset = end + 1
+            if end + 1 < size and buffer[end] == 13 and buffer[end + 1] == 10:
+                # \r\n
+                self._offset += 1
+
+            line: Buffer = buffer
+            cursor: int = start
+            spaces: int = line_match.end(1)
+            if line_match.end(2) != end:
+                # replace all \t with four spaces
+                line = buffer[start:end].replace(b"\t", b"    ")
+                cursor = 0
+                spaces = _SPACES.match(line).end()
+                end = len(line)
+
+                if spaces != end:
+                    batch._texts[line_index] = line
+
+                    # positions of the expanded tabs, used to map spans back
+                    tabs: list[int] = []
+                    line_end: int = line_match.end()
+                    tab: int = buffer.find(b"\t", start, line_end)
+                    while tab != -1:
+                        tabs.append(tab - start + 3 * len(tabs))
+                        tab = buffer.find(b"\t", tab + 1, line_end)
+                    batch._tabs[line_index] = tabs
+
+            if spaces == end:
+                types_append(BLANK_LINE)
+                values_append(None)
+                starts_append(start)
+                ends_append(line_match.end())
+                lines_append(line_index)
+                line_index += 1
+                continue
+
+            while True:
+                # indent (four spaces)
+                while spaces - cursor >= 4:
+                    types_append(INDENT)
+                    values_append("\t")
+                    starts_append(cursor)
+                    ends_append(cursor + 4)
+                    lines_append(line_index)
+                    cursor += 4
+                if cursor >= end:
+                    break
+
+                # skip whitespace (any amount of spaces less than four)
+                cursor = spaces
+
+                # same as BlockScanner.match_bytes, inlined since it runs for
+                # every line
+                pattern: re.Pattern[bytes] | None = (
+                    dispatch.get(line[cursor], fallback) if cursor < end else fallback
+                )
+                matched: re.Match[bytes] | None = (
+                    None if pattern is None else pattern.match(line, cursor, end)
+                )
+                if matched is None or matched.end() == cursor:
+                    types_append(TEXT_LINE)
+                    values_append(str(line[cursor:end], encoding).strip())
+                    starts_append(cursor)
+                    ends_append(end)
+                    lines_append(line_index)
+                    break
+
+                token_end: int = matched.end()
+                types_append(codes[matched.lastgroup])
+                values_append(str(line[cursor:token_end], encoding).strip())
+                starts_append(cursor)
+                ends_append(token_end)
+                lines_append(line_index)
+                cursor = token_end
+                spaces = _SPACES.match(line, cursor, end).end()
+
+            line_index += 1
+
+        batch._pack()
+        if budget is not None:
+            budget.step(len(batch.types))
+        return batch
+
+
+def _buffer_position(tabs: list[int], line_start: int, pos: int) -> int:
+    """
+    Maps a position in an expanded line back to an offset in the buffer
+    """
+    # every tab before pos added three bytes, a position inside of an
+    # expanded tab is mapped to the end of the tab
+    count: int = bisect_right(tabs, pos - 4)
+    if count < len(tabs) and pos > tabs[count]:
+        pos = tabs[count] + 4
+        count += 1
+    return line_start + pos - 3 * count
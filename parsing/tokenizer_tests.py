@@ -2,7 +2,17 @@
 Unit test cases for markdownp tokenizer
 """
 from unittest import TestCase, main
-from tokenizer import BlockTokenizer
+from tokenizer import (
+    ATX_HEADER,
+    BLANK_LINE,
+    EOF,
+    INDENT,
+    TEXT_LINE,
+    BlockTokenizer,
+    BlockScanner,
+    SpanTokenizer,
+    token_names,
+)
 from io import StringIO
 
 
@@ -11,12 +21,19 @@ class BlockTokenizerTests(TestCase):
         pass
 
     def run_test(
-        self, text: str, expected: tuple[dict[str, str], ...], tokenizer_type: str = ...
+        self,
+        text: str,
+        expected: tuple[dict[str, str], ...],
+        tokenizer_type: str = ...,
+        scanner: BlockScanner | None = None,
     ):
         stream: StringIO = StringIO(text)
 
         if tokenizer_type == "block":
-            tokenizer = BlockTokenizer(stream)
+            if scanner is None:
+                tokenizer = BlockTokenizer(stream)
+            else:
+                tokenizer = BlockTokenizer(stream, scanner)
         # elif tokenizer_type == 'inline':
         # TODO put inline tokenizer here
         # pass
@@ -29,6 +46,16 @@ class BlockTokenizerTests(TestCase):
         # assert there are no more tokens left
         self.assertEqual("EOF", tokenizer.get_next_token()["type"])
 
+        # tokenizing the encoded text in place gives the same tokens
+        if scanner is None:
+            tokenizer = SpanTokenizer(text.encode())
+        else:
+            tokenizer = SpanTokenizer(text.encode(), scanner=scanner)
+
+        for i in range(0, len(expected)):
+            self.assertEqual(expected[i], tokenizer.get_next_token())
+        self.assertEqual("EOF", tokenizer.get_next_token()["type"])
+
     def test_blank_line(self):
         text: str = "\n"
         expected: tuple[dict[str, str], ...] = ({"type": "BLANK_LINE"},)
@@ -140,6 +167,125 @@ class BlockTokenizerTests(TestCase):
         )
         self.run_test(text, expected, tokenizer_type="block")
 
+    def test_last_line_without_new_line(self):
+        text: str = "    x"
+        expected: tuple[dict[str, str], ...] = (
+            {"type": "INDENT", "value": "\t"},
+            {"type": "TEXT_LINE", "value": "x"},
+        )
+        self.run_test(text, expected, tokenizer_type="block")
+
+    def test_ordered_list_lines(self):
+        text: str = "1. first\n  22. second\n3.third\n"
+        expected: tuple[dict[str, str], ...] = (
+            {"type": "OL_LINE", "value": "1. first"},
+            {"type": "OL_LINE", "value": "22. second"},
+            {"type": "TEXT_LINE", "value": "3.third"},
+        )
+        self.run_test(text, expected, tokenizer_type="block")
+
+    def test_registered_block_type(self):
+        scanner: BlockScanner = BlockScanner()
+        scanner.register("(?:---|\\*\\*\\*)$", "THEMATIC_BREAK", first_chars="-*")
+        scanner.register(">.*", "BLOCK_QUOTE", first_chars=">")
+
+        text: str = "---\n> quoted\n***\n# header\n--- not a break\n"
+        expected: tuple[dict[str, str], ...] = (
+            {"type": "THEMATIC_BREAK", "value": "---"},
+            {"type": "BLOCK_QUOTE", "value": "> quoted"},
+            {"type": "THEMATIC_BREAK", "value": "***"},
+            {"type": "ATX_HEADER", "value": "# header"},
+            {"type": "TEXT_LINE", "value": "--- not a break"},
+        )
+        self.run_test(text, expected, tokenizer_type="block", scanner=scanner)
+
+        # the default scanner is not affected
+        text: str = "---\n"
+        expected: tuple[dict[str, str], ...] = (
+            {"type": "TEXT_LINE", "value": "---"},
+        )
+        self.run_test(text, expected, tokenizer_type="block")
+
+    def test_registered_block_type_without_first_chars(self):
+        scanner: BlockScanner = BlockScanner()
+        scanner.register("[A-Z]+:.*", "FIELD")
+
+        text: str = "TODO: write tests\n# header\n"
+        expected: tuple[dict[str, str], ...] = (
+            {"type": "FIELD", "value": "TODO: write tests"},
+            {"type": "ATX_HEADER", "value": "# header"},
+        )
+        self.run_test(text, expected, tokenizer_type="block", scanner=scanner)
+
+    def test_spans(self):
+        text: str = "# header\n\n  \tcode\ttab\nnon ascii \u00e9\n"
+        spans = list(SpanTokenizer(text.encode()).iter_spans())
+
+        self.assertEqual(
+            spans,
+            [
+                (ATX_HEADER, 0, 8),
+                (BLANK_LINE, 9, 9),
+                (INDENT, 10, 13),
+                (TEXT_LINE, 13, 21),
+                (TEXT_LINE, 22, 34),
+                (EOF, 35, 35),
+            ],
+        )
+
+    def test_tokenize_all(self):
+        text: str = "# header\n\n    code\tblock\ntext\n"
+
+        for tokenizer in (
+            BlockTokenizer(StringIO(text)),
+            SpanTokenizer(text.encode()),
+        ):
+            batch = tokenizer.tokenize_all()
+            self.assertEqual(
+                list(batch.types),
+                [ATX_HEADER, BLANK_LINE, INDENT, TEXT_LINE, TEXT_LINE, EOF],
+            )
+            self.assertEqual(
+                batch.values, ["# header", None, "\t", "code    block", "text", None]
+            )
+            self.assertEqual(list(batch.lines), [0, 1, 2, 2, 3, 4])
+            self.assertEqual(list(batch.line_starts), [0, 9, 10, 25, 30])
+            self.assertEqual(list(batch.line_tokens), [0, 1, 2, 4, 5, 6])
+            self.assertEqual(batch.rest(2), "code    block")
+
+    def test_tokenize_batch(self):
+        text: str = "".join(f"line {i}\n" for i in range(10))
+        tokenizer = BlockTokenizer(StringIO(text))
+
+        first = tokenizer.tokenize_batch(4)
+        self.assertEqual(list(first.types), [TEXT_LINE] * 4)
+        self.assertEqual(first.values[-1], "line 3")
+
+        rest = tokenizer.tokenize_batch()
+        self.assertEqual(list(rest.types), [TEXT_LINE] * 6 + [EOF])
+        self.assertEqual(list(rest.line_starts)[0], 28)
+
+    def test_registered_code(self):
+        scanner: BlockScanner = BlockScanner()
+        code: int = scanner.register("[A-Z]+:.*", "FIELD")
+
+        self.assertEqual(token_names[code], "FIELD")
+        batch = BlockTokenizer(StringIO("TODO: tests\n"), scanner).tokenize_all()
+        self.assertEqual(list(batch.types), [code, EOF])
+
+    def test_span_encoding(self):
+        text: str = "# caf\u00e9\n    na\u00efve\n"
+        tokenizer = SpanTokenizer(text.encode("latin-1"), encoding="latin-1")
+
+        self.assertEqual(
+            tokenizer.get_next_token(), {"type": "ATX_HEADER", "value": "# caf\u00e9"}
+        )
+        self.assertEqual(tokenizer.get_next_token(), {"type": "INDENT", "value": "\t"})
+        self.assertEqual(tokenizer.get_rest_of_line(), "na\u00efve")
+
+        with self.assertRaises(ValueError):
+            SpanTokenizer(text.encode("utf-16"), encoding="utf-16")
+
 
 if __name__ == "__main__":
     main()